@@ -1,30 +1,528 @@
 import requests
 import sys
-from urllib.parse import urlparse
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
 import os
+import re
 import zipfile
 import platform
+import argparse
+import codecs
+import hashlib
+import json
+import mimetypes
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+from html.parser import HTMLParser
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
 
-def download_html(url, output_file=None):
+# Bytes read from the network per write, so memory use doesn't depend on download size
+CHUNK_SIZE = 64 * 1024
+
+def create_session(pool_size=10, hosts=10):
+    """
+    Create a requests session that keeps connections alive between downloads
+    
+    Args:
+        pool_size (int): Connections kept open per host
+        hosts (int): Number of hosts to keep connection pools for
+    
+    Returns:
+        requests.Session: The session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def output_name_for(url):
+    """
+    Build a file name for a downloaded page from its domain and path
+    
+    The path is cut to 100 characters and punctuation becomes '_', so a short hash
+    of the full URL is appended to keep distinct URLs in distinct files.
+    """
+    parsed_url = urlparse(url)
+    name = parsed_url.netloc.replace('.', '_').replace(':', '_')
+    path = re.sub(r'[^A-Za-z0-9]+', '_', f"{parsed_url.path}_{parsed_url.query}").strip('_')
+    if path:
+        name += '_' + path[:100]
+    return f"{name}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}_downloaded.html"
+
+class HttpCache:
+    """
+    On-disk record of how each URL was last downloaded, for conditional requests
+    
+    Stores the ETag and Last-Modified validators, the saved file (or page store
+    blob) and a hash of the body per URL in a JSON file. Validators are sent back as
+    If-None-Match and If-Modified-Since, so an unchanged page costs a 304 instead of
+    a full download. Safe to share between download threads.
+    """
+    def __init__(self, path=".http_cache.json", max_age=None, force_refresh=False):
+        """
+        Args:
+            path (str): JSON file the cache is kept in
+            max_age (float, optional): Seconds after a check during which a page is
+                trusted without contacting the server at all
+            force_refresh (bool): Ignore the cache and download everything again
+        """
+        self.path = path
+        self.max_age = max_age
+        self.force_refresh = force_refresh
+        self.entries = {}
+        self.hits = self.fresh = self.not_modified = 0
+        self.misses = self.unchanged = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading HTTP cache {path}, starting empty: {e}")
+    
+    def lookup(self, url, output_file, page_store=None):
+        """
+        Return the entry for url if it can be used to skip a download, or None
+        
+        With page_store, the saved copy is the URL's latest blob there rather than output_file.
+        """
+        if self.force_refresh:
+            return None
+        return self._saved_entry(url, output_file, page_store)
+    
+    def _saved_entry(self, url, output_file, page_store=None):
+        with self._lock:
+            entry = self.entries.get(url)
+        if entry is None:
+            return None
+        # The saved copy must still be there, unedited, for a 304 to mean anything
+        if page_store is not None:
+            return entry if entry.get('blob') and page_store.resolve(url) == entry['blob'] else None
+        if (entry['output_file'] != os.path.abspath(output_file)
+                or not os.path.exists(output_file) or os.path.getsize(output_file) != entry['file_size']):
+            return None
+        return entry
+    
+    def is_fresh(self, entry):
+        """True if the entry was checked recently enough to skip the request"""
+        return self.max_age is not None and time.time() - entry['checked_at'] < self.max_age
+    
+    def request_headers(self, entry):
+        """Conditional request headers for an entry"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def record_hit(self, entry, revalidated):
+        """Count a download that was skipped, either by max-age or by a 304"""
+        with self._lock:
+            self.hits += 1
+            if revalidated:
+                self.not_modified += 1
+                entry['checked_at'] = time.time()
+            else:
+                self.fresh += 1
+            self.bytes_saved += entry['size']
+    
+    def is_unchanged(self, url, output_file, sha256):
+        """True if a fresh download has the same body as the saved copy"""
+        entry = self._saved_entry(url, output_file)
+        return entry is not None and entry['sha256'] == sha256
+    
+    def store(self, url, output_file, headers, size, sha256, unchanged=False, blob=None):
+        """Record a full download, saved to output_file or, given its hash, to a page store blob"""
+        entry = {
+            'output_file': None if blob else os.path.abspath(output_file),
+            'file_size': None if blob else os.path.getsize(output_file),
+            'blob': blob,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'size': size,
+            'sha256': sha256,
+            'checked_at': time.time()
+        }
+        with self._lock:
+            self.misses += 1
+            if unchanged:
+                self.unchanged += 1
+            self.entries[url] = entry
+    
+    def save(self):
+        """Write the cache to disk, replacing the old file in one step"""
+        with self._lock:
+            data = json.dumps(self.entries, indent=1)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+    
+    def print_stats(self):
+        """Print hits, misses and bytes saved"""
+        print("\nHTTP cache:")
+        print(f"  Hits:        {self.hits} ({self.not_modified} not modified, {self.fresh} within max-age)")
+        print(f"  Misses:      {self.misses} ({self.unchanged} downloaded again but unchanged)")
+        print(f"  Bytes saved: {self.bytes_saved:,}")
+
+class PageStore:
+    """
+    Content-addressed store of downloaded pages
+    
+    Each distinct page body is kept once, zlib-compressed, under objects/<hash[:2]>/<hash>
+    where hash is the SHA-256 of the uncompressed bytes. An SQLite index records
+    which URL was fetched when and which blob it returned, so identical pages,
+    whether downloaded again or from another URL, cost no extra space. Safe to
+    share between download threads.
+    """
+    def __init__(self, root="page_store", level=6):
+        """
+        Args:
+            root (str): Directory holding the blobs and index.sqlite3
+            level (int): zlib compression level, 1 (fastest) to 9 (smallest)
+        """
+        self.root = root
+        self.level = level
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fetches (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                hash TEXT NOT NULL REFERENCES blobs (hash)
+            );
+            CREATE INDEX IF NOT EXISTS fetches_url ON fetches (url, fetched_at);
+        """)
+    
+    def blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+    
+    def add_file(self, url, path, fetched_at=None):
+        """
+        Record that url returned the contents of path
+        
+        Returns:
+            str: SHA-256 of the contents
+        """
+        # Compress into a temporary file while hashing, then move it to its content address
+        digest = hashlib.sha256()
+        compressor = zlib.compressobj(self.level)
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=os.path.join(self.root, "objects"), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out, open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(compressor.compress(chunk))
+                out.write(compressor.flush())
+            digest = digest.hexdigest()
+            blob = self.blob_path(digest)
+            stored_size = os.path.getsize(temp_path)
+            if os.path.exists(blob):
+                os.remove(temp_path)  # already stored under another URL or an earlier fetch
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.replace(temp_path, blob)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        
+        with self._lock:
+            self.conn.execute("INSERT OR IGNORE INTO blobs (hash, size, stored_size) VALUES (?, ?, ?)",
+                              (digest, size, stored_size))
+            self.conn.execute("INSERT INTO fetches (url, fetched_at, hash) VALUES (?, ?, ?)",
+                              (url, fetched_at or time.time(), digest))
+            self.conn.commit()
+        return digest
+    
+    def add_fetch(self, url, digest, fetched_at=None):
+        """Record that url returned a blob already in the store, e.g. after a 304"""
+        with self._lock:
+            self.conn.execute("INSERT INTO fetches (url, fetched_at, hash) VALUES (?, ?, ?)",
+                              (url, fetched_at or time.time(), digest))
+            self.conn.commit()
+    
+    def size(self, digest):
+        """Uncompressed size of a blob"""
+        with self._lock:
+            return self.conn.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()[0]
+    
+    def resolve(self, key, at=None):
+        """
+        Find the blob for a URL, fetched at or before `at` (a UNIX time), or for a hash prefix
+        
+        Returns:
+            str: The full hash, or None if nothing matches
+        """
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT hash FROM fetches WHERE url = ? AND fetched_at <= ?
+                ORDER BY fetched_at DESC LIMIT 1
+            """, (key, at if at is not None else float("inf"))).fetchone()
+            if row is None and re.fullmatch(r"[0-9a-f]{4,64}", key):
+                rows = self.conn.execute("SELECT hash FROM blobs WHERE hash >= ? AND hash < ? LIMIT 2",
+                                         (key, key + "g")).fetchall()
+                row = rows[0] if len(rows) == 1 else None
+        return row[0] if row else None
+    
+    def read(self, digest):
+        """Yield the decompressed contents of a blob in chunks"""
+        decompressor = zlib.decompressobj()
+        with open(self.blob_path(digest), "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+    
+    def read_text(self, digest):
+        """Yield the contents of a blob as text, pages being stored as UTF-8"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in self.read(digest):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+    
+    def export(self, digest, output_file):
+        """Decompress a blob into a file; returns its size"""
+        size = 0
+        with open(output_file, "wb") as f:
+            for chunk in self.read(digest):
+                f.write(chunk)
+                size += len(chunk)
+        return size
+    
+    def history(self, url):
+        """(fetched_at, hash, size) for every fetch of url, newest first"""
+        with self._lock:
+            return self.conn.execute("""
+                SELECT f.fetched_at, f.hash, b.size FROM fetches f JOIN blobs b ON b.hash = f.hash
+                WHERE f.url = ? ORDER BY f.fetched_at DESC
+            """, (url,)).fetchall()
+    
+    def print_stats(self):
+        """Print how much space the store saves over keeping every fetch as a plain file"""
+        with self._lock:
+            urls, fetches, fetched_bytes = self.conn.execute("""
+                SELECT COUNT(DISTINCT f.url), COUNT(*), COALESCE(SUM(b.size), 0)
+                FROM fetches f JOIN blobs b ON b.hash = f.hash
+            """).fetchone()
+            blobs, size, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()
+        print(f"Page store: {os.path.abspath(self.root)}")
+        print(f"  URLs:          {urls:,} ({fetches:,} fetches)")
+        print(f"  Blobs:         {blobs:,} distinct pages, {size:,} bytes uncompressed")
+        print(f"  Stored:        {stored:,} bytes compressed")
+        print(f"  Fetched:       {fetched_bytes:,} bytes in total")
+        if stored:
+            print(f"  Saving:        {fetched_bytes / stored:.1f}x smaller than one file per fetch")
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+def stream_response(response, write, quiet=False, label="Downloaded"):
+    """
+    Pass a streamed response body to write() in CHUNK_SIZE pieces, showing progress
+    
+    Args:
+        response (requests.Response): Response opened with stream=True
+        write (callable): Called with each chunk of bytes
+        quiet (bool): Don't print progress or the final throughput line
+        label (str): First word of the final throughput line
+    
+    Returns:
+        int: Number of bytes received
+    """
+    total = int(response.headers.get('Content-Length') or 0)
+    if response.headers.get('Content-Encoding'):
+        total = 0  # Content-Length is the compressed size, so a percentage would be wrong
+    received = 0
+    start = last_report = time.perf_counter()
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        write(chunk)
+        received += len(chunk)
+        now = time.perf_counter()
+        if not quiet and now - last_report >= 0.5:
+            last_report = now
+            percent = f" ({received / total:.0%})" if total else ""
+            print(f"\r  {received:,} bytes{percent} at {received / (now - start) / 1024:,.1f} KiB/sec",
+                  end="", flush=True)
+    elapsed = time.perf_counter() - start
+    if not quiet:
+        rate = received / elapsed / 1024 if elapsed > 0 else 0
+        print(f"\r  {label} {received:,} bytes in {elapsed:.2f}s ({rate:,.1f} KiB/sec)")
+    return received
+
+class ZipStreamExtractor:
+    """
+    Extracts zip members from an archive's bytes while it is still downloading
+    
+    Members are read from their local file headers as the bytes arrive, inflated
+    chunk by chunk and CRC-checked. Members whose sizes only appear after their data
+    (a data descriptor), encrypted members and unusual compression methods can't be
+    handled this way; extraction then stops and the caller finishes from the file.
+    """
+    LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+    LOCAL_SIGNATURE = 0x04034b50
+    
+    def __init__(self, target_dir='.'):
+        self.target_dir = target_dir
+        self.extracted = []
+        self.stopped = False
+        self.error = None
+        self.fed = 0
+        self._buffer = bytearray()
+        self._member = None
+    
+    def feed(self, data):
+        """Take the next bytes of the archive"""
+        self.fed += len(data)
+        if self.stopped:
+            return
+        self._buffer += data
+        try:
+            self._process()
+        except Exception as e:
+            self._stop(e)
+    
+    def abandon(self, reason):
+        """Stop extracting, e.g. because the bytes no longer arrive in order"""
+        if not self.stopped:
+            self._stop(RuntimeError(reason))
+    
+    def _stop(self, error=None):
+        self.stopped = True
+        self.error = error
+        self._buffer = bytearray()
+        if self._member:
+            self._member['file'].close()
+            if error is not None:
+                os.remove(self._member['path'])  # don't leave a partly written member behind
+            self._member = None
+    
+    def _member_path(self, name):
+        parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+        if not parts or '..' in parts or os.path.isabs(name) or ':' in parts[0]:
+            raise ValueError(f"Unsafe path in archive: {name}")
+        return os.path.join(self.target_dir, *parts)
+    
+    def _process(self):
+        while True:
+            if self._member is None:
+                if len(self._buffer) < self.LOCAL_HEADER.size:
+                    if len(self._buffer) >= 4 and self._buffer[:4] != b'PK\x03\x04':
+                        self._stop()  # central directory: every member has been read
+                    return
+                (signature, _, flags, method, _, _, crc, compressed_size, _,
+                 name_length, extra_length) = self.LOCAL_HEADER.unpack_from(self._buffer)
+                if signature != self.LOCAL_SIGNATURE:
+                    self._stop()
+                    return
+                header_size = self.LOCAL_HEADER.size + name_length + extra_length
+                if len(self._buffer) < header_size:
+                    return
+                if flags & 0x09 or method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) \
+                        or compressed_size == 0xFFFFFFFF:
+                    raise ValueError("member can't be extracted while streaming")
+                raw_name = bytes(self._buffer[self.LOCAL_HEADER.size:self.LOCAL_HEADER.size + name_length])
+                name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+                del self._buffer[:header_size]
+                
+                path = self._member_path(name)
+                if name.endswith('/'):
+                    os.makedirs(path, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                self._member = {
+                    'name': name, 'path': path, 'file': open(path, 'wb'), 'remaining': compressed_size,
+                    'crc': crc, 'actual_crc': 0,
+                    'inflater': zlib.decompressobj(-15) if method == zipfile.ZIP_DEFLATED else None
+                }
+            
+            member = self._member
+            take = min(member['remaining'], len(self._buffer))
+            data = bytes(self._buffer[:take])
+            del self._buffer[:take]
+            member['remaining'] -= take
+            if member['inflater']:
+                data = member['inflater'].decompress(data)
+                if member['remaining'] == 0:
+                    data += member['inflater'].flush()
+            member['file'].write(data)
+            member['actual_crc'] = zlib.crc32(data, member['actual_crc'])
+            
+            if member['remaining'] > 0:
+                return
+            member['file'].close()
+            self._member = None
+            if member['actual_crc'] != member['crc']:
+                os.remove(member['path'])
+                raise ValueError(f"CRC mismatch in {member['name']}")
+            self.extracted.append(member['name'])
+
+def download_html(url, output_file=None, session=None, quiet=False, cache=None):
     """
     Download HTML content from a given URL
     
     Args:
         url (str): The URL to download HTML from
-        output_file (str, optional): File path to save the HTML. If None, saves to 'downloaded_page.html'
+        output_file (str, optional): File path to save the HTML. If None, saves to '<domain>_downloaded.html'
+        session (requests.Session, optional): Session to reuse pooled connections from
+        quiet (bool): Only print errors
+        cache (HttpCache, optional): Skip the download when the saved copy is still current
     
     Returns:
-        str: The downloaded HTML content
+        str: The downloaded HTML content, or None if the download failed
+    """
+    saved = download_html_file(url, output_file, session=session, quiet=quiet, cache=cache)
+    if saved is None:
+        return None
+    with open(saved, encoding='utf-8') as f:
+        return f.read()
+
+def download_html_file(url, output_file=None, session=None, quiet=False, cache=None, on_text=None,
+                       page_store=None):
+    """
+    Download HTML from a given URL straight to a file, without holding the page in memory
+    
+    With page_store the page is kept only in the store: it is streamed to a temporary
+    file next to output_file, compressed into the store and the file removed.
+    
+    Args:
+        url (str): The URL to download HTML from
+        output_file (str, optional): File path to save the HTML. If None, saves to '<domain>_downloaded.html'
+        session (requests.Session, optional): Session to reuse pooled connections from
+        quiet (bool): Only print errors
+        cache (HttpCache, optional): Skip the download when the saved copy is still current
+        on_text (callable, optional): Called with each piece of decoded text as it is saved.
+            Not called when the cache answers, since nothing is downloaded.
+        page_store (PageStore, optional): Keep the page in this store instead of output_file
+    
+    Returns:
+        str: Path of the saved file, or with page_store the page's blob hash;
+            None if the download failed
     """
     try:
-        # Send GET request to the URL
-        print(f"Downloading HTML from: {url}")
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        
-        # Get the HTML content
-        html_content = response.text
-        
         # Determine output filename
         if output_file is None:
             # Extract domain name from URL for default filename
@@ -32,26 +530,620 @@ def download_html(url, output_file=None):
             domain = parsed_url.netloc.replace('.', '_')
             output_file = f"{domain}_downloaded.html"
         
-        # Save HTML to file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        entry = cache.lookup(url, output_file, page_store) if cache else None
+        saved = (entry['blob'] if page_store else output_file) if entry else None
+        if entry and cache.is_fresh(entry):
+            cache.record_hit(entry, revalidated=False)
+            if not quiet:
+                print(f"Using cached copy of {url} (checked within max-age): {saved}")
+            return saved
+        
+        # Send GET request to the URL; the body is streamed to disk instead of held in memory
+        if not quiet:
+            print(f"Downloading HTML from: {url}")
+        headers = cache.request_headers(entry) if cache else {}
+        response = (session or requests).get(url, timeout=10, stream=True, headers=headers)
+        if response.status_code == 304 and entry:
+            response.close()
+            cache.record_hit(entry, revalidated=True)
+            if page_store:
+                page_store.add_fetch(url, saved)
+            if not quiet:
+                print(f"Not modified since last download: {saved}")
+            return saved
+        response.raise_for_status()  # Raise an exception for bad status codes
+        
+        # Pages are saved as UTF-8. Without a declared charset, assume the page is UTF-8 too.
+        encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        digest = hashlib.sha256()
         
-        print(f"HTML downloaded successfully!")
-        print(f"Content length: {len(html_content)} characters")
-        print(f"Saved to: {output_file}")
+        def write(chunk, final=False):
+            digest.update(chunk)
+            text = decoder.decode(chunk, final=final)
+            f.write(text)
+            if on_text and text:
+                on_text(text)
         
-        return html_content
+        # Save HTML to a temporary file first, so an unchanged page leaves the saved copy untouched
+        temp_file = output_file + '.tmp'
+        try:
+            with response, open(temp_file, 'w', encoding='utf-8') as f:
+                received = stream_response(response, write, quiet=quiet)
+                write(b'', final=True)
+        except Exception:
+            os.remove(temp_file)
+            raise
+        
+        if page_store:
+            try:
+                blob = page_store.add_file(url, temp_file)
+            finally:
+                os.remove(temp_file)
+            if cache:
+                cache.store(url, output_file, response.headers, received, digest.hexdigest(), blob=blob)
+            if not quiet:
+                print("HTML downloaded successfully!")
+                print(f"Content length: {received:,} bytes")
+                print(f"Stored as blob {blob}")
+            return blob
+        
+        unchanged = cache is not None and cache.is_unchanged(url, output_file, digest.hexdigest())
+        if unchanged:
+            os.remove(temp_file)
+        else:
+            os.replace(temp_file, output_file)
+        if cache:
+            cache.store(url, output_file, response.headers, received, digest.hexdigest(), unchanged)
+        
+        if not quiet:
+            print(f"HTML downloaded successfully!")
+            print(f"Content length: {received:,} bytes")
+            print(f"Saved to: {output_file}" + (" (unchanged, not rewritten)" if unchanged else ""))
+        
+        return output_file
         
     except requests.exceptions.RequestException as e:
-        print(f"Error downloading HTML: {e}")
+        print(f"Error downloading HTML from {url}: {e}")
         return None
     except Exception as e:
         print(f"Unexpected error: {e}")
         return None
 
-def download_sqlite():
+def download_many(urls, output_dir=".", workers=8, per_host=4, cache=None, store=None):
+    """
+    Download many pages concurrently over a shared keep-alive connection pool
+    
+    Args:
+        urls (iterable): URLs to download; blank lines and lines starting with # are skipped
+        output_dir (str): Directory the pages are saved in
+        workers (int): Maximum downloads in flight
+        per_host (int): Maximum downloads in flight to any one host
+        cache (HttpCache, optional): Skip pages whose saved copy is still current
+        store (PageStore, optional): Keep the pages only in this store, not as files
+    
+    Returns:
+        list: (url, output_file, bytes, seconds) for each URL; output_file is the blob
+            hash when storing, and None on failure
+    """
+    urls = [url.strip() for url in urls if url.strip() and not url.strip().startswith('#')]
+    if not urls:
+        print("No URLs to download")
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    
+    session = create_session(pool_size=per_host, hosts=max(workers, 10))
+    host_limits = {}
+    host_limits_lock = threading.Lock()
+    
+    def fetch(url):
+        host = urlparse(url).netloc
+        with host_limits_lock:
+            limit = host_limits.setdefault(host, threading.BoundedSemaphore(per_host))
+        with limit:
+            output_file = os.path.join(output_dir, output_name_for(url))
+            start = time.perf_counter()
+            saved = download_html_file(url, output_file, session=session, quiet=True, cache=cache,
+                                       page_store=store)
+            elapsed = time.perf_counter() - start
+        if saved is None:
+            return url, None, 0, elapsed
+        return url, saved, store.size(saved) if store else os.path.getsize(saved), elapsed
+    
+    print(f"Downloading {len(urls)} pages with {workers} workers ({per_host} per host)...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    session.close()
+    
+    print_download_summary(results, elapsed)
+    return results
+
+def print_download_summary(results, elapsed):
+    """Print throughput and latency for a batch of downloads"""
+    succeeded = [result for result in results if result[1] is not None]
+    total_bytes = sum(result[2] for result in succeeded)
+    latencies = sorted(result[3] for result in results)
+    
+    def latency(pct):
+        return latencies[min(len(latencies) - 1, int(pct / 100 * len(latencies)))] * 1000
+    
+    print("\nDownload summary:")
+    print(f"  Pages:      {len(succeeded)} succeeded, {len(results) - len(succeeded)} failed")
+    print(f"  Bytes:      {total_bytes:,}")
+    print(f"  Time:       {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"  Throughput: {len(results) / elapsed:.1f} pages/sec, {total_bytes / elapsed / 1024:,.1f} KiB/sec")
+    if latencies:
+        print(f"  Latency:    p50 {latency(50):.0f} ms, p95 {latency(95):.0f} ms, max {latencies[-1] * 1000:.0f} ms")
+
+# Links to these kinds of files aren't followed when crawling
+SKIPPED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.ico', '.css', '.js',
+                      '.pdf', '.zip', '.gz', '.tar', '.mp3', '.mp4', '.webm', '.woff', '.woff2')
+
+def normalize_url(url, base=None):
+    """
+    Canonical form of a URL, so the same page is only crawled once
+    
+    Resolves it against base, lowercases the scheme and host, drops default ports,
+    fragments and empty queries, and sorts query parameters.
+    
+    Returns:
+        str: The normalized URL, or None for anything that isn't http(s)
+    """
+    parsed = urlparse(urljoin(base, url.strip()) if base else url.strip())
+    scheme = parsed.scheme.lower()
+    if scheme not in ('http', 'https') or not parsed.hostname:
+        return None
+    host = parsed.hostname.lower()
+    if parsed.port and parsed.port != {'http': 80, 'https': 443}[scheme]:
+        host = f"{host}:{parsed.port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, query, ''))
+
+class LinkExtractor(HTMLParser):
+    """Collects <a href> targets from HTML fed to it a piece at a time"""
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == 'base':
+            href = dict(attrs).get('href')
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+        elif tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                url = normalize_url(href, self.base_url)
+                if url:
+                    self.links.append(url)
+
+class HostRateLimiter:
+    """Spaces out requests to each host so none gets more than `rate` per second"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, host):
+        """Block until the next request to host is allowed"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class CrawlFrontier:
+    """
+    The crawl's URL queue and visited set, checkpointed to SQLite
+    
+    Every URL ever discovered has one row, keyed by its normalized form, so the
+    table doubles as the visited set. Pages in flight when a crawl is interrupted
+    are queued again when it resumes.
+    """
+    def __init__(self, db_name):
+        self.conn = sqlite3.connect(db_name)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                depth INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                bytes INTEGER,
+                output_file TEXT,
+                fetched_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (status, depth, id)")
+        self.conn.execute("UPDATE frontier SET status = 'queued' WHERE status = 'fetching'")
+        self.conn.commit()
+    
+    def add(self, urls, depth):
+        """Queue the URLs that haven't been seen before"""
+        self.conn.executemany("INSERT OR IGNORE INTO frontier (url, depth) VALUES (?, ?)",
+                              ((url, depth) for url in urls))
+    
+    def take(self, limit):
+        """Mark up to limit queued URLs, shallowest first, as being fetched"""
+        rows = self.conn.execute("""
+            SELECT id, url, depth FROM frontier WHERE status = 'queued'
+            ORDER BY depth, id LIMIT ?
+        """, (limit,)).fetchall()
+        self.conn.executemany("UPDATE frontier SET status = 'fetching' WHERE id = ?", [(row[0],) for row in rows])
+        return rows
+    
+    def finish(self, row_id, output_file, size):
+        """Record a fetched page, or a failed one if output_file is None"""
+        self.conn.execute("""
+            UPDATE frontier SET status = ?, bytes = ?, output_file = ?, fetched_at = ? WHERE id = ?
+        """, ('done' if output_file else 'failed', size, output_file, time.time(), row_id))
+    
+    def count(self, status):
+        return self.conn.execute("SELECT COUNT(*) FROM frontier WHERE status = ?", (status,)).fetchone()[0]
+    
+    def checkpoint(self):
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+def crawl(seed, output_dir="mirror", depth=2, max_pages=100, workers=8, per_host=2, rate=2.0,
+          same_host=True, state_file=None, cache=None, store=None):
+    """
+    Mirror pages reachable from seed, breadth first
+    
+    Pages are saved with download_html_file and their links are extracted while they
+    stream in, so no page is held in memory. The frontier is checkpointed to
+    SQLite after every batch of results; running the same crawl again resumes it.
+    
+    Args:
+        seed (str): URL to start from
+        output_dir (str): Directory the pages are saved in
+        depth (int): How many links away from the seed to follow
+        max_pages (int): Stop after this many pages have been fetched, counting earlier runs
+        workers (int): Maximum downloads in flight
+        per_host (int): Maximum downloads in flight to any one host
+        rate (float): Maximum requests per second to any one host; 0 for no limit
+        same_host (bool): Only follow links to the seed's host
+        state_file (str, optional): Frontier database; defaults to crawl.sqlite3 in output_dir
+        cache (HttpCache, optional): Skip pages whose saved copy is still current
+        store (PageStore, optional): Keep the pages only in this store, not as files
+    
+    Returns:
+        dict: pages, failed, bytes and seconds for this run
+    """
+    seed = normalize_url(seed)
+    if seed is None:
+        print("Error: the seed must be an http(s) URL")
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    frontier = CrawlFrontier(state_file or os.path.join(output_dir, "crawl.sqlite3"))
+    frontier.add([seed], 0)
+    frontier.checkpoint()
+    seed_host = urlparse(seed).netloc
+    
+    session = create_session(pool_size=per_host, hosts=max(workers, 10))
+    limiter = HostRateLimiter(rate)
+    host_limits = {}
+    host_limits_lock = threading.Lock()
+    
+    def follow(url):
+        parsed = urlparse(url)
+        return (not same_host or parsed.netloc == seed_host) and not parsed.path.lower().endswith(SKIPPED_EXTENSIONS)
+    
+    def fetch(url, page_depth):
+        host = urlparse(url).netloc
+        with host_limits_lock:
+            limit = host_limits.setdefault(host, threading.BoundedSemaphore(per_host))
+        extractor = LinkExtractor(url) if page_depth < depth else None
+        streamed = []
+        
+        def on_text(text):
+            streamed.append(True)
+            extractor.feed(text)
+        
+        with limit:
+            limiter.wait(host)
+            output_file = os.path.join(output_dir, output_name_for(url))
+            saved = download_html_file(url, output_file, session=session, quiet=True, cache=cache,
+                                       on_text=on_text if extractor else None, page_store=store)
+        if saved is None:
+            return None, 0, []
+        if extractor and not streamed:
+            # Answered from the cache: read the links from the saved copy instead
+            if store:
+                for text in store.read_text(saved):
+                    extractor.feed(text)
+            else:
+                with open(saved, encoding='utf-8') as f:
+                    for text in iter(lambda: f.read(CHUNK_SIZE), ''):
+                        extractor.feed(text)
+        if extractor:
+            extractor.close()
+        links = [link for link in dict.fromkeys(extractor.links) if follow(link)] if extractor else []
+        return saved, store.size(saved) if store else os.path.getsize(saved), links
+    
+    pages = failed = total_bytes = 0
+    budget = max_pages - frontier.count('done')
+    print(f"Crawling {seed} (depth {depth}, up to {max_pages} pages, {workers} workers, "
+          f"{per_host} per host, {rate or 'unlimited'} requests/sec per host)...")
+    start = last_report = time.perf_counter()
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                room = min(workers - len(in_flight), budget - pages - len(in_flight))
+                if room > 0:
+                    for row_id, url, page_depth in frontier.take(room):
+                        in_flight[executor.submit(fetch, url, page_depth)] = (row_id, page_depth)
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    row_id, page_depth = in_flight.pop(future)
+                    saved, size, links = future.result()
+                    frontier.finish(row_id, saved, size)
+                    if saved:
+                        pages += 1
+                        total_bytes += size
+                        frontier.add(links, page_depth + 1)
+                    else:
+                        failed += 1
+                frontier.checkpoint()
+                
+                now = time.perf_counter()
+                if now - last_report >= 1.0:
+                    last_report = now
+                    print(f"\r  {pages} pages, {failed} failed, {frontier.count('queued')} queued, "
+                          f"{total_bytes / (now - start) / 1024:,.1f} KiB/sec", end="", flush=True)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume")
+    finally:
+        frontier.close()
+        session.close()
+        if cache:
+            cache.save()
+    
+    elapsed = time.perf_counter() - start
+    print("\nCrawl summary:")
+    print(f"  Pages:      {pages} fetched, {failed} failed")
+    print(f"  Bytes:      {total_bytes:,}")
+    print(f"  Time:       {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"  Throughput: {pages / elapsed:.1f} pages/sec, {total_bytes / elapsed / 1024:,.1f} KiB/sec")
+    return {'pages': pages, 'failed': failed, 'bytes': total_bytes, 'seconds': elapsed}
+
+class LocalHandler(SimpleHTTPRequestHandler):
+    """Static file handler with keep-alive, a stand-in for remote sites when testing"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def end_headers(self):
+        if getattr(self, '_etag', None):
+            self.send_header("ETag", self._etag)
+        super().end_headers()
+    
+    def send_head(self):
+        """
+        Answer single-range requests (Range: bytes=start-end) with 206 Partial Content,
+        and If-None-Match with 304 when the file's ETag (mtime and size) still matches
+        """
+        self._range_length = None
+        self._etag = None
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            self._etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            if self._etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+                self.send_response(304)
+                self.end_headers()
+                return None
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', '').strip())
+        if not match or match.group(0) == 'bytes=-' or not os.path.isfile(path):
+            return super().send_head()
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return super().send_head()
+        
+        size = os.fstat(f.fileno()).st_size
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1  # bytes=-N is the last N bytes
+        if start >= size or start > end:
+            f.close()
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        
+        self.send_response(206)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Last-Modified", self.date_time_string(os.fstat(f.fileno()).st_mtime))
+        self.end_headers()
+        f.seek(start)
+        self._range_length = end - start + 1
+        return f
+    
+    def copyfile(self, source, outputfile):
+        if self._range_length is None:
+            return super().copyfile(source, outputfile)
+        remaining = self._range_length
+        while remaining > 0:
+            chunk = source.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            remaining -= len(chunk)
+
+def start_local_server(directory=".", port=0, handler=LocalHandler):
+    """
+    Serve a directory over HTTP on 127.0.0.1 from a background thread
+    
+    Args:
+        directory (str): Directory to serve
+        port (int): Port to listen on; 0 picks a free one
+        handler (type): LocalHandler or a subclass, e.g. one that misbehaves on purpose in tests
+    
+    Returns:
+        tuple: (server, base_url). Call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(handler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def file_digest(path, algorithm):
+    """Hex digest of a file, read in chunks"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def verify_archive(path, expected):
+    """
+    Check a downloaded zip against a pinned hash
+    
+    Args:
+        path (str): The archive
+        expected (tuple): (algorithm, hex digest), e.g. ('sha3_256', '...').
+            Without one nothing can be verified, so the archive is rejected.
+    
+    Returns:
+        bool: True if the archive matches the pinned hash
+    """
+    if not expected:
+        print(f"No hash given for {path}; its sha3_256 is {file_digest(path, 'sha3_256')}")
+        return False
+    algorithm, pinned = expected
+    actual = file_digest(path, algorithm)
+    if actual != pinned.lower():
+        print(f"Checksum mismatch for {path}: expected {algorithm} {pinned}, got {actual}")
+        return False
+    print(f"Verified {path} ({algorithm} {actual})")
+    return True
+
+def download_resumable(url, output_file, retries=5, backoff=1.0, on_chunk=None, session=None):
+    """
+    Download a file into output_file + '.part', resuming with HTTP Range after failures
+    
+    Args:
+        url (str): File to download
+        output_file (str): Where the finished file is moved to
+        retries (int): Attempts after the first one before giving up
+        backoff (float): Seconds to wait before the first retry; doubles on each retry
+        on_chunk (callable, optional): Called with (chunk, offset) for every chunk written
+        session (requests.Session, optional): Session to reuse pooled connections from
+    
+    Returns:
+        int: Size of the finished file
+    """
+    part_file = output_file + '.part'
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff * 2 ** (attempt - 1)
+            print(f"  Retrying in {delay:.1f}s (attempt {attempt + 1} of {retries + 1})...")
+            time.sleep(delay)
+        
+        offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+        # Ranges count bytes as sent, so ask for the file as it is rather than compressed
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+
+        try:
+            with (session or requests).get(url, timeout=30, stream=True, headers=headers) as response:
+                if response.status_code == 416 and offset:
+                    # Nothing left to send: the .part file already holds the whole file
+                    break
+                response.raise_for_status()
+                if response.status_code == 206:
+                    if not response.headers.get('Content-Range', '').startswith(f'bytes {offset}-'):
+                        os.remove(part_file)
+                        raise requests.exceptions.ContentDecodingError("server returned the wrong range")
+                    print(f"  Resuming at byte {offset:,}")
+                else:
+                    offset = 0  # the server ignored the Range header; start over
+                expected = int(response.headers.get('Content-Length') or -1)
+                position = offset
+                
+                def write(chunk):
+                    nonlocal position
+                    f.write(chunk)
+                    if on_chunk:
+                        on_chunk(chunk, position)
+                    position += len(chunk)
+                
+                with open(part_file, 'ab' if offset else 'wb') as f:
+                    stream_response(response, write, label="Received")
+                # Content-Length counts the bytes on the wire, which differ from the
+                # decoded bytes written if the server compressed the body anyway
+                sent = response.raw.tell()
+                if expected >= 0 and sent != expected:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"connection closed after {sent:,} of {expected:,} bytes")
+                break
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 0
+            if status < 500 and status not in (408, 429):
+                raise  # retrying won't fix a missing file or a refused request
+            print(f"  Download failed: {e}")
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"\n  Download interrupted: {e}")
+    else:
+        raise requests.exceptions.RetryError(f"giving up on {url} after {retries + 1} attempts")
+    
+    os.replace(part_file, output_file)
+    return os.path.getsize(output_file)
+
+def publish_extracted(staging_dir, target_dir='.'):
+    """Move everything extracted into staging_dir over to target_dir"""
+    for name in os.listdir(staging_dir):
+        source = os.path.join(staging_dir, name)
+        target = os.path.join(target_dir, name)
+        if os.path.isdir(source) and os.path.isdir(target):
+            shutil.copytree(source, target, dirs_exist_ok=True)
+        else:
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            os.replace(source, target)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+def download_sqlite(url=None, expected_hash=None, retries=5, backoff=1.0):
     """
     Download SQLite for the current platform
+    
+    The archive is downloaded resumably, checked against expected_hash and only
+    then extracted. A verified archive left from an earlier run isn't downloaded again.
+    Without a hash nothing is installed: the downloaded archive's SHA3-256 is
+    printed so it can be checked against sqlite.org and passed as expected_hash.
+    
+    Args:
+        url (str, optional): Archive to download instead of the one for this platform
+        expected_hash (tuple, optional): (algorithm, hex digest) of the archive, from the
+            SHA3-256 column of https://www.sqlite.org/download.html
+        retries (int): Download attempts after the first one
+        backoff (float): Seconds before the first retry; doubles on each retry
     """
     system = platform.system().lower()
     machine = platform.machine().lower()
@@ -75,7 +1167,9 @@ def download_sqlite():
     
     try:
         # Determine the appropriate URL for the current platform
-        if system in sqlite_urls:
+        if url:
+            pass
+        elif system in sqlite_urls:
             if machine in sqlite_urls[system]:
                 url = sqlite_urls[system][machine]
             else:
@@ -86,26 +1180,51 @@ def download_sqlite():
             print("Please download SQLite manually from: https://www.sqlite.org/download.html")
             return False
         
-        print(f"Downloading SQLite for {system} {machine}...")
-        print(f"URL: {url}")
-        
-        # Download the SQLite tools
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # Save the zip file
         zip_filename = f"sqlite-tools-{system}-{machine}.zip"
-        with open(zip_filename, 'wb') as f:
-            f.write(response.content)
+        hint = (f"Copy the archive's SHA3-256 from https://www.sqlite.org/download.html and run: "
+                f"python blog.py sqlite --sha3-256 HEX (or --sha256 HEX)")
+        if not expected_hash:
+            print(f"No hash given for {url}, so it will be downloaded but not installed.")
+            print(hint)
         
-        print(f"SQLite downloaded successfully!")
-        print(f"File size: {len(response.content)} bytes")
-        print(f"Saved as: {zip_filename}")
+        # Members are extracted into a staging directory and only moved into place
+        # once the whole archive has been verified
+        staging_dir = zip_filename + '.extract'
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        extractor = ZipStreamExtractor(staging_dir)
+        
+        if expected_hash and os.path.exists(zip_filename) and verify_archive(zip_filename, expected_hash):
+            print(f"Verified archive already present, skipping download: {zip_filename}")
+        else:
+            print(f"Downloading SQLite for {system} {machine}...")
+            print(f"URL: {url}")
+            
+            def extract(chunk, offset):
+                # Members can only be read from a continuous stream that started at byte 0
+                if offset != extractor.fed:
+                    extractor.abandon("download was resumed")
+                extractor.feed(chunk)
+            
+            size = download_resumable(url, zip_filename, retries, backoff, on_chunk=extract)
+            if not expected_hash:
+                verify_archive(zip_filename, expected_hash)
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                print("Not installing an unverified archive.")
+                print(hint)
+                return False
+            if not verify_archive(zip_filename, expected_hash):
+                os.remove(zip_filename)
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                print("Removed the bad archive; run the command again to download it afresh")
+                return False
+            
+            print(f"SQLite downloaded successfully!")
+            print(f"File size: {size} bytes")
+            print(f"Saved as: {zip_filename}")
         
-        # Extract the zip file
         print("Extracting SQLite tools...")
-        with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
-            zip_ref.extractall('.')
+        extract_remaining(zip_filename, extractor, staging_dir)
+        publish_extracted(staging_dir)
         
         print("SQLite tools extracted successfully!")
         
@@ -132,6 +1251,37 @@ def download_sqlite():
         print(f"Unexpected error: {e}")
         return False
 
+def extract_remaining(zip_filename, extractor, target_dir='.'):
+    """
+    Extract the members a ZipStreamExtractor couldn't, one at a time from the saved file
+    
+    Returns:
+        int: Number of members extracted from the file
+    """
+    if extractor.error is not None:
+        print(f"  Streaming extraction stopped ({extractor.error}); extracting the rest from {zip_filename}")
+    if extractor.extracted:
+        print(f"  {len(extractor.extracted)} members extracted while downloading")
+    done = set(extractor.extracted)
+    count = 0
+    with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            if member.filename in done:
+                continue
+            if member.is_dir():
+                zip_ref.extract(member, target_dir)
+                continue
+            # Drop absolute and parent parts like extractall does, but copy in chunks to keep memory flat
+            path = os.path.join(target_dir, *[part for part in member.filename.split('/')
+                                              if part not in ('', '.', '..')])
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with zip_ref.open(member) as source, open(path, 'wb') as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+            count += 1
+    if count:
+        print(f"  {count} members extracted from the saved archive")
+    return count
+
 def create_sample_database():
     """
     Create a sample SQLite database to test the installation
@@ -178,11 +1328,20 @@ def main():
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python blog.py html <URL> [output_file]  - Download HTML")
-        print("  python blog.py sqlite                     - Download SQLite")
+        print("  python blog.py html --list <file|->      - Download many URLs concurrently")
+        print("  python blog.py crawl <seed> [--depth N] [--max-pages M] - Mirror a site")
+        print("  python blog.py store cat|export|log|stats ... - Read pages from the compressed page store")
+        print("  python blog.py sqlite [--url URL] [--sha3-256 HEX] - Download SQLite, resuming and verifying")
         print("  python blog.py sample-db                  - Create sample database")
+        print("  python blog.py serve [directory] [port]   - Serve a directory locally for testing")
         print("\nExamples:")
         print("  python blog.py html https://example.com")
         print("  python blog.py html https://example.com my_page.html")
+        print("  python blog.py html --list urls.txt --out-dir mirror --workers 16 --per-host 4")
+        print("  python blog.py html --list urls.txt --out-dir mirror --max-age 3600")
+        print("  python blog.py crawl https://example.com/wiki --depth 2 --max-pages 500 --rate 1")
+        print("  python blog.py html --list urls.txt --out-dir mirror --store page_store")
+        print("  python blog.py store cat https://example.com > page.html")
         print("  python blog.py sqlite")
         print("  python blog.py sample-db")
         return
@@ -190,24 +1349,152 @@ def main():
     command = sys.argv[1].lower()
     
     if command == "html":
-        if len(sys.argv) < 3:
+        parser = argparse.ArgumentParser(prog="blog.py html", description="Download HTML pages")
+        parser.add_argument("url", nargs="?", help="URL to download, or - to read URLs from stdin")
+        parser.add_argument("output_file", nargs="?", help="file to save a single page to")
+        parser.add_argument("--list", metavar="FILE", help="file with one URL per line, or - for stdin")
+        parser.add_argument("--out-dir", default=".", help="directory for pages downloaded from a list")
+        parser.add_argument("--workers", type=int, default=8, help="downloads in flight")
+        parser.add_argument("--per-host", type=int, default=4, help="downloads in flight per host")
+        parser.add_argument("--cache", default=".http_cache.json", help="file the HTTP cache is kept in")
+        parser.add_argument("--no-cache", action="store_true", help="always download and rewrite pages")
+        parser.add_argument("--max-age", type=float, metavar="SECONDS",
+                            help="trust pages checked this recently without asking the server")
+        parser.add_argument("--refresh", action="store_true", help="ignore cached validators and download again")
+        parser.add_argument("--store", metavar="DIR", help="keep pages only in a compressed page store")
+        args = parser.parse_args(sys.argv[2:])
+        
+        cache = None if args.no_cache else HttpCache(args.cache, args.max_age, args.refresh)
+        store = PageStore(args.store) if args.store else None
+        
+        url_list = args.list or ("-" if args.url == "-" else None)
+        if url_list:
+            if url_list == "-":
+                urls = sys.stdin.read().splitlines()
+            else:
+                with open(url_list, encoding='utf-8') as f:
+                    urls = f.read().splitlines()
+            download_many(urls, args.out_dir, workers=args.workers, per_host=args.per_host,
+                          cache=cache, store=store)
+            if cache:
+                cache.save()
+                cache.print_stats()
+            if store:
+                store.close()
+            return
+        
+        if not args.url:
             print("Error: URL required for HTML download")
             print("Usage: python blog.py html <URL> [output_file]")
             return
         
-        url = sys.argv[2]
-        output_file = sys.argv[3] if len(sys.argv) > 3 else None
+        url = args.url
+        output_file = args.output_file
         
         # Download the HTML
-        html_content = download_html(url, output_file)
+        saved = download_html_file(url, output_file, cache=cache, page_store=store)
+        if cache:
+            cache.save()
         
-        if html_content:
+        if saved:
+            if store:
+                html_content = ""
+                for text in store.read_text(saved):
+                    html_content += text
+                    if len(html_content) > 500:
+                        break
+            else:
+                with open(saved, encoding='utf-8') as f:
+                    html_content = f.read(501)
             print("\nFirst 500 characters of downloaded HTML:")
             print("-" * 50)
             print(html_content[:500] + "..." if len(html_content) > 500 else html_content)
+        if store:
+            store.close()
+    
+    elif command == "crawl":
+        parser = argparse.ArgumentParser(prog="blog.py crawl", description="Mirror a site, breadth first")
+        parser.add_argument("seed", help="URL to start from")
+        parser.add_argument("--depth", type=int, default=2, help="links to follow away from the seed")
+        parser.add_argument("--max-pages", type=int, default=100, help="stop after this many pages")
+        parser.add_argument("--out-dir", default="mirror", help="directory the pages are saved in")
+        parser.add_argument("--workers", type=int, default=8, help="downloads in flight")
+        parser.add_argument("--per-host", type=int, default=2, help="downloads in flight per host")
+        parser.add_argument("--rate", type=float, default=2.0, help="requests/sec per host, 0 for no limit")
+        parser.add_argument("--all-hosts", action="store_true", help="follow links to other hosts too")
+        parser.add_argument("--state", help="frontier database (default: <out-dir>/crawl.sqlite3)")
+        parser.add_argument("--no-cache", action="store_true", help="always download and rewrite pages")
+        parser.add_argument("--store", metavar="DIR", help="keep pages only in a compressed page store")
+        args = parser.parse_args(sys.argv[2:])
+        
+        cache = None if args.no_cache else HttpCache(os.path.join(args.out_dir, ".http_cache.json"))
+        store = PageStore(args.store) if args.store else None
+        crawl(args.seed, args.out_dir, args.depth, args.max_pages, args.workers, args.per_host,
+              args.rate, not args.all_hosts, args.state, cache, store)
+        if store:
+            store.close()
+    
+    elif command == "store":
+        parser = argparse.ArgumentParser(prog="blog.py store", description="Work with the compressed page store")
+        parser.add_argument("--dir", default="page_store", help="page store directory")
+        actions = parser.add_subparsers(dest="action", required=True)
+        add = actions.add_parser("add", help="store a saved page under its URL")
+        add.add_argument("url")
+        add.add_argument("file")
+        cat = actions.add_parser("cat", help="print a page")
+        cat.add_argument("key", help="URL or blob hash (prefix)")
+        cat.add_argument("--at", help="latest fetch at or before this time, e.g. 2026-01-31T12:00")
+        export = actions.add_parser("export", help="write a page to a file")
+        export.add_argument("key", help="URL or blob hash (prefix)")
+        export.add_argument("output_file")
+        export.add_argument("--at", help="latest fetch at or before this time, e.g. 2026-01-31T12:00")
+        log = actions.add_parser("log", help="list every fetch of a URL")
+        log.add_argument("url")
+        actions.add_parser("stats", help="show how much space the store saves")
+        args = parser.parse_args(sys.argv[2:])
+        
+        store = PageStore(args.dir)
+        try:
+            if args.action == "add":
+                print(store.add_file(args.url, args.file))
+            elif args.action in ("cat", "export"):
+                at = datetime.fromisoformat(args.at).timestamp() if args.at else None
+                digest = store.resolve(args.key, at)
+                if digest is None:
+                    print(f"Not in the page store: {args.key}", file=sys.stderr)
+                    sys.exit(1)
+                if args.action == "cat":
+                    for chunk in store.read(digest):
+                        sys.stdout.buffer.write(chunk)
+                    sys.stdout.flush()
+                else:
+                    size = store.export(digest, args.output_file)
+                    print(f"Exported {size:,} bytes ({digest}) to {args.output_file}")
+            elif args.action == "log":
+                for fetched_at, digest, size in store.history(args.url):
+                    print(f"{datetime.fromtimestamp(fetched_at).isoformat(timespec='seconds')}  {digest}  {size:,} bytes")
+            else:
+                store.print_stats()
+        finally:
+            store.close()
     
     elif command == "sqlite":
-        success = download_sqlite()
+        parser = argparse.ArgumentParser(prog="blog.py sqlite", description="Download the SQLite tools")
+        parser.add_argument("--url", help="archive to download instead of the one for this platform")
+        checksum = parser.add_mutually_exclusive_group()
+        checksum.add_argument("--sha3-256", "--sha3", metavar="HEX",
+                              help="expected SHA3-256 of the archive, from sqlite.org's download page")
+        checksum.add_argument("--sha256", metavar="HEX", help="expected SHA-256 of the archive")
+        parser.add_argument("--retries", type=int, default=5, help="download attempts after the first")
+        parser.add_argument("--backoff", type=float, default=1.0, help="seconds before the first retry")
+        args = parser.parse_args(sys.argv[2:])
+        
+        expected_hash = None
+        if args.sha3_256:
+            expected_hash = ('sha3_256', args.sha3_256)
+        elif args.sha256:
+            expected_hash = ('sha256', args.sha256)
+        success = download_sqlite(args.url, expected_hash, args.retries, args.backoff)
         if success:
             print("\nSQLite installation completed!")
             print("You can now use SQLite in your Python projects.")
@@ -215,9 +1502,20 @@ def main():
     elif command == "sample-db":
         create_sample_database()
     
+    elif command == "serve":
+        directory = sys.argv[2] if len(sys.argv) > 2 else "."
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8800
+        server, base_url = start_local_server(directory, port)
+        print(f"Serving {os.path.abspath(directory)} at {base_url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    
     else:
         print(f"Unknown command: {command}")
-        print("Available commands: html, sqlite, sample-db")
+        print("Available commands: html, crawl, store, sqlite, sample-db, serve")
 
 if __name__ == "__main__":
     main()
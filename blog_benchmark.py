@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the D&D&D blog's database hot paths
+
+Runs the queries the blog serves on every page against a synthetic database
+(see: python sqlite_manager.py synth) and writes p50/p95/p99 latency and rows/sec
+to a JSON file. Pass an earlier results file with --baseline to flag regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+from functools import partial
+
+from blog_db import SEARCH_COMMENTS_SQL, SEARCH_POSTS_SQL, WORDS, SocialGraph
+from sqlite_manager import PERFORMANCE_PROFILES, SQLiteManager, apply_performance_profile, percentile
+
+# params(rng, sample) returns the named parameters for one run
+Benchmark = namedtuple("Benchmark", ["name", "description", "sql", "params"])
+
+# Benchmarks of the in-memory SocialGraph: run(graph, params) returns the number of rows produced
+GraphBenchmark = namedtuple("GraphBenchmark", ["name", "description", "run", "params"])
+
+# Benchmarks that write: run(conn, params) returns the number of rows written
+WriteBenchmark = namedtuple("WriteBenchmark", ["name", "description", "run", "params"])
+
+BLOCKED_AUTHORS_SQL = """
+    SELECT blocked_id FROM dnd_blog_userblock WHERE blocker_id = :user
+    UNION ALL
+    SELECT blocker_id FROM dnd_blog_userblock WHERE blocked_id = :user
+"""
+
+FRIENDS_SQL = """
+    SELECT receiver_id FROM dnd_blog_friendship WHERE sender_id = :user AND status = 'accepted'
+    UNION ALL
+    SELECT sender_id FROM dnd_blog_friendship WHERE receiver_id = :user AND status = 'accepted'
+"""
+
+def _user_pair(rng, sample):
+    """Half the time two friends, otherwise two random users"""
+    if rng.random() < 0.5:
+        a, b = rng.choice(sample["friend_pairs"])
+    else:
+        a, b = rng.choice(sample["social_users"]), rng.choice(sample["recipients"])
+    return {"a": a, "b": b}
+
+def _block_pair(rng, sample):
+    """Half the time a blocked pair, otherwise two random users"""
+    if rng.random() < 0.5 and sample["block_pairs"]:
+        a, b = rng.choice(sample["block_pairs"])
+    else:
+        a, b = rng.choice(sample["social_users"]), rng.choice(sample["recipients"])
+    return {"a": a, "b": b}
+
+FRIEND_SUGGESTIONS_SQL = f"""
+    WITH friends(friend_id) AS ({FRIENDS_SQL})
+    SELECT fof.friend_id, COUNT(*) AS mutual FROM friends f
+    JOIN (
+        SELECT sender_id AS user_id, receiver_id AS friend_id FROM dnd_blog_friendship WHERE status = 'accepted'
+        UNION ALL
+        SELECT receiver_id, sender_id FROM dnd_blog_friendship WHERE status = 'accepted'
+    ) fof ON fof.user_id = f.friend_id
+    WHERE fof.friend_id != :user AND fof.friend_id NOT IN (SELECT friend_id FROM friends)
+      AND fof.friend_id NOT IN ({BLOCKED_AUTHORS_SQL})
+    GROUP BY fof.friend_id ORDER BY mutual DESC, fof.friend_id LIMIT 10
+"""
+
+def _search(words, viewer=None):
+    """Named parameters of SEARCH_POSTS_SQL/SEARCH_COMMENTS_SQL for the first page of a search"""
+    return {"query": " ".join(f'"{word}"' for word in words), "viewer": viewer, "after_rank": float("-inf"),
+            "after_id": 0, "limit": 21, "open": "<mark>", "close": "</mark>"}
+
+BENCHMARKS = [
+    Benchmark(
+        "friends_feed",
+        "Newest 20 posts visible to a user from their accepted friends, minus blocks",
+        f"""
+        SELECT p.id, p.title, p.author_id, p.created_at FROM dnd_blog_post p
+        WHERE p.author_id IN ({FRIENDS_SQL})
+          AND p.visibility IN ('public', 'friends')
+          AND p.author_id NOT IN ({BLOCKED_AUTHORS_SQL})
+        ORDER BY p.created_at DESC LIMIT 20
+        """,
+        lambda rng, sample: {"user": rng.choice(sample["social_users"])}
+    ),
+    Benchmark(
+        "friends_feed_materialized",
+        "The same feed page read from dnd_blog_feed (sqlite_manager.py feed install)",
+        """
+        SELECT p.id, p.title, p.author_id, p.created_at FROM dnd_blog_feed f
+        JOIN dnd_blog_post p ON p.id = f.post_id
+        WHERE f.user_id = :user ORDER BY f.created_at DESC LIMIT 20
+        """,
+        lambda rng, sample: {"user": rng.choice(sample["social_users"])}
+    ),
+    Benchmark(
+        "public_posts_offset_p1",
+        "Page 1 of the public post listing with LIMIT/OFFSET",
+        """
+        SELECT id, title, author_id, created_at FROM dnd_blog_post WHERE visibility = 'public'
+        ORDER BY created_at DESC, id DESC LIMIT 20 OFFSET 0
+        """,
+        lambda rng, sample: {}
+    ),
+    Benchmark(
+        "public_posts_offset_p1000",
+        "Page 1000 of the public post listing with LIMIT/OFFSET",
+        """
+        SELECT id, title, author_id, created_at FROM dnd_blog_post WHERE visibility = 'public'
+        ORDER BY created_at DESC, id DESC LIMIT 20 OFFSET 19980
+        """,
+        lambda rng, sample: {}
+    ),
+    Benchmark(
+        "public_posts_keyset_p1",
+        "Page 1 of the public post listing with a (created_at, id) cursor (sqlite_manager.py page indexes)",
+        """
+        SELECT id, title, author_id, created_at FROM dnd_blog_post WHERE visibility = 'public'
+        ORDER BY created_at DESC, id DESC LIMIT 21
+        """,
+        lambda rng, sample: {}
+    ),
+    Benchmark(
+        "public_posts_keyset_p1000",
+        "Page 1000 of the public post listing with a (created_at, id) cursor",
+        """
+        SELECT id, title, author_id, created_at FROM dnd_blog_post WHERE visibility = 'public'
+          AND (created_at, id) < (:created_at, :id)
+        ORDER BY created_at DESC, id DESC LIMIT 21
+        """,
+        lambda rng, sample: sample["page_1000_cursor"]
+    ),
+    Benchmark(
+        "post_like_count",
+        "Like count for one post",
+        "SELECT COUNT(*) FROM dnd_blog_post_likes WHERE post_id = :post",
+        lambda rng, sample: {"post": rng.randint(*sample["post_range"])}
+    ),
+    Benchmark(
+        "feed_like_counts",
+        "Like counts for a page of 20 posts",
+        """
+        SELECT post_id, COUNT(*) FROM dnd_blog_post_likes
+        WHERE post_id BETWEEN :post AND :post + 19 GROUP BY post_id
+        """,
+        lambda rng, sample: {"post": rng.randint(*sample["post_range"])}
+    ),
+    Benchmark(
+        "feed_counts_aggregate",
+        "Like and comment counts for a page of 20 posts, counted from the likes and comments tables",
+        """
+        SELECT p.id, p.title,
+               (SELECT COUNT(*) FROM dnd_blog_post_likes WHERE post_id = p.id),
+               (SELECT COUNT(*) FROM dnd_blog_comment WHERE post_id = p.id)
+        FROM dnd_blog_post p WHERE p.id BETWEEN :post AND :post + 19
+        """,
+        lambda rng, sample: {"post": rng.randint(*sample["post_range"])}
+    ),
+    Benchmark(
+        "feed_counts_denormalized",
+        "The same page read from like_count/comment_count (sqlite_manager.py counters install)",
+        """
+        SELECT id, title, like_count, comment_count FROM dnd_blog_post
+        WHERE id BETWEEN :post AND :post + 19
+        """,
+        lambda rng, sample: {"post": rng.randint(*sample["post_range"])}
+    ),
+    Benchmark(
+        "unread_notification_count",
+        "Notification badge: unread notifications for a user",
+        "SELECT COUNT(*) FROM dnd_blog_notification WHERE recipient_id = :user AND is_read = 0",
+        lambda rng, sample: {"user": rng.choice(sample["recipients"])}
+    ),
+    Benchmark(
+        "unread_count_heavy",
+        "Notification badge for the users with the most notifications, counted",
+        "SELECT COUNT(*) FROM dnd_blog_notification WHERE recipient_id = :user AND is_read = 0",
+        lambda rng, sample: {"user": rng.choice(sample["heavy_recipients"])}
+    ),
+    Benchmark(
+        "unread_count_cached",
+        "Notification badge read from dnd_blog_unread (sqlite_manager.py unread install)",
+        "SELECT unread FROM dnd_blog_unread WHERE user_id = :user",
+        lambda rng, sample: {"user": rng.choice(sample["recipients"])}
+    ),
+    Benchmark(
+        "unread_count_cached_heavy",
+        "Notification badge for the users with the most notifications, from dnd_blog_unread",
+        "SELECT unread FROM dnd_blog_unread WHERE user_id = :user",
+        lambda rng, sample: {"user": rng.choice(sample["heavy_recipients"])}
+    ),
+    Benchmark(
+        "notification_page",
+        "Newest 20 notifications for a user",
+        """
+        SELECT id, notification_type, sender_id, post_id, is_read, created_at
+        FROM dnd_blog_notification WHERE recipient_id = :user
+        ORDER BY created_at DESC LIMIT 20
+        """,
+        lambda rng, sample: {"user": rng.choice(sample["recipients"])}
+    ),
+    Benchmark(
+        "post_comments",
+        "Comments under a post, oldest first",
+        """
+        SELECT id, author_id, content, created_at FROM dnd_blog_comment
+        WHERE post_id = :post ORDER BY created_at
+        """,
+        lambda rng, sample: {"post": rng.randint(*sample["post_range"])}
+    ),
+    Benchmark(
+        "are_friends_query",
+        "Are two users friends, queried from dnd_blog_friendship",
+        """
+        SELECT 1 FROM dnd_blog_friendship WHERE status = 'accepted'
+          AND ((sender_id = :a AND receiver_id = :b) OR (sender_id = :b AND receiver_id = :a))
+        """,
+        _user_pair
+    ),
+    Benchmark(
+        "is_blocked_query",
+        "Has either of two users blocked the other, queried from dnd_blog_userblock",
+        """
+        SELECT 1 FROM dnd_blog_userblock
+        WHERE (blocker_id = :a AND blocked_id = :b) OR (blocker_id = :b AND blocked_id = :a)
+        """,
+        _block_pair
+    ),
+    Benchmark(
+        "friend_list_query",
+        "A user's accepted friends, queried with sender_id = ? OR receiver_id = ?",
+        """
+        SELECT CASE WHEN sender_id = :user THEN receiver_id ELSE sender_id END FROM dnd_blog_friendship
+        WHERE (sender_id = :user OR receiver_id = :user) AND status = 'accepted'
+        """,
+        lambda rng, sample: {"user": rng.choice(sample["social_users"])}
+    ),
+    Benchmark(
+        "friend_suggestions_query",
+        "Top 10 friends of friends by mutual friends, minus blocks, in SQL",
+        FRIEND_SUGGESTIONS_SQL,
+        lambda rng, sample: {"user": rng.choice(sample["social_users"])}
+    ),
+    Benchmark(
+        "public_feed_block_filter",
+        "Newest 20 public posts, minus authors the user blocked or was blocked by",
+        f"""
+        SELECT p.id, p.title, p.author_id, p.created_at FROM dnd_blog_post p
+        WHERE p.visibility = 'public' AND p.author_id NOT IN ({BLOCKED_AUTHORS_SQL})
+        ORDER BY p.created_at DESC LIMIT 20
+        """,
+        lambda rng, sample: {"user": rng.choice(sample["blockers"])}
+    ),
+    Benchmark(
+        "search_title_like",
+        "Posts whose title contains a post number, found with LIKE (full table scan)",
+        "SELECT id, title FROM dnd_blog_post WHERE title LIKE '%#' || :number LIMIT 21",
+        lambda rng, sample: {"number": str(rng.randint(*sample["post_range"]))}
+    ),
+    Benchmark(
+        "search_rare_word",
+        "Ranked search for a post number, one match (sqlite_manager.py search-index)",
+        SEARCH_POSTS_SQL,
+        lambda rng, sample: _search([str(rng.randint(*sample["post_range"]))])
+    ),
+    Benchmark(
+        "search_common_words",
+        "First page of a ranked, highlighted search for two common words, as a logged-in user",
+        SEARCH_POSTS_SQL,
+        lambda rng, sample: _search(rng.sample(WORDS, 2), rng.choice(sample["blockers"]))
+    ),
+    Benchmark(
+        "search_three_words",
+        "First page of a ranked search for three common words, as a logged-in user",
+        SEARCH_POSTS_SQL,
+        lambda rng, sample: _search(rng.sample(WORDS, 3), rng.choice(sample["blockers"]))
+    ),
+    Benchmark(
+        "search_comments",
+        "First page of a ranked search of comments for two common words, anonymously",
+        SEARCH_COMMENTS_SQL,
+        lambda rng, sample: _search(rng.sample(WORDS, 2))
+    ),
+]
+
+GRAPH_BENCHMARKS = [
+    GraphBenchmark("are_friends_cached", "are_friends_query answered by SocialGraph",
+                   lambda graph, p: int(graph.are_friends(p["a"], p["b"])), _user_pair),
+    GraphBenchmark("is_blocked_cached", "is_blocked_query answered by SocialGraph",
+                   lambda graph, p: int(graph.is_blocked(p["a"], p["b"])), _block_pair),
+    GraphBenchmark("friend_list_cached", "friend_list_query answered by SocialGraph",
+                   lambda graph, p: len(graph.friends(p["user"])),
+                   lambda rng, sample: {"user": rng.choice(sample["social_users"])}),
+    GraphBenchmark("friend_suggestions_cached", "friend_suggestions_query answered by SocialGraph",
+                   lambda graph, p: len(graph.suggestions(p["user"])),
+                   lambda rng, sample: {"user": rng.choice(sample["social_users"])}),
+]
+
+def _notifications(rng, sample, count):
+    """Rows for NOTIFICATION_INSERT_SQL"""
+    low, high = sample["post_range"]
+    return [("post_like", 0, "2026-01-01 00:00:00.000000", None, rng.choice(sample["recipients"]),
+             rng.choice(sample["recipients"]), rng.randint(low, high)) for _ in range(count)]
+
+NOTIFICATION_INSERT_SQL = """
+    INSERT INTO dnd_blog_notification
+        (notification_type, is_read, created_at, comment_id, recipient_id, sender_id, post_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _insert_and_commit(conn, params):
+    conn.executemany(NOTIFICATION_INSERT_SQL, params["rows"])
+    conn.commit()
+    return len(params["rows"])
+
+WRITE_BENCHMARKS = [
+    WriteBenchmark("notification_commit_each", "One notification inserted and committed, as a request does",
+                   _insert_and_commit, lambda rng, sample: {"rows": _notifications(rng, sample, 1)}),
+    WriteBenchmark("notification_bulk_batch", "5,000 notifications inserted and committed as one batch",
+                   _insert_and_commit, lambda rng, sample: {"rows": _notifications(rng, sample, 5000)}),
+]
+
+# Read benchmarks in the profile matrix: large scans, index-heavy joins and point lookups
+PROFILE_READ_BENCHMARKS = ("public_posts_offset_p1000", "friends_feed", "feed_counts_aggregate",
+                           "unread_count_heavy", "post_comments", "friend_suggestions_query")
+
+def load_sample(conn, rng, size=500):
+    """Pick the users and posts the benchmarks draw their parameters from"""
+    def column(sql):
+        values = [row[0] for row in conn.execute(sql)]
+        return rng.sample(values, min(size, len(values))) if values else [0]
+    
+    def pairs(sql):
+        values = conn.execute(sql).fetchall()
+        return rng.sample(values, min(size, len(values))) if values else [(0, 0)]
+    
+    low, high = conn.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM dnd_blog_post").fetchone()
+    # Where page 1000 of the public listing starts, as a keyset cursor
+    page_1000 = conn.execute("""
+        SELECT created_at, id FROM dnd_blog_post WHERE visibility = 'public'
+        ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET 19979
+    """).fetchone() or ("", 0)
+    return {
+        "post_range": (low, high),
+        "page_1000_cursor": {"created_at": page_1000[0], "id": page_1000[1]},
+        "social_users": column("SELECT DISTINCT sender_id FROM dnd_blog_friendship WHERE status = 'accepted'"),
+        "recipients": column("SELECT id FROM auth_user"),
+        "heavy_recipients": column("""
+            SELECT recipient_id FROM dnd_blog_notification GROUP BY recipient_id ORDER BY COUNT(*) DESC LIMIT 5
+        """),
+        "blockers": column("SELECT blocker_id FROM dnd_blog_userblock"),
+        "friend_pairs": pairs("SELECT sender_id, receiver_id FROM dnd_blog_friendship WHERE status = 'accepted'"),
+        "block_pairs": pairs("SELECT blocker_id, blocked_id FROM dnd_blog_userblock")
+    }
+
+def run_benchmark(conn, benchmark, sample, rng, iterations=200, max_seconds=10.0):
+    """
+    Time one benchmark
+    
+    Args:
+        conn (sqlite3.Connection): Database connection
+        benchmark (Benchmark): Query to time
+        sample (dict): Parameter pools from load_sample()
+        rng (random.Random): Source of parameters
+        iterations (int): Number of timed runs
+        max_seconds (float): Stop early once this much time has been spent
+    
+    Returns:
+        dict: Latency percentiles in ms, ops/sec and rows/sec
+    """
+    return measure(lambda params: len(conn.execute(benchmark.sql, params).fetchall()),
+                   benchmark.params, sample, rng, iterations, max_seconds)
+
+def measure(run, make_params, sample, rng, iterations=200, max_seconds=10.0):
+    """
+    Time repeated calls of run(params), which returns the number of rows it produced
+    
+    Returns:
+        dict: Latency percentiles in ms, ops/sec and rows/sec
+    """
+    run(make_params(rng, sample))  # warm-up
+    latencies = []
+    rows = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        params = make_params(rng, sample)
+        start = time.perf_counter()
+        rows += run(params)
+        latencies.append(time.perf_counter() - start)
+        if time.perf_counter() - started > max_seconds:
+            break
+    
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "iterations": len(latencies),
+        "rows": rows,
+        "mean_ms": total / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "ops_per_sec": len(latencies) / total if total else 0.0,
+        "rows_per_sec": rows / total if total else 0.0
+    }
+
+def table_counts(conn):
+    """Row counts of the tables the benchmarks read"""
+    counts = {}
+    for table in ("auth_user", "dnd_blog_post", "dnd_blog_post_likes", "dnd_blog_comment",
+                  "dnd_blog_friendship", "dnd_blog_userblock", "dnd_blog_notification"):
+        counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compare p95 latencies with an earlier run
+    
+    Returns:
+        list: Names of benchmarks whose p95 grew by more than threshold
+    """
+    regressions = []
+    print(f"\nComparison with baseline (regression threshold: +{threshold:.0%} p95)")
+    print(f"{'Benchmark':<28} | {'Base p95':>9} | {'New p95':>9} | {'Change':>8}")
+    print("-" * 64)
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            print(f"{name:<28} | {'-':>9} | {result['p95_ms']:>9.3f} | {'new':>8}")
+            continue
+        change = result["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28} | {old['p95_ms']:>9.3f} | {result['p95_ms']:>9.3f} | {change:>+7.0%}{flag}")
+    return regressions
+
+def run_suite(db_name, output="bench_results.json", baseline=None, only=None,
+              iterations=200, max_seconds=10.0, threshold=0.2, seed=1234, graph_budget_mb=None):
+    """
+    Run the benchmark suite and write its results to a JSON file
+    
+    With graph_budget_mb, the SocialGraph cache is loaded with that memory budget
+    and its benchmarks run too.
+    
+    Returns:
+        bool: False if the run failed or a regression was flagged
+    """
+    if not os.path.exists(db_name):
+        print(f"Error: database not found: {db_name}")
+        print("Build one with: python sqlite_manager.py synth")
+        return False
+    
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    conn = manager.conn
+    rng = random.Random(seed)
+    sample = load_sample(conn, rng)
+    
+    graph = graph_stats = None
+    if graph_budget_mb is not None:
+        graph = SocialGraph(conn, graph_budget_mb)
+        start = time.perf_counter()
+        graph.load()
+        graph_stats = {"load_seconds": time.perf_counter() - start, "budget_mb": graph_budget_mb}
+    
+    selected = [b for b in BENCHMARKS if not only or b.name in only]
+    if graph:
+        selected += [b for b in GRAPH_BENCHMARKS if not only or b.name in only]
+    results = {}
+    print(f"\n{'Benchmark':<28} | {'Runs':>5} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'Rows/sec':>11}")
+    print("-" * 84)
+    for benchmark in selected:
+        try:
+            if isinstance(benchmark, GraphBenchmark):
+                result = measure(partial(benchmark.run, graph), benchmark.params, sample, rng,
+                                 iterations, max_seconds)
+            else:
+                result = run_benchmark(conn, benchmark, sample, rng, iterations, max_seconds)
+        except sqlite3.Error as e:
+            print(f"{benchmark.name:<28} | error: {e}")
+            continue
+        results[benchmark.name] = result
+        print(f"{benchmark.name:<28} | {result['iterations']:>5} | {result['p50_ms']:>8.3f} | "
+              f"{result['p95_ms']:>8.3f} | {result['p99_ms']:>8.3f} | {result['rows_per_sec']:>11,.0f}")
+    if graph:
+        graph_stats.update(graph.stats())
+    
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "database": os.path.abspath(db_name),
+            "sqlite_version": sqlite3.sqlite_version,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "tables": table_counts(conn),
+            "social_graph": graph_stats
+        },
+        "results": results
+    }
+    manager.disconnect()
+    
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to: {output}")
+    
+    if baseline:
+        try:
+            with open(baseline, encoding="utf-8") as f:
+                regressions = compare(results, json.load(f), threshold)
+        except (OSError, ValueError) as e:
+            print(f"Error reading baseline: {e}")
+            return False
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return False
+    return True
+
+def _remove_database(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def _copy_schema(source, conn):
+    """Create source's tables, indexes and triggers, without rows, in an empty database"""
+    skipped = [name for _, name, kind, *_ in source.execute("PRAGMA table_list") if kind in ("virtual", "shadow")]
+    for kind, sql in source.execute("""
+        SELECT type, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END
+    """):
+        if not any(re.search(rf"\b{re.escape(name)}\b", sql) for name in skipped):
+            conn.execute(sql)
+    conn.commit()
+
+def profile_matrix(db_name, profiles, output="bench_results.json", only=None,
+                   iterations=200, max_seconds=10.0, seed=1234):
+    """
+    Run read and write workloads under each performance profile and print a matrix
+    
+    Reads run against db_name on a fresh connection per profile. Only connection
+    settings are applied there, so the database's journal mode is left alone. Writes
+    run against a scratch copy of db_name's schema created with the full profile, next
+    to db_name so fsync costs match, and removed afterwards.
+    
+    Returns:
+        bool: False if the run failed
+    """
+    if not os.path.exists(db_name):
+        print(f"Error: database not found: {db_name}")
+        print("Build one with: python sqlite_manager.py synth")
+        return False
+    
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    source = manager.conn
+    sample = load_sample(source, random.Random(seed))
+    reads = [b for b in BENCHMARKS if b.name in (only or PROFILE_READ_BENCHMARKS)]
+    writes = [b for b in WRITE_BENCHMARKS if not only or b.name in only]
+    scratch = f"{db_name}.profile-scratch"
+    
+    matrix = {}
+    settings = {}
+    try:
+        for profile in profiles:
+            print(f"\nProfile: {profile}")
+            matrix[profile] = results = {}
+            # Every profile sees the same parameters
+            rng = random.Random(seed)
+            conn = sqlite3.connect(db_name)
+            try:
+                apply_performance_profile(conn, profile, file_settings=False)
+                for benchmark in reads:
+                    try:
+                        results[benchmark.name] = run_benchmark(conn, benchmark, sample, rng, iterations, max_seconds)
+                    except sqlite3.Error as e:
+                        print(f"  {benchmark.name:<28} error: {e}")
+            finally:
+                conn.close()
+            
+            _remove_database(scratch)
+            conn = sqlite3.connect(scratch)
+            try:
+                settings[profile] = apply_performance_profile(conn, profile)
+                _copy_schema(source, conn)
+                for benchmark in writes:
+                    results[benchmark.name] = measure(partial(benchmark.run, conn), benchmark.params, sample, rng,
+                                                      iterations, max_seconds)
+            finally:
+                conn.close()
+                _remove_database(scratch)
+        tables = table_counts(source)
+    except sqlite3.Error as e:
+        print(f"Error running profile matrix: {e}")
+        return False
+    finally:
+        manager.disconnect()
+    
+    names = [b.name for b in reads + writes]
+    header = f"{'p50 ms':<28} | " + " | ".join(f"{profile:>10}" for profile in profiles)
+    print(f"\n{header}\n{'-' * len(header)}")
+    for name in names:
+        cells = [f"{matrix[p][name]['p50_ms']:>10.3f}" if name in matrix[p] else f"{'-':>10}" for p in profiles]
+        print(f"{name:<28} | " + " | ".join(cells))
+    print(f"\n{'Rows/sec written':<28} | " + " | ".join(f"{profile:>10}" for profile in profiles))
+    for benchmark in writes:
+        print(f"{benchmark.name:<28} | " + " | ".join(f"{matrix[p][benchmark.name]['rows_per_sec']:>10,.0f}"
+                                                     for p in profiles))
+    
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "database": os.path.abspath(db_name),
+            "sqlite_version": sqlite3.sqlite_version,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "tables": tables,
+            "profiles": settings
+        },
+        "matrix": matrix
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to: {output}")
+    return True
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark the D&D&D blog's database hot paths")
+    parser.add_argument("db", nargs="?", default="synthetic.sqlite3", help="database to benchmark")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="flag a regression when p95 grows by more than this fraction")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="time budget per benchmark")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only these benchmarks")
+    parser.add_argument("--graph", type=float, nargs="?", const=256, metavar="MB",
+                        help="also benchmark the in-memory SocialGraph, with this memory budget")
+    parser.add_argument("--profiles", nargs="*", choices=list(PERFORMANCE_PROFILES), metavar="PROFILE",
+                        help="instead of the suite, run a profile x workload matrix (default: every profile)")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    args = parser.parse_args()
+    
+    if args.list:
+        for benchmark in BENCHMARKS + GRAPH_BENCHMARKS + WRITE_BENCHMARKS:
+            print(f"  {benchmark.name:<28} {benchmark.description}")
+        return
+    if args.profiles is not None:
+        ok = profile_matrix(args.db, args.profiles or list(PERFORMANCE_PROFILES), args.output, args.only,
+                            args.iterations, args.max_seconds)
+        sys.exit(0 if ok else 1)
+    
+    ok = run_suite(args.db, args.output, args.baseline, args.only,
+                   args.iterations, args.max_seconds, args.threshold, graph_budget_mb=args.graph)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
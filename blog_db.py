@@ -0,0 +1,2319 @@
+"""
+Database tooling for the D&D&D blog schema (the dnd_blog_* tables in db.sqlite3)
+
+These helpers work on the SQLite file directly through SQLiteManager, so they run
+without Django. The commands are exposed through sqlite_manager.py.
+"""
+import base64
+import codecs
+import fnmatch
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from heapq import nlargest
+from html.parser import HTMLParser
+from itertools import accumulate
+
+from sqlite_manager import SQLiteManager, percentile
+
+# Values the blog stores in its choice fields
+VISIBILITY_PUBLIC = "public"
+VISIBILITY_FRIENDS = "friends"
+VISIBILITY_PRIVATE = "private"
+FRIENDSHIP_ACCEPTED = "accepted"
+FRIENDSHIP_PENDING = "pending"
+NOTIFICATION_LIKE = "post_like"
+NOTIFICATION_COMMENT = "post_comment"
+NOTIFICATION_FRIEND_REQUEST = "friend_request"
+
+# Synthetic activity covers the two years up to this time (2026-01-01 UTC), so runs are reproducible
+SYNTH_END = 1767225600
+
+# Tables the synthetic generator fills
+SYNTH_TABLES = [
+    "auth_user", "dnd_blog_userprofile", "dnd_blog_post", "dnd_blog_post_likes",
+    "dnd_blog_comment", "dnd_blog_friendship", "dnd_blog_userblock", "dnd_blog_notification"
+]
+
+WORDS = (
+    "dragon goblin tavern dungeon paladin rogue wizard cleric bard druid ranger warlock "
+    "sword shield potion scroll amulet ring quest campaign map lore realm kingdom keep "
+    "castle forest swamp mountain cavern portal artifact curse prophecy lich beholder "
+    "owlbear mimic tarrasque initiative saving throw critical hit natural twenty session "
+    "homebrew encounter loot treasure villain patron guild party backstory alignment"
+).split()
+
+# Formats a UNIX time the way Django stores datetimes; done in SQLite because it's far
+# cheaper than strftime in Python for millions of rows
+TIMESTAMP_SQL = "strftime('%Y-%m-%d %H:%M:%f', ?, 'unixepoch')"
+
+# Cheap deterministic per-row hash, so SQL-generated rows are the same for every run
+ROW_HASH_SQL = "(({id} * 2654435761) % 4294967291)"
+
+NOTIFY_LIKES_SQL = f"""
+    INSERT INTO dnd_blog_notification
+        (notification_type, is_read, created_at, comment_id, recipient_id, sender_id, post_id)
+    SELECT ?, {ROW_HASH_SQL.format(id="l.id")} % 100 < 80,
+           strftime('%Y-%m-%d %H:%M:%f', p.created_at, '+' || ({ROW_HASH_SQL.format(id="l.id")} % 604800) || ' seconds'),
+           NULL, p.author_id, l.user_id, p.id
+    FROM dnd_blog_post_likes l JOIN dnd_blog_post p ON p.id = l.post_id
+    WHERE l.id > ? AND l.user_id != p.author_id
+"""
+
+NOTIFY_COMMENTS_SQL = f"""
+    INSERT INTO dnd_blog_notification
+        (notification_type, is_read, created_at, comment_id, recipient_id, sender_id, post_id)
+    SELECT ?, {ROW_HASH_SQL.format(id="c.id")} % 100 < 80, c.created_at, c.id, p.author_id, c.author_id, p.id
+    FROM dnd_blog_comment c JOIN dnd_blog_post p ON p.id = c.post_id
+    WHERE c.id >= ? AND c.author_id != p.author_id
+"""
+
+# Counter columns on dnd_blog_post and the (child table, column) each one counts
+POST_COUNTERS = {
+    "like_count": "dnd_blog_post_likes",
+    "comment_count": "dnd_blog_comment"
+}
+
+COUNTER_TRIGGER_SUFFIXES = ("insert", "delete", "move")
+
+COUNTER_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table}
+    BEGIN
+        UPDATE dnd_blog_post SET {column} = {column} + 1 WHERE id = NEW.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table}
+    BEGIN
+        UPDATE dnd_blog_post SET {column} = {column} - 1 WHERE id = OLD.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_count_move AFTER UPDATE OF post_id ON {table}
+    WHEN OLD.post_id != NEW.post_id
+    BEGIN
+        UPDATE dnd_blog_post SET {column} = {column} - 1 WHERE id = OLD.post_id;
+        UPDATE dnd_blog_post SET {column} = {column} + 1 WHERE id = NEW.post_id;
+    END
+    """
+]
+
+# Unread notification count per user, for the notification badge. Like the other
+# tables here, it has no foreign key: Django's delete collector doesn't know about
+# it, so one would stop users being deleted. A trigger removes the row instead.
+UNREAD_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS dnd_blog_unread (
+        user_id integer NOT NULL PRIMARY KEY,
+        unread integer NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dnd_blog_unread_user_delete AFTER DELETE ON auth_user
+    BEGIN
+        DELETE FROM dnd_blog_unread WHERE user_id = OLD.id;
+    END
+    """,
+    # Serves the recount in repair_unread() and mark_read()'s single UPDATE
+    "CREATE INDEX IF NOT EXISTS dnd_blog_notification_recipient_unread "
+    "ON dnd_blog_notification (recipient_id, is_read)",
+    """
+    CREATE TRIGGER IF NOT EXISTS dnd_blog_notification_unread_insert AFTER INSERT ON dnd_blog_notification
+    WHEN NOT NEW.is_read
+    BEGIN
+        INSERT INTO dnd_blog_unread (user_id, unread) VALUES (NEW.recipient_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dnd_blog_notification_unread_delete AFTER DELETE ON dnd_blog_notification
+    WHEN NOT OLD.is_read
+    BEGIN
+        UPDATE dnd_blog_unread SET unread = unread - 1 WHERE user_id = OLD.recipient_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dnd_blog_notification_unread_update
+    AFTER UPDATE OF is_read, recipient_id ON dnd_blog_notification
+    WHEN OLD.is_read != NEW.is_read OR OLD.recipient_id != NEW.recipient_id
+    BEGIN
+        UPDATE dnd_blog_unread SET unread = unread - 1 WHERE user_id = OLD.recipient_id AND NOT OLD.is_read;
+        INSERT INTO dnd_blog_unread (user_id, unread) SELECT NEW.recipient_id, 1 WHERE NOT NEW.is_read
+        ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+    END
+    """
+]
+
+# Newest feed entries kept per user. Fanning every post out to every friend would
+# take billions of rows on a large graph; pages past this depth query the friendships live.
+FEED_DEPTH = 200
+
+FEED_VISIBILITY = f"('{VISIBILITY_PUBLIC}', '{VISIBILITY_FRIENDS}')"
+
+# Accepted friends of {user} (an SQL expression) that neither blocked nor were blocked by them
+FEED_FRIENDS_SQL = f"""
+    SELECT friend_id FROM (
+        SELECT receiver_id AS friend_id FROM dnd_blog_friendship
+        WHERE sender_id = {{user}} AND status = '{FRIENDSHIP_ACCEPTED}'
+        UNION ALL
+        SELECT sender_id FROM dnd_blog_friendship
+        WHERE receiver_id = {{user}} AND status = '{FRIENDSHIP_ACCEPTED}'
+    )
+    WHERE NOT EXISTS (
+        SELECT 1 FROM dnd_blog_userblock
+        WHERE (blocker_id = friend_id AND blocked_id = {{user}}) OR (blocker_id = {{user}} AND blocked_id = friend_id)
+    )
+"""
+
+# Puts {author}'s newest posts into {viewer}'s feed if they are friends and neither
+# blocked the other. The feed's own triggers cut it back to its newest entries.
+FEED_LINK_SQL = f"""
+    INSERT OR IGNORE INTO dnd_blog_feed (user_id, post_id, created_at)
+    SELECT {{viewer}}, id, created_at FROM dnd_blog_post
+    WHERE author_id = {{author}} AND visibility IN {FEED_VISIBILITY}
+      AND {{author}} IN ({FEED_FRIENDS_SQL.format(user="{viewer}")})
+    ORDER BY created_at DESC, id DESC LIMIT {{depth}};
+"""
+
+# Takes {author}'s posts out of {viewer}'s feed
+FEED_UNLINK_SQL = """
+    DELETE FROM dnd_blog_feed WHERE user_id = {viewer} AND post_id IN (
+        SELECT f.post_id FROM dnd_blog_feed f JOIN dnd_blog_post p ON p.id = f.post_id
+        WHERE f.user_id = {viewer} AND p.author_id = {author}
+    );
+"""
+
+# Adds NEW to its author's friends' feeds
+FEED_FAN_OUT_SQL = f"""
+    INSERT OR IGNORE INTO dnd_blog_feed (user_id, post_id, created_at)
+    SELECT friend_id, NEW.id, NEW.created_at FROM ({FEED_FRIENDS_SQL.format(user="NEW.author_id")})
+    WHERE NEW.visibility IN {FEED_VISIBILITY};
+"""
+
+FEED_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS dnd_blog_feed (
+        user_id integer NOT NULL,
+        post_id integer NOT NULL,
+        created_at datetime NOT NULL,
+        PRIMARY KEY (user_id, created_at, post_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS dnd_blog_feed_post_id ON dnd_blog_feed (post_id)",
+    # Rows per user, and the newest (created_at, post_id) ever cut from their feed.
+    # Every visible post newer than the horizon is in the feed; older ones may not be.
+    """
+    CREATE TABLE IF NOT EXISTS dnd_blog_feed_state (
+        user_id integer NOT NULL PRIMARY KEY,
+        size integer NOT NULL DEFAULT 0,
+        horizon_created_at datetime,
+        horizon_post_id integer
+    )
+    """,
+    # Friendship changes pull in an author's newest posts
+    "CREATE INDEX IF NOT EXISTS dnd_blog_post_author_created ON dnd_blog_post (author_id, created_at)"
+]
+
+def _feed_pair_sql(template, a, b, depth=FEED_DEPTH):
+    """template applied both ways round for users a and b"""
+    return (template.format(viewer=a, author=b, depth=depth) +
+            template.format(viewer=b, author=a, depth=depth))
+
+def feed_row_triggers(depth=FEED_DEPTH):
+    """
+    (name, body) of the triggers on dnd_blog_feed itself
+    
+    They keep dnd_blog_feed_state's sizes, cut a feed that grows past depth by its
+    oldest row, moving the horizon up to it, and ignore rows at or below the
+    horizon. A post older than rows already cut (a backdated post, or an old one
+    of a new friend) would otherwise sit below a gap, and feed_page() would skip
+    the posts missing from it.
+    """
+    return [
+        ("dnd_blog_feed_row_before_insert", "BEFORE INSERT ON dnd_blog_feed",
+         "SELECT RAISE(IGNORE) FROM dnd_blog_feed_state WHERE user_id = NEW.user_id "
+         "AND (NEW.created_at, NEW.post_id) <= (horizon_created_at, horizon_post_id);"),
+        ("dnd_blog_feed_row_insert", "AFTER INSERT ON dnd_blog_feed", f"""
+            INSERT INTO dnd_blog_feed_state (user_id, size) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET size = size + 1;
+            UPDATE dnd_blog_feed_state SET (horizon_created_at, horizon_post_id) = (
+                SELECT created_at, post_id FROM dnd_blog_feed WHERE user_id = NEW.user_id
+                ORDER BY created_at, post_id LIMIT 1
+            ) WHERE user_id = NEW.user_id AND size > {depth};
+            DELETE FROM dnd_blog_feed WHERE user_id = NEW.user_id AND (created_at, post_id) = (
+                SELECT horizon_created_at, horizon_post_id FROM dnd_blog_feed_state
+                WHERE user_id = NEW.user_id AND size > {depth}
+            );
+        """),
+        ("dnd_blog_feed_row_delete", "AFTER DELETE ON dnd_blog_feed",
+         "UPDATE dnd_blog_feed_state SET size = size - 1 WHERE user_id = OLD.user_id;")
+    ]
+
+def feed_triggers(depth=FEED_DEPTH):
+    """(name, body) of the triggers that keep dnd_blog_feed in step with the blog tables"""
+    accepted = f"'{FRIENDSHIP_ACCEPTED}'"
+    link = lambda a, b: _feed_pair_sql(FEED_LINK_SQL, a, b, depth)
+    unlink = lambda a, b: _feed_pair_sql(FEED_UNLINK_SQL, a, b)
+    fan_out = FEED_FAN_OUT_SQL
+    # Django's save() writes every column, so UPDATE OF alone would fire on any edit
+    moved = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in ("visibility", "created_at", "author_id"))
+    # An accepted request the other way keeps the pair friends
+    single = ("NOT EXISTS (SELECT 1 FROM dnd_blog_friendship WHERE sender_id = OLD.receiver_id "
+              f"AND receiver_id = OLD.sender_id AND status = {accepted})")
+    return [
+        ("dnd_blog_feed_post_insert", "AFTER INSERT ON dnd_blog_post", fan_out),
+        ("dnd_blog_feed_post_update", f"AFTER UPDATE OF visibility, created_at, author_id ON dnd_blog_post WHEN {moved}",
+         "DELETE FROM dnd_blog_feed WHERE post_id = OLD.id;" + fan_out),
+        ("dnd_blog_feed_post_delete", "AFTER DELETE ON dnd_blog_post",
+         "DELETE FROM dnd_blog_feed WHERE post_id = OLD.id;"),
+        ("dnd_blog_feed_friend_insert", f"AFTER INSERT ON dnd_blog_friendship WHEN NEW.status = {accepted}",
+         link("NEW.sender_id", "NEW.receiver_id")),
+        ("dnd_blog_feed_friend_accept", f"AFTER UPDATE OF status ON dnd_blog_friendship "
+         f"WHEN NEW.status = {accepted} AND OLD.status != {accepted}", link("NEW.sender_id", "NEW.receiver_id")),
+        ("dnd_blog_feed_friend_end", f"AFTER UPDATE OF status ON dnd_blog_friendship "
+         f"WHEN OLD.status = {accepted} AND NEW.status != {accepted} AND {single}",
+         unlink("OLD.sender_id", "OLD.receiver_id")),
+        ("dnd_blog_feed_friend_delete", f"AFTER DELETE ON dnd_blog_friendship WHEN OLD.status = {accepted} AND {single}",
+         unlink("OLD.sender_id", "OLD.receiver_id")),
+        ("dnd_blog_feed_block_insert", "AFTER INSERT ON dnd_blog_userblock",
+         unlink("NEW.blocker_id", "NEW.blocked_id")),
+        ("dnd_blog_feed_block_delete", "AFTER DELETE ON dnd_blog_userblock",
+         link("OLD.blocker_id", "OLD.blocked_id"))
+    ]
+
+# Composite indexes behind the keyset-paginated listings. SQLite appends the rowid
+# (the id) to every index entry, so (x, created_at) also orders by (created_at, id).
+KEYSET_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS dnd_blog_post_visibility_created ON dnd_blog_post (visibility, created_at)",
+    "CREATE INDEX IF NOT EXISTS dnd_blog_post_author_created ON dnd_blog_post (author_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS dnd_blog_post_category_created ON dnd_blog_post (category_id, visibility, created_at)",
+    "CREATE INDEX IF NOT EXISTS dnd_blog_comment_post_created ON dnd_blog_comment (post_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS dnd_blog_notification_recipient_created "
+    "ON dnd_blog_notification (recipient_id, created_at)"
+]
+
+# Full-text indexes over post titles and content and comment content. They are
+# external-content FTS5 tables, so the text itself is only stored once, in the blog tables.
+SEARCH_TABLES = {
+    "dnd_blog_post_fts": ("dnd_blog_post", ["title", "content"]),
+    "dnd_blog_comment_fts": ("dnd_blog_comment", ["content"])
+}
+
+def search_schema(fts, table, columns):
+    """CREATE statements for one FTS5 table and the triggers that keep it in sync"""
+    cols = ", ".join(columns)
+    new = ", ".join(f"NEW.{col}" for col in columns)
+    old = ", ".join(f"OLD.{col}" for col in columns)
+    add = f"INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new});"
+    remove = f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old});"
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2')""",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN {remove} {add} END"
+    ]
+
+def _power_law(rng, mean, alpha=1.6, cap=None):
+    """Draw a non-negative integer from a Pareto distribution with roughly the given mean"""
+    value = int(mean * (alpha - 1) / alpha * rng.paretovariate(alpha))
+    return min(value, cap) if cap is not None else value
+
+def _next_id(conn, table):
+    return (conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]) + 1
+
+def copy_database(source, target):
+    """Copy a whole database file with the SQLite backup API"""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+def synthesize(db_name="synthetic.sqlite3", template="db.sqlite3", users=10000, posts=200000,
+               likes_per_post=3, comments_per_post=1, friends_per_user=10, blocks_per_user=0.02,
+               seed=42, chunk_size=20000):
+    """
+    Build a load-testing database with the blog schema and skewed synthetic data
+    
+    The template database is copied first, so its schema, migrations, categories and
+    accounts are kept and synthetic rows are appended after them. The same seed and
+    template always produce the same database.
+    
+    Args:
+        db_name (str): Database to create. Any existing file is replaced.
+        template (str): Database whose schema and rows are copied
+        users (int): Number of users to add
+        posts (int): Number of posts to add; authors follow a Zipf distribution
+        likes_per_post (float): Mean likes per post, Pareto distributed
+        comments_per_post (float): Mean comments per post, Pareto distributed
+        friends_per_user (float): Mean friendships per user, to popular users more often
+        blocks_per_user (float): Mean blocks per user
+        seed (int): Random seed
+        chunk_size (int): Posts generated and committed per transaction
+    
+    Returns:
+        bool: True if the database was built
+    """
+    if users < 2 or posts < 0 or min(likes_per_post, comments_per_post, friends_per_user, blocks_per_user) < 0:
+        print("Error: synthesize needs at least 2 users and no negative counts")
+        return False
+    if chunk_size < 1:
+        print("Error: chunk_size must be at least 1")
+        return False
+    if os.path.abspath(db_name) == os.path.abspath(template):
+        print("Error: refusing to write synthetic data into the template database")
+        return False
+    if not os.path.exists(template):
+        print(f"Error: template database not found: {template}")
+        return False
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+    
+    start = time.perf_counter()
+    copy_database(template, db_name)
+    
+    manager = SQLiteManager(db_name, performance_profile="bulk-load")
+    if not manager.connect():
+        return False
+    conn = manager.conn
+    # No journal at all: a failed build is simply started again
+    conn.execute("PRAGMA journal_mode = OFF")
+    
+    # Secondary indexes are rebuilt once at the end, which is much faster than
+    # maintaining them row by row under random inserts
+    indexes = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        f"AND tbl_name IN ({', '.join('?' * len(SYNTH_TABLES))})", SYNTH_TABLES).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    
+    rng = random.Random(seed)
+    now = SYNTH_END
+    epoch = now - 2 * 365 * 86400
+    totals = dict.fromkeys(SYNTH_TABLES, 0)
+    
+    def write(table, columns, rows, timestamps=()):
+        """Insert rows; values for the columns in timestamps are UNIX times"""
+        if rows:
+            placeholders = ", ".join(TIMESTAMP_SQL if col in timestamps else "?" for col in columns)
+            conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+            totals[table] += len(rows)
+    
+    # Users and profiles
+    first_user = _next_id(conn, "auth_user")
+    user_ids = list(range(first_user, first_user + users))
+    joined = {}
+    for offset in range(0, users, chunk_size):
+        user_rows, profile_rows = [], []
+        for user_id in user_ids[offset:offset + chunk_size]:
+            date_joined = joined[user_id] = epoch + rng.random() * (now - epoch) * 0.5
+            user_rows.append((user_id, "!", None, 0, f"adventurer{user_id}", "",
+                              f"adventurer{user_id}@example.com", 0, 1, date_joined, ""))
+            profile_rows.append(("", None, None, "", "", date_joined, date_joined, user_id))
+        write("auth_user", ["id", "password", "last_login", "is_superuser", "username", "last_name",
+                            "email", "is_staff", "is_active", "date_joined", "first_name"], user_rows,
+              timestamps=["date_joined"])
+        write("dnd_blog_userprofile", ["bio", "avatar", "date_of_birth", "location", "website",
+                                       "created_at", "updated_at", "user_id"], profile_rows,
+              timestamps=["created_at", "updated_at"])
+        conn.commit()
+    
+    # Zipf weights: a few users write, receive likes and get befriended far more than the rest
+    popularity = user_ids[:]
+    rng.shuffle(popularity)
+    cum_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(users)))
+    
+    # Friendships and blocks
+    pairs = set()
+    friendship_rows, notification_rows = [], []
+    for sender in user_ids:
+        for receiver in rng.choices(popularity, cum_weights=cum_weights,
+                                    k=_power_law(rng, friends_per_user / 2, cap=users - 1)):
+            pair = (min(sender, receiver), max(sender, receiver))
+            if sender == receiver or pair in pairs:
+                continue
+            pairs.add(pair)
+            created = max(joined[sender], joined[receiver]) + rng.random() * 86400 * 30
+            accepted = rng.random() < 0.8
+            friendship_rows.append((FRIENDSHIP_ACCEPTED if accepted else FRIENDSHIP_PENDING,
+                                    created, created + (3600 if accepted else 0), receiver, sender))
+            notification_rows.append((NOTIFICATION_FRIEND_REQUEST, int(accepted), created,
+                                      None, receiver, sender, None))
+        if len(friendship_rows) >= chunk_size or sender == user_ids[-1]:
+            write("dnd_blog_friendship", ["status", "created_at", "updated_at", "receiver_id", "sender_id"],
+                  friendship_rows, timestamps=["created_at", "updated_at"])
+            write("dnd_blog_notification", ["notification_type", "is_read", "created_at", "comment_id",
+                                            "recipient_id", "sender_id", "post_id"], notification_rows,
+                  timestamps=["created_at"])
+            conn.commit()
+            friendship_rows, notification_rows = [], []
+    
+    block_pairs = set()
+    block_rows = []
+    for _ in range(int(users * blocks_per_user)):
+        blocker, blocked = rng.sample(user_ids, 2)
+        if (min(blocker, blocked), max(blocker, blocked)) in pairs or (blocker, blocked) in block_pairs:
+            continue
+        block_pairs.add((blocker, blocked))
+        block_rows.append((now - rng.random() * 86400 * 180, blocked, blocker))
+    write("dnd_blog_userblock", ["created_at", "blocked_id", "blocker_id"], block_rows,
+          timestamps=["created_at"])
+    conn.commit()
+    del pairs, block_pairs
+    
+    # Posts with their likes, comments and notifications, one transaction per chunk
+    categories = [row[0] for row in conn.execute("SELECT id FROM dnd_blog_category WHERE admin_only = 0")]
+    if not categories:
+        categories = [row[0] for row in conn.execute("SELECT id FROM dnd_blog_category")]
+    paragraphs = [" ".join(rng.choices(WORDS, k=rng.randint(10, 60))).capitalize() + "."
+                  for _ in range(2000)]
+    first_post = _next_id(conn, "dnd_blog_post")
+    next_comment = _next_id(conn, "dnd_blog_comment")
+    step = (now - epoch) / max(posts, 1)
+    
+    rand = rng.random
+    for offset in range(0, posts, chunk_size):
+        count = min(chunk_size, posts - offset)
+        authors = rng.choices(popularity, cum_weights=cum_weights, k=count)
+        last_like = _next_id(conn, "dnd_blog_post_likes") - 1
+        first_comment = next_comment
+        post_rows, like_rows, comment_rows = [], [], []
+        for index, author in enumerate(authors):
+            post_id = first_post + offset + index
+            created = epoch + (offset + index + rand()) * step
+            roll = rand()
+            visibility = (VISIBILITY_PUBLIC if roll < 0.7 else
+                          VISIBILITY_FRIENDS if roll < 0.95 else VISIBILITY_PRIVATE)
+            post_rows.append((post_id, f"{WORDS[int(rand() * len(WORDS))].title()} lore #{post_id}",
+                              paragraphs[int(rand() * len(paragraphs))], visibility, created, created,
+                              author, categories[int(rand() * len(categories))]))
+            
+            for liker in rng.sample(user_ids, _power_law(rng, likes_per_post, cap=users)):
+                like_rows.append((post_id, liker))
+            
+            for _ in range(_power_law(rng, comments_per_post)):
+                commented = created + rand() * 86400 * 7
+                comment_rows.append((next_comment, paragraphs[int(rand() * len(paragraphs))][:200],
+                                     commented, commented, user_ids[int(rand() * users)], post_id))
+                next_comment += 1
+        
+        write("dnd_blog_post", ["id", "title", "content", "visibility", "created_at", "updated_at",
+                                "author_id", "category_id"], post_rows, timestamps=["created_at", "updated_at"])
+        write("dnd_blog_post_likes", ["post_id", "user_id"], like_rows)
+        write("dnd_blog_comment", ["id", "content", "created_at", "updated_at", "author_id", "post_id"],
+              comment_rows, timestamps=["created_at", "updated_at"])
+        
+        # Notifications follow from the chunk's likes and comments, as the blog creates them,
+        # and are derived in SQL so they cost no Python work per row
+        cursor = conn.execute(NOTIFY_LIKES_SQL, (NOTIFICATION_LIKE, last_like))
+        totals["dnd_blog_notification"] += cursor.rowcount
+        cursor = conn.execute(NOTIFY_COMMENTS_SQL, (NOTIFICATION_COMMENT, first_comment))
+        totals["dnd_blog_notification"] += cursor.rowcount
+        conn.commit()
+        rows = sum(totals.values())
+        print(f"  {offset + count:,}/{posts:,} posts, {rows:,} rows "
+              f"({rows / (time.perf_counter() - start):,.0f} rows/sec)")
+    
+    print("Rebuilding indexes...")
+    for _, sql in indexes:
+        conn.execute(sql)
+    conn.commit()
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    
+    elapsed = time.perf_counter() - start
+    rows = sum(totals.values())
+    print(f"\nSynthetic database built: {db_name} (seed {seed})")
+    for table, count in totals.items():
+        print(f"  {table:<24} {count:>12,}")
+    print(f"  {'total':<24} {rows:>12,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)")
+    manager.disconnect()
+    return True
+
+class HTMLTextExtractor(HTMLParser):
+    """
+    Turns HTML fed to it a piece at a time into a title and plain-text paragraphs
+    
+    Scripts, styles and other non-content elements are dropped, block elements
+    become paragraph breaks and runs of whitespace are collapsed. <head> itself
+    isn't skipped, since pages that never close it would lose all their text; the
+    title is kept apart and <meta> and <link> carry no text.
+    """
+    SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "footer"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article", "blockquote",
+                  "pre", "h1", "h2", "h3", "h4", "h5", "h6", "header", "main", "dd", "dt", "hr"}
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.heading = ""
+        self.paragraphs = []
+        self._current = []
+        self._skip_depth = 0
+        self._in_title = self._in_heading = False
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._break()
+            self._in_heading = tag == "h1" and not self.heading
+    
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self._break()
+    
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self._break()
+            self._in_heading = False
+    
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+            if self._in_heading:
+                self.heading += data
+    
+    def _break(self):
+        text = " ".join("".join(self._current).split())
+        if text:
+            self.paragraphs.append(text)
+        self._current = []
+    
+    def close(self):
+        super().close()
+        self._break()
+
+def parse_html_file(path, chunk_size=64 * 1024):
+    """
+    Extract the title and text of a saved page, reading it in chunks
+    
+    Returns:
+        tuple: (path, title, content, size in bytes)
+    """
+    parser = HTMLTextExtractor()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            size += len(chunk)
+            parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    
+    title = " ".join(parser.title.split()) or " ".join(parser.heading.split())
+    if not title:
+        # Fall back to the file name, e.g. httpbin_org_downloaded.html -> httpbin org
+        name = re.sub(r"_downloaded$", "", os.path.splitext(os.path.basename(path))[0])
+        title = name.replace("_", " ").strip()
+    return path, title, "\n\n".join(parser.paragraphs), size
+
+def _parse_html_file_or_error(path):
+    """parse_html_file() for the process pool: (result, None), or (None, error message) instead of raising"""
+    try:
+        return parse_html_file(path), None
+    except Exception as e:
+        return None, f"{path}: {e}"
+
+def _html_files(directory, pattern):
+    """Yield the files under directory whose names match pattern, without listing them all first"""
+    pattern = pattern.lower()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if fnmatch.fnmatchcase(name.lower(), pattern):
+                yield os.path.join(root, name)
+
+def _bounded_map(executor, fn, items, window):
+    """Like executor.map, but with at most window calls queued, so results can't pile up"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def import_html(db_name, directory, category, author=None, visibility=VISIBILITY_PUBLIC,
+                pattern="*.html", workers=None, batch_size=500, allow_duplicates=False):
+    """
+    Import a directory of downloaded pages as posts in one category
+    
+    Files are parsed to text in a process pool and written in batches, one
+    transaction per batch. Files are listed, parsed and written as a stream, so
+    memory stays flat however many there are; the titles seen so far are kept in a
+    temporary table rather than in memory. A file that can't be read or parsed is
+    reported and counted, and the import goes on.
+    
+    Args:
+        db_name (str): Blog database
+        directory (str): Directory searched recursively for pages
+        category (str): Name of the dnd_blog_category the posts go in
+        author (str, optional): Username of the posts' author; defaults to the first superuser
+        visibility (str): Visibility of the new posts
+        pattern (str): File name pattern, * matching anything
+        workers (int, optional): Parser processes; defaults to the number of CPUs
+        batch_size (int): Posts written per transaction
+        allow_duplicates (bool): Import pages whose title is already used in the category
+    
+    Returns:
+        int: Number of posts created, or None on error
+    """
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return None
+    conn = manager.conn
+    try:
+        row = conn.execute("SELECT id FROM dnd_blog_category WHERE name = ?", (category,)).fetchone()
+        if row is None:
+            names = [name for (name,) in conn.execute("SELECT name FROM dnd_blog_category ORDER BY name")]
+            print(f"Error: no category named '{category}'. Categories: {', '.join(names)}")
+            return None
+        category_id = row[0]
+        
+        if author:
+            row = conn.execute("SELECT id FROM auth_user WHERE username = ?", (author,)).fetchone()
+        else:
+            row = conn.execute("SELECT id FROM auth_user WHERE is_superuser = 1 ORDER BY id LIMIT 1").fetchone()
+        if row is None:
+            print(f"Error: no user named '{author}'" if author else "Error: no superuser to own the posts")
+            return None
+        author_id = row[0]
+        
+        # Titles already in the category (new = 0), so running the import again doesn't
+        # duplicate posts, and titles imported by this run (new = 1)
+        if not allow_duplicates:
+            conn.execute("CREATE TEMP TABLE import_titles (title text PRIMARY KEY, new integer NOT NULL) WITHOUT ROWID")
+            conn.execute("INSERT OR IGNORE INTO temp.import_titles SELECT title, 0 FROM dnd_blog_post "
+                         "WHERE category_id = ?", (category_id,))
+        
+        files = imported = already = repeated = empty = failed = total_bytes = 0
+        batch = []
+        
+        def flush():
+            conn.executemany("""
+                INSERT INTO dnd_blog_post
+                    (title, content, visibility, created_at, updated_at, author_id, category_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+            conn.commit()
+            batch.clear()
+        
+        print(f"Importing {pattern} from {directory} into '{category}'...")
+        start = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for parsed, error in _bounded_map(executor, _parse_html_file_or_error,
+                                              _html_files(directory, pattern), workers * 8):
+                files += 1
+                if error:
+                    failed += 1
+                    if failed <= 10:
+                        print(f"  Error parsing {error}")
+                    continue
+                path, title, content, size = parsed
+                total_bytes += size
+                title = title[:200]
+                if not content:
+                    empty += 1
+                    continue
+                if not allow_duplicates and not conn.execute(
+                        "INSERT OR IGNORE INTO temp.import_titles VALUES (?, 1)", (title,)).rowcount:
+                    new = conn.execute("SELECT new FROM temp.import_titles WHERE title = ?", (title,)).fetchone()[0]
+                    if new:
+                        repeated += 1
+                    else:
+                        already += 1
+                    continue
+                # Django stores datetimes as naive UTC text
+                now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+                batch.append((title, content, visibility, now, now, author_id, category_id))
+                imported += 1
+                if len(batch) >= batch_size:
+                    flush()
+                    elapsed = time.perf_counter() - start
+                    print(f"  {files:,} files, {imported:,} posts ({files / elapsed:,.0f} files/sec)")
+        if batch:
+            flush()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error importing pages: {e}")
+        return None
+    finally:
+        manager.disconnect()
+    
+    elapsed = time.perf_counter() - start
+    print(f"\nImported {imported:,} posts from {files:,} files in {elapsed:.2f}s")
+    print(f"  Skipped:    {already:,} already in the category, {repeated:,} repeating a title earlier "
+          f"in this import, {empty:,} without text")
+    if failed:
+        print(f"  Failed:     {failed:,} files could not be read or parsed"
+              + (" (the first 10 are listed above)" if failed > 10 else ""))
+    if elapsed > 0:
+        print(f"  Throughput: {files / elapsed:,.0f} files/sec, {total_bytes / elapsed / 1024 / 1024:,.1f} MiB/sec")
+    return imported
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+def manage_feature(db_name, feature, command, action, actions, is_installed):
+    """
+    Run one action of an install/repair/check/uninstall style command in a single transaction
+    
+    Args:
+        db_name (str): Blog database
+        feature (str): What the command manages, for messages, e.g. "unread counts"
+        command (str): The sqlite_manager.py command, for the install hint
+        action (str): Name of the action to run
+        actions (dict): Action name -> function(conn). A function returning False
+            rolls the transaction back and fails the command, e.g. a check that
+            found wrong values.
+        is_installed (callable): function(conn) -> True if the feature is installed;
+            every action but "install" needs it to be
+    
+    Returns:
+        bool: True on success
+    """
+    if action not in actions:
+        print(f"Unknown {command} action: {action} (choose from {', '.join(actions)})")
+        return False
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    conn = manager.conn
+    start = time.perf_counter()
+    try:
+        # Schema changes and backfills are all or nothing
+        conn.execute("BEGIN")
+        if action != "install" and not is_installed(conn):
+            print(f"Not installed: {feature}; run: python sqlite_manager.py {command} install")
+            conn.rollback()
+            return False
+        if actions[action](conn) is False:
+            conn.rollback()
+            return False
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error managing {feature}: {e}")
+        return False
+    finally:
+        manager.disconnect()
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    return True
+
+def repair_counters(conn):
+    """
+    Recompute the post counter columns from the likes and comments tables
+    
+    Only rows whose stored count is wrong are written.
+    
+    Returns:
+        dict: Number of posts corrected per counter column
+    """
+    corrected = {}
+    for column, table in POST_COUNTERS.items():
+        count_sql = f"(SELECT COUNT(*) FROM {table} WHERE post_id = dnd_blog_post.id)"
+        cursor = conn.execute(f"UPDATE dnd_blog_post SET {column} = {count_sql} WHERE {column} != {count_sql}")
+        corrected[column] = cursor.rowcount
+    return corrected
+
+def manage_counters(db_name, action="install"):
+    """
+    Keep like_count and comment_count columns on dnd_blog_post exact with triggers
+    
+    Post lists can then show counts without aggregating dnd_blog_post_likes and
+    dnd_blog_comment on every page view. The columns default to 0, so inserts that
+    don't know about them (like Django's) still work.
+    
+    The triggers are on dnd_blog_post_likes and dnd_blog_comment. A Django
+    migration that rebuilds dnd_blog_post (new table, copy, drop, rename) loses
+    the columns but keeps the triggers, and every like and comment then fails with
+    "no such column". Run uninstall before such a migration and install after it;
+    check reports a database where that was missed.
+    
+    Args:
+        db_name (str): Blog database
+        action (str): "install" adds the columns and triggers and fills them in,
+            "repair" recomputes every count, "check" only reports wrong counts,
+            "uninstall" drops the triggers and columns
+    
+    Returns:
+        bool: True on success (for "check", True if every count is right)
+    """
+    def install(conn):
+        for column, table in POST_COUNTERS.items():
+            if column not in _columns(conn, "dnd_blog_post"):
+                conn.execute(f"ALTER TABLE dnd_blog_post ADD COLUMN {column} integer NOT NULL DEFAULT 0")
+            for sql in COUNTER_TRIGGERS_SQL:
+                conn.execute(sql.format(table=table, column=column))
+        corrected = repair_counters(conn)
+        print(f"Counters installed: {', '.join(POST_COUNTERS)} "
+              f"({', '.join(f'{n:,} {c} values filled in' for c, n in corrected.items())})")
+    
+    def repair(conn):
+        for column, count in repair_counters(conn).items():
+            print(f"  {column:<14} {count:>10,} posts corrected")
+    
+    def check(conn):
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        columns = _columns(conn, "dnd_blog_post")
+        broken = False
+        for column, table in POST_COUNTERS.items():
+            missing = [suffix for suffix in COUNTER_TRIGGER_SUFFIXES if f"{table}_count_{suffix}" not in triggers]
+            if column not in columns:
+                print(f"  {column:<14} column missing while triggers on {table} exist; dnd_blog_post was rebuilt "
+                      f"(e.g. by a migration), so writes to {table} fail")
+                broken = True
+            elif missing:
+                print(f"  {column:<14} {', '.join(missing)} trigger(s) missing on {table}")
+                broken = True
+        if broken:
+            print("Run: python sqlite_manager.py counters install")
+            return False
+        wrong = 0
+        for column, table in POST_COUNTERS.items():
+            count = conn.execute(f"""
+                SELECT COUNT(*) FROM dnd_blog_post
+                WHERE {column} != (SELECT COUNT(*) FROM {table} WHERE post_id = dnd_blog_post.id)
+            """).fetchone()[0]
+            wrong += count
+            print(f"  {column:<14} {count:>10,} posts with a wrong count")
+        return wrong == 0
+    
+    def uninstall(conn):
+        columns = _columns(conn, "dnd_blog_post")
+        for column, table in POST_COUNTERS.items():
+            for suffix in COUNTER_TRIGGER_SUFFIXES:
+                conn.execute(f"DROP TRIGGER IF EXISTS {table}_count_{suffix}")
+            if column in columns:
+                conn.execute(f"ALTER TABLE dnd_blog_post DROP COLUMN {column}")
+        print("Counters removed")
+    
+    def is_installed(conn):
+        # Either half left behind counts, so check and uninstall can deal with it
+        return bool(set(POST_COUNTERS) & _columns(conn, "dnd_blog_post")) or any(
+            _has_table(conn, f"{table}_count_insert") for table in POST_COUNTERS.values())
+    
+    return manage_feature(db_name, "post counters", "counters", action,
+                          {"install": install, "repair": repair, "check": check, "uninstall": uninstall},
+                          is_installed)
+
+def repair_unread(conn):
+    """
+    Recount every user's unread notifications into dnd_blog_unread
+    
+    Only counts that are wrong are written.
+    
+    Returns:
+        int: Number of users corrected
+    """
+    before = conn.total_changes  # rowcount isn't set for statements starting with WITH
+    conn.execute("""
+        WITH counts(user_id, unread) AS (
+            SELECT u.id, (SELECT COUNT(*) FROM dnd_blog_notification WHERE recipient_id = u.id AND is_read = 0)
+            FROM auth_user u
+        )
+        INSERT INTO dnd_blog_unread (user_id, unread)
+        SELECT counts.user_id, counts.unread FROM counts LEFT JOIN dnd_blog_unread d ON d.user_id = counts.user_id
+        WHERE d.unread IS NOT counts.unread
+        ON CONFLICT (user_id) DO UPDATE SET unread = excluded.unread
+    """)
+    return conn.total_changes - before
+
+def unread_count(conn, user_id):
+    """A user's unread notification count, as kept in dnd_blog_unread"""
+    row = conn.execute("SELECT unread FROM dnd_blog_unread WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+def mark_read(conn, user_id, up_to_id=None):
+    """
+    Mark a user's notifications read with one UPDATE
+    
+    Args:
+        conn (sqlite3.Connection): Blog database
+        user_id (int): Recipient
+        up_to_id (int, optional): Only mark notifications with this id or lower, so
+            ones that arrived after the user opened the list stay unread
+    
+    Returns:
+        int: Number of notifications marked read
+    """
+    sql = "UPDATE dnd_blog_notification SET is_read = 1 WHERE recipient_id = ? AND is_read = 0"
+    params = [user_id]
+    if up_to_id is not None:
+        # A separate condition lets the (recipient_id, is_read) index seek on id too
+        sql += " AND id <= ?"
+        params.append(up_to_id)
+    return conn.execute(sql, params).rowcount
+
+def manage_unread(db_name, action="install"):
+    """
+    Keep each user's unread notification count in dnd_blog_unread with triggers
+    
+    The notification badge then reads one row instead of counting a user's
+    notifications on every page view.
+    
+    A Django migration that rebuilds dnd_blog_notification silently drops the
+    triggers, so counts stop changing. Run install again after migrating; it
+    recreates them and recounts.
+    
+    Args:
+        db_name (str): Blog database
+        action (str): "install" creates the table, index and triggers and fills the
+            table in, "repair" recounts, "check" only reports wrong counts,
+            "uninstall" drops the table and triggers (the index is kept)
+    
+    Returns:
+        bool: True on success (for "check", True if every count is right)
+    """
+    def install(conn):
+        table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'dnd_blog_unread'").fetchone()
+        if table_sql and "REFERENCES" in table_sql[0]:
+            # Installed with a foreign key to auth_user; the counts are refilled below
+            conn.execute("DROP TABLE dnd_blog_unread")
+        for sql in UNREAD_SCHEMA_SQL:
+            conn.execute(sql)
+        print(f"Unread counts installed ({repair_unread(conn):,} users filled in)")
+    
+    def repair(conn):
+        print(f"  {repair_unread(conn):,} users corrected")
+    
+    def check(conn):
+        wrong = conn.execute("""
+            SELECT COUNT(*) FROM auth_user u LEFT JOIN dnd_blog_unread d ON d.user_id = u.id
+            WHERE COALESCE(d.unread, 0) != (
+                SELECT COUNT(*) FROM dnd_blog_notification WHERE recipient_id = u.id AND is_read = 0
+            )
+        """).fetchone()[0]
+        print(f"  {wrong:,} users with a wrong unread count")
+        return wrong == 0
+    
+    def uninstall(conn):
+        for suffix in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS dnd_blog_notification_unread_{suffix}")
+        conn.execute("DROP TRIGGER IF EXISTS dnd_blog_unread_user_delete")
+        conn.execute("DROP TABLE dnd_blog_unread")
+        print("Unread counts removed")
+    
+    return manage_feature(db_name, "unread counts", "unread", action,
+                          {"install": install, "repair": repair, "check": check, "uninstall": uninstall},
+                          lambda conn: _has_table(conn, "dnd_blog_unread"))
+
+def show_mark_read(db_name, user_id, up_to_id=None):
+    """Mark a user's notifications read and print their badge before and after"""
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    conn = manager.conn
+    try:
+        before = unread_count(conn, user_id)
+        start = time.perf_counter()
+        marked = mark_read(conn, user_id, up_to_id)
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        print(f"Marked {marked:,} notifications read in {elapsed * 1000:.1f} ms "
+              f"(unread: {before:,} -> {unread_count(conn, user_id):,})")
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error marking notifications read: {e}")
+        return False
+    finally:
+        manager.disconnect()
+
+def rebuild_feed(conn, depth=FEED_DEPTH):
+    """
+    Refill dnd_blog_feed from the posts, friendships and blocks
+    
+    Each author contributes at most their newest depth posts, then each user keeps
+    the newest depth entries across all their friends. A full feed's horizon is its
+    oldest row. The feed's own triggers are dropped while it fills and created
+    again for depth.
+    
+    Returns:
+        int: Number of feed rows written
+    """
+    for name, _, _ in feed_row_triggers(depth):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("DELETE FROM dnd_blog_feed")
+    conn.execute("DELETE FROM dnd_blog_feed_state")
+    before = conn.total_changes  # rowcount isn't set for statements starting with WITH
+    conn.execute(f"""
+        WITH friends(user_id, friend_id) AS (
+            -- UNION, since a pair can have an accepted request each way
+            SELECT sender_id, receiver_id FROM dnd_blog_friendship WHERE status = '{FRIENDSHIP_ACCEPTED}'
+            UNION
+            SELECT receiver_id, sender_id FROM dnd_blog_friendship WHERE status = '{FRIENDSHIP_ACCEPTED}'
+        ),
+        recent(author_id, post_id, created_at) AS (
+            SELECT author_id, id, created_at FROM (
+                SELECT author_id, id, created_at,
+                       ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY created_at DESC, id DESC) AS n
+                FROM dnd_blog_post WHERE visibility IN {FEED_VISIBILITY}
+            ) WHERE n <= :depth
+        )
+        INSERT INTO dnd_blog_feed (user_id, post_id, created_at)
+        SELECT user_id, post_id, created_at FROM (
+            SELECT f.user_id, r.post_id, r.created_at,
+                   ROW_NUMBER() OVER (PARTITION BY f.user_id ORDER BY r.created_at DESC, r.post_id DESC) AS n
+            FROM friends f JOIN recent r ON r.author_id = f.friend_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM dnd_blog_userblock
+                WHERE (blocker_id = f.user_id AND blocked_id = f.friend_id)
+                   OR (blocker_id = f.friend_id AND blocked_id = f.user_id)
+            )
+        ) WHERE n <= :depth
+    """, {"depth": depth})
+    written = conn.total_changes - before
+    conn.execute("""
+        INSERT INTO dnd_blog_feed_state (user_id, size, horizon_created_at, horizon_post_id)
+        SELECT user_id, size, CASE WHEN size >= :depth THEN created_at END, CASE WHEN size >= :depth THEN post_id END
+        FROM (
+            SELECT user_id, created_at, post_id, COUNT(*) OVER (PARTITION BY user_id) AS size,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at, post_id) AS n
+            FROM dnd_blog_feed
+        ) WHERE n = 1
+    """, {"depth": depth})
+    for name, event, body in feed_row_triggers(depth):
+        conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+    return written
+
+def trim_feed(conn, depth=FEED_DEPTH):
+    """
+    Cut each user's feed back to its newest depth entries
+    
+    The triggers already keep feeds at the depth they were installed with; this
+    is for moving to a smaller one. The newest row cut becomes the user's horizon.
+    
+    Returns:
+        int: Number of rows removed
+    """
+    ranked = """
+        SELECT user_id, created_at, post_id, COUNT(*) OVER (PARTITION BY user_id) AS size,
+               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, post_id DESC) AS n
+        FROM dnd_blog_feed
+    """
+    conn.execute(f"""
+        INSERT INTO dnd_blog_feed_state (user_id, size, horizon_created_at, horizon_post_id)
+        SELECT user_id, size, created_at, post_id FROM ({ranked}) WHERE n = ? + 1
+        ON CONFLICT (user_id) DO UPDATE SET
+            horizon_created_at = excluded.horizon_created_at, horizon_post_id = excluded.horizon_post_id
+    """, (depth,))
+    cursor = conn.execute(f"""
+        DELETE FROM dnd_blog_feed WHERE (user_id, created_at, post_id) IN (
+            SELECT user_id, created_at, post_id FROM ({ranked}) WHERE n > ?
+        )
+    """, (depth,))
+    return cursor.rowcount
+
+def manage_feed(db_name, action="install", depth=FEED_DEPTH):
+    """
+    Maintain dnd_blog_feed, a fan-out-on-write table of each user's friends' posts
+    
+    Triggers add a post to its author's friends' feeds when it is created, pull
+    in each other's newest posts when a friendship is accepted or a block lifted,
+    and take them out again when a friendship ends or a block is added. Reading a
+    feed page is then a range scan of one user's rows (feed_page()). A feed
+    that grows past depth entries loses its oldest, and dnd_blog_feed_state
+    remembers the newest row lost so older posts are left to feed_page()'s live
+    fallback rather than stored below a gap.
+    
+    A Django migration that rebuilds dnd_blog_post silently drops the post
+    triggers, after which new posts never reach any feed. Run install again after
+    migrating; it recreates the triggers and refills the table.
+    
+    Args:
+        db_name (str): Blog database
+        action (str): "install" creates the tables and triggers and fills it,
+            "rebuild" refills it, "trim" cuts each user back to depth entries,
+            "uninstall" drops the tables and triggers
+        depth (int): Newest entries kept per user
+    
+    Returns:
+        bool: True on success
+    """
+    def install(conn):
+        for sql in FEED_SCHEMA_SQL:
+            conn.execute(sql)
+        for name, event, body in feed_triggers(depth):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+        print(f"Feed installed, {rebuild_feed(conn, depth):,} rows (up to {depth} per user)")
+    
+    def rebuild(conn):
+        print(f"Feed rebuilt, {rebuild_feed(conn, depth):,} rows (up to {depth} per user)")
+    
+    def trim(conn):
+        print(f"Feed trimmed, {trim_feed(conn, depth):,} rows removed")
+    
+    def uninstall(conn):
+        for name, _, _ in feed_triggers(depth):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE dnd_blog_feed")
+        conn.execute("DROP TABLE IF EXISTS dnd_blog_feed_state")
+        print("Feed removed")
+    
+    return manage_feature(db_name, "the friends feed", "feed", action,
+                          {"install": install, "rebuild": rebuild, "trim": trim, "uninstall": uninstall},
+                          lambda conn: _has_table(conn, "dnd_blog_feed"))
+
+class SocialGraph:
+    """
+    Process-local cache of the friendship and block graph
+    
+    Keeps a set of accepted friends and a set of block partners (blocked by or
+    blocking) per user, so are_friends() and is_blocked() are set lookups instead
+    of queries on dnd_blog_friendship and dnd_blog_userblock.
+    
+    The whole graph is loaded in bulk when it fits in memory_budget_mb. Otherwise
+    the most recently used users are kept, up to the budget, and the rest are
+    read from the database when asked for. The on_* methods apply changes as they
+    happen, e.g. from the blog's save/delete signal handlers. sync() reloads if
+    another process changed the tables.
+    
+    Every public method holds one lock, so the cache can be shared by threads as
+    long as conn can be too (check_same_thread=False).
+    """
+    # Rough cost of one cached user: two sets plus the dict slot and key
+    USER_OVERHEAD = 2 * sys.getsizeof(set()) + 100
+    # Rough cost of one set entry: a hash table slot plus the int object
+    ENTRY_SIZE = 70
+    
+    def __init__(self, conn, memory_budget_mb=256):
+        """
+        Args:
+            conn (sqlite3.Connection): Blog database, used for loading and cache misses
+            memory_budget_mb (float): Approximate memory the cache may use
+        """
+        self.conn = conn
+        self.budget = memory_budget_mb * 1024 * 1024
+        self.complete = False
+        self.hits = self.misses = self.evictions = 0
+        self._friends = OrderedDict()
+        self._blocks = {}
+        self._size = 0
+        self._version = None
+        self._lock = threading.RLock()
+    
+    def _cost(self, user):
+        return self.USER_OVERHEAD + self.ENTRY_SIZE * (len(self._friends[user]) + len(self._blocks[user]))
+    
+    def _table_version(self):
+        """Cheap fingerprint of the friendship and block tables, to notice outside changes"""
+        return self.conn.execute(f"""
+            SELECT (SELECT COUNT(*) FROM dnd_blog_friendship WHERE status = '{FRIENDSHIP_ACCEPTED}'),
+                   (SELECT MAX(id) FROM dnd_blog_friendship),
+                   (SELECT MAX(updated_at) FROM dnd_blog_friendship),
+                   (SELECT COUNT(*) FROM dnd_blog_userblock),
+                   (SELECT MAX(id) FROM dnd_blog_userblock)
+        """).fetchone()
+    
+    def load(self):
+        """
+        Load the whole graph in bulk, falling back to on-demand loading over budget
+        
+        Returns:
+            bool: True if the whole graph fits in the budget
+        """
+        with self._lock:
+            return self._load()
+    
+    def _load(self):
+        start = time.perf_counter()
+        self._version = self._table_version()
+        self._friends.clear()
+        self._blocks.clear()
+        self._size = 0
+        
+        # Decide from the row counts, so an over-budget graph is never loaded even briefly
+        edges = self._version[0] + self._version[3]
+        users = min(self.conn.execute("SELECT COUNT(*) FROM auth_user").fetchone()[0], 2 * edges)
+        estimate = users * self.USER_OVERHEAD + 2 * edges * self.ENTRY_SIZE
+        self.complete = estimate <= self.budget
+        if not self.complete:
+            print(f"Social graph: ~{estimate / 1024 / 1024:,.1f} MiB is over the "
+                  f"{self.budget / 1024 / 1024:,.0f} MiB budget, caching users on demand")
+            return False
+        
+        friends, blocks = {}, {}
+        entries = 0
+        for sender, receiver in self.conn.execute(
+                f"SELECT sender_id, receiver_id FROM dnd_blog_friendship WHERE status = '{FRIENDSHIP_ACCEPTED}'"):
+            friends.setdefault(sender, set()).add(receiver)
+            friends.setdefault(receiver, set()).add(sender)
+            entries += 2
+        for blocker, blocked in self.conn.execute("SELECT blocker_id, blocked_id FROM dnd_blog_userblock"):
+            blocks.setdefault(blocker, set()).add(blocked)
+            blocks.setdefault(blocked, set()).add(blocker)
+            entries += 2
+        
+        users = friends.keys() | blocks.keys()
+        for user in users:
+            self._friends[user] = friends.get(user, set())
+            self._blocks[user] = blocks.get(user, set())
+        self._size = len(users) * self.USER_OVERHEAD + entries * self.ENTRY_SIZE
+        print(f"Social graph: {len(users):,} users, {entries // 2:,} edges, ~{self._size / 1024 / 1024:,.1f} MiB, "
+              f"loaded in {time.perf_counter() - start:.2f}s")
+        return True
+    
+    def sync(self):
+        """Reload if the friendship or block tables changed outside this cache"""
+        with self._lock:
+            if self._table_version() != self._version:
+                self._load()
+    
+    def _user(self, user):
+        """user's cached friend set, reading the user from the database on a miss; call with the lock held"""
+        if user in self._friends:
+            self.hits += 1
+            if not self.complete:
+                self._friends.move_to_end(user)
+            return self._friends[user]
+        self.misses += 1
+        if self.complete:
+            # A user with no friends or blocks yet
+            self._friends[user], self._blocks[user] = set(), set()
+        else:
+            self._friends[user] = {row[0] for row in self.conn.execute(f"""
+                SELECT receiver_id FROM dnd_blog_friendship WHERE sender_id = ? AND status = '{FRIENDSHIP_ACCEPTED}'
+                UNION
+                SELECT sender_id FROM dnd_blog_friendship WHERE receiver_id = ? AND status = '{FRIENDSHIP_ACCEPTED}'
+            """, (user, user))}
+            self._blocks[user] = {row[0] for row in self.conn.execute("""
+                SELECT blocked_id FROM dnd_blog_userblock WHERE blocker_id = ?
+                UNION
+                SELECT blocker_id FROM dnd_blog_userblock WHERE blocked_id = ?
+            """, (user, user))}
+        self._size += self._cost(user)
+        friends = self._friends[user]
+        while not self.complete and self._size > self.budget and len(self._friends) > 1:
+            evicted = next(iter(self._friends))
+            self._size -= self._cost(evicted)
+            del self._friends[evicted], self._blocks[evicted]
+            self.evictions += 1
+        return friends
+    
+    def friends(self, user):
+        """Set of user's accepted friends, a copy other threads won't change"""
+        with self._lock:
+            return set(self._user(user))
+    
+    def are_friends(self, a, b):
+        with self._lock:
+            return b in self._user(a)
+    
+    def is_blocked(self, a, b):
+        """True if either user blocked the other"""
+        with self._lock:
+            self._user(a)
+            return b in self._blocks[a]
+    
+    def suggestions(self, user, limit=10):
+        """
+        Friends of friends, ranked by the number of mutual friends
+        
+        Returns:
+            list: (user_id, mutual friend count), best first
+        """
+        with self._lock:
+            friends = set(self._user(user))
+            mutual = Counter()
+            for friend in friends:
+                mutual.update(self._user(friend))
+            for excluded in friends | {user}:
+                mutual.pop(excluded, None)
+            ranked = [(candidate, count) for candidate, count in mutual.items() if not self.is_blocked(user, candidate)]
+        return nlargest(limit, ranked, key=lambda item: (item[1], -item[0]))
+    
+    def _link(self, sets, a, b, add):
+        for x, y in ((a, b), (b, a)):
+            if x not in self._friends:
+                if not self.complete:
+                    continue  # not cached; read fresh from the database when next needed
+                self._friends[x], self._blocks[x] = set(), set()
+                self._size += self.USER_OVERHEAD
+            target = sets[x]
+            if add and y not in target:
+                target.add(y)
+                self._size += self.ENTRY_SIZE
+            elif not add and y in target:
+                target.discard(y)
+                self._size -= self.ENTRY_SIZE
+    
+    def _accepted_back(self, sender, receiver):
+        """True if receiver's own request to sender is accepted, which keeps them friends"""
+        return self.conn.execute(f"""
+            SELECT 1 FROM dnd_blog_friendship WHERE sender_id = ? AND receiver_id = ? AND status = '{FRIENDSHIP_ACCEPTED}'
+        """, (receiver, sender)).fetchone() is not None
+    
+    def on_friendship_saved(self, sender, receiver, status):
+        """Apply a created or updated dnd_blog_friendship row"""
+        with self._lock:
+            accepted = status == FRIENDSHIP_ACCEPTED or self._accepted_back(sender, receiver)
+            self._link(self._friends, sender, receiver, accepted)
+    
+    def on_friendship_deleted(self, sender, receiver):
+        # The pair stay friends if there is an accepted request the other way too
+        with self._lock:
+            self._link(self._friends, sender, receiver, self._accepted_back(sender, receiver))
+    
+    def on_block_saved(self, blocker, blocked):
+        with self._lock:
+            self._link(self._blocks, blocker, blocked, True)
+    
+    def on_block_deleted(self, blocker, blocked):
+        # The pair stays blocked if the other user has blocked too
+        with self._lock:
+            still_blocked = self.conn.execute("""
+                SELECT 1 FROM dnd_blog_userblock WHERE blocker_id = ? AND blocked_id = ?
+            """, (blocked, blocker)).fetchone()
+            if not still_blocked:
+                self._link(self._blocks, blocker, blocked, False)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._friends),
+                "approx_mib": self._size / 1024 / 1024,
+                "complete": self.complete,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+def encode_cursor(key, row_id):
+    """Opaque page cursor for the row a page ended on: its sort key (e.g. created_at) and id"""
+    data = json.dumps([key, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Turn a cursor from encode_cursor() back into (key, id)
+    
+    Raises:
+        ValueError: If the cursor wasn't made by encode_cursor()
+    """
+    try:
+        key, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    if not isinstance(key, (str, int, float)) or isinstance(key, bool) or not isinstance(row_id, int):
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    return key, row_id
+
+def _check_limit(limit):
+    """Page sizes below 1 would reach LIMIT ?, where a negative one means no limit at all"""
+    if limit < 1:
+        raise ValueError(f"Page size must be at least 1, got {limit}")
+
+def keyset_page(conn, table, columns, where, params, cursor=None, limit=20, newest_first=True):
+    """
+    One page of a (created_at, id) ordered listing, starting after cursor
+    
+    The cursor becomes a row-value comparison, so every page is an index range
+    scan of limit rows however deep it is, unlike OFFSET, which reads and throws
+    away every row before the page.
+    
+    Args:
+        conn (sqlite3.Connection): Blog database
+        table (str): Table to list
+        columns (str): Columns to select; must not be a bare "*"
+        where (str): Filter, with ? placeholders
+        params (tuple): Values for the filter
+        cursor (str, optional): next_cursor of the previous page; None for the first page
+        limit (int): Rows per page
+        newest_first (bool): Order by (created_at, id) descending instead of ascending
+    
+    Returns:
+        tuple: (rows, next_cursor); next_cursor is None on the last page
+    
+    Raises:
+        ValueError: If limit is below 1 or the cursor is invalid
+    """
+    _check_limit(limit)
+    order, compare = ("DESC", "<") if newest_first else ("ASC", ">")
+    if cursor:
+        where += f" AND (created_at, id) {compare} (?, ?)"
+        params = tuple(params) + decode_cursor(cursor)
+    rows = conn.execute(f"""
+        SELECT {columns}, created_at, id FROM {table} WHERE {where}
+        ORDER BY created_at {order}, id {order} LIMIT ?
+    """, tuple(params) + (limit + 1,)).fetchall()
+    # One extra row is read to tell whether there is a next page
+    next_cursor = encode_cursor(rows[limit - 1][-2], rows[limit - 1][-1]) if len(rows) > limit else None
+    return [row[:-2] for row in rows[:limit]], next_cursor
+
+def post_page(conn, cursor=None, limit=20, visibility=VISIBILITY_PUBLIC, author_id=None, category_id=None):
+    """Posts with one visibility, newest first, optionally by one author or in one category"""
+    where, params = "visibility = ?", [visibility]
+    if author_id is not None:
+        where, params = where + " AND author_id = ?", params + [author_id]
+    if category_id is not None:
+        where, params = where + " AND category_id = ?", params + [category_id]
+    return keyset_page(conn, "dnd_blog_post", "id, title, author_id, category_id", where, params, cursor, limit)
+
+def comment_page(conn, post_id, cursor=None, limit=50):
+    """Comments under a post, oldest first"""
+    return keyset_page(conn, "dnd_blog_comment", "id, author_id, content", "post_id = ?", (post_id,),
+                       cursor, limit, newest_first=False)
+
+def notification_page(conn, recipient_id, cursor=None, limit=20):
+    """A user's notifications, newest first"""
+    return keyset_page(conn, "dnd_blog_notification", "id, notification_type, sender_id, post_id, is_read",
+                       "recipient_id = ?", (recipient_id,), cursor, limit)
+
+def feed_page(conn, user_id, cursor=None, limit=20):
+    """
+    A user's feed: their friends' public and friends-only posts, newest first
+    
+    Pages come from dnd_blog_feed while it has rows. It only keeps each user's
+    newest entries, so a page that runs past them is finished from the friendships
+    and posts directly, after the last stored row. The cursor is the same
+    (created_at, post id) keyset either way.
+    
+    Args:
+        conn (sqlite3.Connection): Blog database with the feed installed
+        user_id (int): Whose feed
+        cursor (str, optional): next_cursor of the previous page; None for the first page
+        limit (int): Rows per page
+    
+    Returns:
+        tuple: (rows of (post_id, title, author_id), next_cursor); next_cursor is None on the last page
+    """
+    _check_limit(limit)
+    params = {"user": user_id, "limit": limit + 1}
+    keyset = ""
+    if cursor:
+        params["created_at"], params["post_id"] = decode_cursor(cursor)
+        keyset = "AND (f.created_at, f.post_id) < (:created_at, :post_id)"
+    rows = conn.execute(f"""
+        SELECT p.id, p.title, p.author_id, f.created_at FROM dnd_blog_feed f
+        JOIN dnd_blog_post p ON p.id = f.post_id
+        WHERE f.user_id = :user {keyset}
+        ORDER BY f.created_at DESC, f.post_id DESC LIMIT :limit
+    """, params).fetchall()
+    if len(rows) <= limit:
+        # The stored feed ran out; older posts may have been trimmed from it
+        if rows:
+            params["created_at"], params["post_id"] = rows[-1][3], rows[-1][0]
+        keyset = "AND (p.created_at, p.id) < (:created_at, :post_id)" if "post_id" in params else ""
+        params["limit"] = limit + 1 - len(rows)
+        rows += conn.execute(f"""
+            SELECT p.id, p.title, p.author_id, p.created_at FROM dnd_blog_post p
+            WHERE p.author_id IN ({FEED_FRIENDS_SQL.format(user=":user")})
+              AND p.visibility IN {FEED_VISIBILITY} {keyset}
+            ORDER BY p.created_at DESC, p.id DESC LIMIT :limit
+        """, params).fetchall()
+    next_cursor = encode_cursor(rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else None
+    return [row[:3] for row in rows[:limit]], next_cursor
+
+def show_page(db_name, listing, key=None, cursor=None, limit=20):
+    """
+    Print one page of a listing and the cursor for the next one
+    
+    Args:
+        db_name (str): Blog database
+        listing (str): "posts", "comments" (key is the post id), "notifications" or "feed" (key is the user id)
+        key (int, optional): Post or user id the listing is for
+        cursor (str, optional): Cursor printed with the previous page
+        limit (int): Rows per page
+    """
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    try:
+        start = time.perf_counter()
+        if listing == "posts":
+            rows, next_cursor = post_page(manager.conn, cursor, limit)
+        elif listing == "comments":
+            rows, next_cursor = comment_page(manager.conn, key, cursor, limit)
+        elif listing == "feed":
+            rows, next_cursor = feed_page(manager.conn, key, cursor, limit)
+        else:
+            rows, next_cursor = notification_page(manager.conn, key, cursor, limit)
+        elapsed = time.perf_counter() - start
+        for row in rows:
+            print("  " + " | ".join(str(value)[:60] for value in row))
+        print(f"{len(rows)} rows in {elapsed * 1000:.2f} ms")
+        print(f"Next page: --cursor {next_cursor}" if next_cursor else "Last page")
+        return True
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error reading page: {e}")
+        return False
+    finally:
+        manager.disconnect()
+
+def create_keyset_indexes(db_name):
+    """Create the composite indexes the paginated listings read through"""
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    try:
+        start = time.perf_counter()
+        for sql in KEYSET_INDEXES:
+            manager.conn.execute(sql)
+            print(f"  {sql.split(' ON ')[0].split()[-1]}")
+        manager.conn.execute("PRAGMA analysis_limit = 1000")
+        for table in ("dnd_blog_post", "dnd_blog_comment", "dnd_blog_notification"):
+            manager.conn.execute(f"ANALYZE {table}")
+        manager.conn.commit()
+        print(f"Indexes ready in {time.perf_counter() - start:.2f}s")
+        return True
+    except sqlite3.Error as e:
+        print(f"Error creating indexes: {e}")
+        return False
+    finally:
+        manager.disconnect()
+
+def manage_search(db_name, action="install"):
+    """
+    Maintain the FTS5 search indexes over posts and comments
+    
+    A Django migration that rebuilds dnd_blog_post or dnd_blog_comment silently
+    drops its triggers, after which new and edited rows are missing from search.
+    Run install again after migrating; it recreates them and rebuilds the indexes.
+    
+    Args:
+        db_name (str): Blog database
+        action (str): "install" creates the indexes and triggers and fills them,
+            "rebuild" refills them from the blog tables, "optimize" merges their
+            segments, "uninstall" drops them
+    
+    Returns:
+        bool: True on success
+    """
+    def rebuild(conn):
+        for fts, (table, _) in SEARCH_TABLES.items():
+            conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            print(f"  {fts:<22} {rows:>12,} rows indexed")
+    
+    def install(conn):
+        for fts, (table, columns) in SEARCH_TABLES.items():
+            for sql in search_schema(fts, table, columns):
+                conn.execute(sql)
+        rebuild(conn)
+    
+    def optimize(conn):
+        for fts in SEARCH_TABLES:
+            conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+            print(f"  {fts:<22} optimized")
+    
+    def uninstall(conn):
+        for fts in SEARCH_TABLES:
+            for suffix in ("insert", "delete", "update"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            conn.execute(f"DROP TABLE {fts}")
+            print(f"  {fts:<22} removed")
+    
+    return manage_feature(db_name, "the search indexes", "search-index", action,
+                          {"install": install, "rebuild": rebuild, "optimize": optimize, "uninstall": uninstall},
+                          lambda conn: _has_table(conn, "dnd_blog_post_fts"))
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query matching every word
+    
+    Each word is quoted, so punctuation and FTS5 operators in user input can't
+    cause syntax errors. A trailing * still makes a word a prefix search.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+BLOCKED_AUTHOR_SQL = """
+    SELECT blocked_id FROM dnd_blog_userblock WHERE blocker_id = :viewer
+    UNION ALL
+    SELECT blocker_id FROM dnd_blog_userblock WHERE blocked_id = :viewer
+"""
+
+# Posts a viewer may see: public ones, their own, and friends-only ones by friends,
+# never by anyone they blocked or who blocked them. :viewer is NULL for anonymous visitors.
+VISIBLE_POST_SQL = f"""
+    (p.visibility = '{VISIBILITY_PUBLIC}' OR p.author_id = :viewer
+     OR (p.visibility = '{VISIBILITY_FRIENDS}' AND p.author_id IN ({FEED_FRIENDS_SQL.format(user=":viewer")})))
+    AND p.author_id NOT IN ({BLOCKED_AUTHOR_SQL})
+"""
+
+# Searches run in two steps: the first ranks every match to pick one page of ids, the
+# second highlights just those rows, so highlight() and snippet() don't run for every
+# match of a common word. Calling bm25() directly ranks faster than FTS5's rank column,
+# and LIMIT -1 keeps SQLite from flattening the subquery, which would compute it twice.
+# Title matches count twice as much as content matches.
+SEARCH_POSTS_SQL = f"""
+    WITH hits AS MATERIALIZED (
+        SELECT id, score FROM (
+            SELECT s.rowid AS id, bm25(dnd_blog_post_fts, 2.0, 1.0) AS score
+            FROM dnd_blog_post_fts s JOIN dnd_blog_post p ON p.id = s.rowid
+            WHERE dnd_blog_post_fts MATCH :query AND {VISIBLE_POST_SQL}
+            LIMIT -1
+        )
+        WHERE (score, id) > (:after_rank, :after_id)
+        ORDER BY score, id LIMIT :limit
+    )
+    SELECT p.id, highlight(dnd_blog_post_fts, 0, :open, :close),
+           snippet(dnd_blog_post_fts, 1, :open, :close, '...', 16), p.author_id, p.created_at, hits.score, hits.id
+    FROM hits CROSS JOIN dnd_blog_post_fts s CROSS JOIN dnd_blog_post p
+    WHERE dnd_blog_post_fts MATCH :query AND s.rowid = hits.id AND p.id = hits.id
+    ORDER BY hits.score, hits.id
+"""
+
+SEARCH_COMMENTS_SQL = f"""
+    WITH hits AS MATERIALIZED (
+        SELECT id, score FROM (
+            SELECT s.rowid AS id, bm25(dnd_blog_comment_fts) AS score
+            FROM dnd_blog_comment_fts s
+            JOIN dnd_blog_comment c ON c.id = s.rowid
+            JOIN dnd_blog_post p ON p.id = c.post_id
+            WHERE dnd_blog_comment_fts MATCH :query
+              AND {VISIBLE_POST_SQL} AND c.author_id NOT IN ({BLOCKED_AUTHOR_SQL})
+            LIMIT -1
+        )
+        WHERE (score, id) > (:after_rank, :after_id)
+        ORDER BY score, id LIMIT :limit
+    )
+    SELECT c.id, c.post_id, snippet(dnd_blog_comment_fts, 0, :open, :close, '...', 16),
+           c.author_id, c.created_at, hits.score, hits.id
+    FROM hits CROSS JOIN dnd_blog_comment_fts s CROSS JOIN dnd_blog_comment c
+    WHERE dnd_blog_comment_fts MATCH :query AND s.rowid = hits.id AND c.id = hits.id
+    ORDER BY hits.score, hits.id
+"""
+
+def search(conn, text, viewer_id=None, cursor=None, limit=20, comments=False, marks=("<mark>", "</mark>")):
+    """
+    Ranked full-text search over the posts (or comments) a viewer may see
+    
+    Results are ordered by BM25 rank, best first, and paged with a (rank, id)
+    cursor like the other keyset-paginated listings.
+    
+    Args:
+        conn (sqlite3.Connection): Blog database with the search indexes installed
+        text (str): Words to search for; every word must match
+        viewer_id (int, optional): User searching; None for anonymous visitors
+        cursor (str, optional): next_cursor of the previous page
+        limit (int): Results per page
+        comments (bool): Search comment text instead of post titles and content
+        marks (tuple): Strings put around matched words in titles and snippets
+    
+    Returns:
+        tuple: (results, next_cursor); results are dicts, next_cursor is None on the last page
+    """
+    _check_limit(limit)
+    query = fts_query(text)
+    if not query:
+        return [], None
+    after_rank, after_id = decode_cursor(cursor) if cursor else (float("-inf"), 0)
+    params = {"query": query, "viewer": viewer_id, "after_rank": after_rank, "after_id": after_id,
+              "limit": limit + 1, "open": marks[0], "close": marks[1]}
+    rows = conn.execute(SEARCH_COMMENTS_SQL if comments else SEARCH_POSTS_SQL, params).fetchall()
+    next_cursor = encode_cursor(rows[limit - 1][-2], rows[limit - 1][-1]) if len(rows) > limit else None
+    if comments:
+        keys = ("id", "post_id", "snippet", "author_id", "created_at", "rank")
+    else:
+        keys = ("id", "title", "snippet", "author_id", "created_at", "rank")
+    return [dict(zip(keys, row)) for row in rows[:limit]], next_cursor
+
+def show_search(db_name, text, viewer_id=None, cursor=None, limit=10, comments=False):
+    """Print one page of search results and the cursor for the next one"""
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    try:
+        start = time.perf_counter()
+        results, next_cursor = search(manager.conn, text, viewer_id, cursor, limit, comments, marks=("[", "]"))
+        elapsed = time.perf_counter() - start
+        for result in results:
+            if comments:
+                print(f"  comment {result['id']} on post {result['post_id']} ({result['rank']:.2f})")
+            else:
+                print(f"  post {result['id']}: {result['title']} ({result['rank']:.2f})")
+            print(f"      {result['snippet']}")
+        print(f"{len(results)} results in {elapsed * 1000:.2f} ms")
+        print(f"Next page: --cursor {next_cursor}" if next_cursor else "Last page")
+        return True
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error searching: {e}")
+        return False
+    finally:
+        manager.disconnect()
+
+# Durable job queue. Jobs are enqueued in the same transaction as the change that
+# caused them, and deleted in the same transaction that applies them, so a crashed
+# worker leaves its batch queued.
+JOB_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS dnd_blog_job (
+        id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+        queue varchar(50) NOT NULL,
+        payload text NOT NULL,
+        enqueued_at real NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS dnd_blog_job_queue_id ON dnd_blog_job (queue, id)",
+    # Who an unread coalesced notification is from, so actor_count counts people
+    # rather than events when a burst is merged into it. Read and deleted
+    # notifications are never merged into again, so their rows go.
+    """
+    CREATE TABLE IF NOT EXISTS dnd_blog_notification_actor (
+        notification_id integer NOT NULL,
+        sender_id integer NOT NULL,
+        PRIMARY KEY (notification_id, sender_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dnd_blog_notification_actor_read
+    AFTER UPDATE OF is_read ON dnd_blog_notification WHEN NEW.is_read
+    BEGIN
+        DELETE FROM dnd_blog_notification_actor WHERE notification_id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dnd_blog_notification_actor_delete
+    AFTER DELETE ON dnd_blog_notification
+    BEGIN
+        DELETE FROM dnd_blog_notification_actor WHERE notification_id = OLD.id;
+    END
+    """
+]
+
+NOTIFICATION_QUEUE = "notifications"
+# Payload field -> the JSON types it may have
+NOTIFICATION_FIELDS = {
+    "notification_type": (str,), "recipient_id": (int,), "sender_id": (int,),
+    "post_id": (int, type(None)), "comment_id": (int, type(None)), "created_at": (str,)
+}
+
+# Notification types whose bursts are folded into one row ("5 people liked your post")
+COALESCED_TYPES = (NOTIFICATION_LIKE, NOTIFICATION_COMMENT)
+
+# The recipient's unread notification about the same post, which a burst is folded
+# into. The + keeps SQLite on the post_id index; the (recipient_id, is_read) index
+# would scan every unread notification of a popular user.
+MERGE_TARGET_SQL = """
+    SELECT id FROM dnd_blog_notification
+    WHERE post_id = :post_id AND +recipient_id = :recipient_id AND notification_type = :notification_type
+      AND is_read = 0
+    ORDER BY id DESC LIMIT 1
+"""
+
+# Folds a burst into notification :id. Its current sender is recorded first, for
+# notifications written before their actors were.
+MERGE_NOTIFICATION_SQL = [
+    """
+    INSERT OR IGNORE INTO dnd_blog_notification_actor (notification_id, sender_id)
+    SELECT id, sender_id FROM dnd_blog_notification WHERE id = :id
+    """,
+    """
+    UPDATE dnd_blog_notification
+    SET actor_count = (SELECT COUNT(*) FROM dnd_blog_notification_actor WHERE notification_id = :id),
+        sender_id = :sender_id, comment_id = :comment_id, created_at = max(created_at, :created_at)
+    WHERE id = :id
+    """
+]
+
+def enqueue(conn, queue, payload):
+    """
+    Add a job to a queue
+    
+    Doesn't commit: call it inside the transaction that makes the change the job is
+    about, so either both happen or neither does.
+    
+    Returns:
+        int: Job id
+    """
+    cursor = conn.execute("INSERT INTO dnd_blog_job (queue, payload, enqueued_at) VALUES (?, ?, ?)",
+                          (queue, json.dumps(payload, separators=(",", ":")), time.time()))
+    return cursor.lastrowid
+
+def enqueue_notification(conn, notification_type, recipient_id, sender_id, post_id=None, comment_id=None):
+    """
+    Queue a notification for the worker instead of writing it during the request
+    
+    Returns:
+        int: Job id, or None when users would be notifying themselves
+    """
+    if recipient_id == sender_id:
+        return None
+    created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+    return enqueue(conn, NOTIFICATION_QUEUE, {
+        "notification_type": notification_type, "recipient_id": recipient_id, "sender_id": sender_id,
+        "post_id": post_id, "comment_id": comment_id, "created_at": created_at
+    })
+
+def coalesce_notifications(payloads):
+    """
+    Fold queued notifications into the rows to write
+    
+    Likes and comments on the same post for the same recipient become one row, with
+    the newest sender and time and the set of distinct senders. Other types are
+    only deduplicated.
+    
+    Returns:
+        list: Notification dicts with a senders key
+    """
+    groups = OrderedDict()
+    for payload in payloads:
+        kind = payload["notification_type"]
+        if kind in COALESCED_TYPES:
+            key = (kind, payload["recipient_id"], payload["post_id"])
+        else:
+            key = (kind, payload["recipient_id"], payload["sender_id"], payload["post_id"], payload["comment_id"])
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = dict(payload, senders={payload["sender_id"]})
+        else:
+            group["senders"].add(payload["sender_id"])
+            if payload["created_at"] >= group["created_at"]:
+                group.update(payload, senders=group["senders"])
+    return list(groups.values())
+
+def write_notifications(conn, notifications):
+    """
+    Write coalesced notifications, merging them into matching unread ones
+    
+    actor_count is the number of distinct senders, including those of earlier
+    bursts merged into the same notification.
+    
+    Returns:
+        tuple: (rows inserted, rows merged into existing notifications)
+    """
+    insert_sql = """
+        INSERT INTO dnd_blog_notification
+            (notification_type, is_read, created_at, comment_id, recipient_id, sender_id, post_id, actor_count)
+        VALUES (:notification_type, 0, :created_at, :comment_id, :recipient_id, :sender_id, :post_id, :actor_count)
+    """
+    add_actors = "INSERT OR IGNORE INTO dnd_blog_notification_actor (notification_id, sender_id) VALUES (?, ?)"
+    inserted = merged = 0
+    others = []
+    for notification in notifications:
+        senders = notification.pop("senders")
+        notification["actor_count"] = len(senders)
+        if notification["notification_type"] not in COALESCED_TYPES:
+            others.append(notification)
+            continue
+        target = conn.execute(MERGE_TARGET_SQL, notification).fetchone()
+        if target:
+            notification_id = target[0]
+        else:
+            notification_id = conn.execute(insert_sql, notification).lastrowid
+        conn.executemany(add_actors, [(notification_id, sender) for sender in senders])
+        if target:
+            for sql in MERGE_NOTIFICATION_SQL:
+                conn.execute(sql, dict(notification, id=notification_id))
+            merged += 1
+        else:
+            inserted += 1
+    conn.executemany(insert_sql, others)
+    return inserted + len(others), merged
+
+def queue_status(conn):
+    """
+    Depth and age of each job queue
+    
+    Returns:
+        dict: Queue name -> {"depth": jobs waiting, "oldest_seconds": age of the oldest}
+    """
+    now = time.time()
+    return {queue: {"depth": depth, "oldest_seconds": now - oldest}
+            for queue, depth, oldest in conn.execute(
+                "SELECT queue, COUNT(*), MIN(enqueued_at) FROM dnd_blog_job GROUP BY queue")}
+
+class NotificationWorker:
+    """
+    Drains the notification queue in batches
+    
+    Each batch is read, coalesced, written and deleted from the queue in one
+    IMMEDIATE transaction, so running several workers is safe: they just take
+    turns.
+    """
+    def __init__(self, conn, batch_size=500, max_samples=10000):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.jobs = 0
+        self.failed = 0
+        self.inserted = 0
+        self.merged = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        # Seconds from enqueue to commit of the most recent jobs
+        self.latencies = deque(maxlen=max_samples)
+    
+    def run_once(self):
+        """
+        Process one batch
+        
+        Returns:
+            int: Jobs taken off the queue (0 when it was empty)
+        """
+        start = time.perf_counter()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            jobs = self.conn.execute("SELECT id, payload, enqueued_at FROM dnd_blog_job WHERE queue = ? "
+                                     "ORDER BY id LIMIT ?", (NOTIFICATION_QUEUE, self.batch_size)).fetchall()
+            if not jobs:
+                self.conn.rollback()
+                return 0
+            payloads = []
+            for job_id, payload, _ in jobs:
+                try:
+                    payload = json.loads(payload)
+                    if not isinstance(payload, dict) or not NOTIFICATION_FIELDS.keys() <= payload.keys():
+                        raise ValueError(f"expected an object with {', '.join(sorted(NOTIFICATION_FIELDS))}")
+                    for field, types in NOTIFICATION_FIELDS.items():
+                        # bool is an int subclass, but true/false are never ids
+                        if not isinstance(payload[field], types) or isinstance(payload[field], bool):
+                            raise ValueError(f"{field} is {payload[field]!r}")
+                    payloads.append(payload)
+                except ValueError as e:
+                    # A job that can never be applied would block the queue forever; drop it
+                    print(f"Error in notification job {job_id}, dropped: {e}")
+                    self.failed += 1
+            inserted, merged = write_notifications(self.conn, coalesce_notifications(payloads))
+            self.conn.execute("DELETE FROM dnd_blog_job WHERE queue = ? AND id <= ?", (NOTIFICATION_QUEUE, jobs[-1][0]))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        
+        done = time.time()
+        self.latencies.extend(done - enqueued_at for _, _, enqueued_at in jobs)
+        self.jobs += len(jobs)
+        self.inserted += inserted
+        self.merged += merged
+        self.batches += 1
+        self.busy_seconds += time.perf_counter() - start
+        return len(jobs)
+    
+    def run(self, poll_interval=0.5, report_every=10.0, once=False):
+        """
+        Process batches until interrupted, sleeping while the queue is empty
+        
+        Args:
+            poll_interval (float): Seconds to wait before checking an empty queue again
+            report_every (float): Seconds between metric reports
+            once (bool): Stop as soon as the queue is empty
+        """
+        last_report = time.monotonic()
+        try:
+            while True:
+                processed = self.run_once()
+                if time.monotonic() - last_report >= report_every:
+                    self.report()
+                    last_report = time.monotonic()
+                if not processed:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            print("Stopping notification worker")
+        self.report()
+    
+    def stats(self):
+        """Counters, queue depth and enqueue-to-commit latency percentiles"""
+        latencies = sorted(self.latencies)
+        status = queue_status(self.conn).get(NOTIFICATION_QUEUE, {"depth": 0, "oldest_seconds": 0.0})
+        written = self.inserted + self.merged
+        return {
+            "queue_depth": status["depth"],
+            "oldest_job_seconds": status["oldest_seconds"],
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "batches": self.batches,
+            "inserted": self.inserted,
+            "merged": self.merged,
+            "coalescing": self.jobs / written if written else 0.0,
+            "jobs_per_sec": self.jobs / self.busy_seconds if self.busy_seconds else 0.0,
+            "latency_p50_ms": percentile(latencies, 50) * 1000 if latencies else 0.0,
+            "latency_p95_ms": percentile(latencies, 95) * 1000 if latencies else 0.0,
+            "latency_p99_ms": percentile(latencies, 99) * 1000 if latencies else 0.0
+        }
+    
+    def report(self):
+        """Print the worker's metrics on one line"""
+        stats = self.stats()
+        print(f"queue depth {stats['queue_depth']:,} (oldest {stats['oldest_job_seconds']:.1f}s) | "
+              f"{stats['jobs']:,} jobs -> {stats['inserted']:,} new + {stats['merged']:,} merged "
+              f"({stats['coalescing']:.1f}x) | {stats['jobs_per_sec']:,.0f} jobs/s | "
+              f"latency p50 {stats['latency_p50_ms']:.0f} ms, p95 {stats['latency_p95_ms']:.0f} ms, "
+              f"p99 {stats['latency_p99_ms']:.0f} ms")
+
+def manage_queue(db_name, action="install"):
+    """
+    Set up or inspect the job queue
+    
+    A Django migration that rebuilds dnd_blog_notification drops actor_count and
+    the triggers that clear dnd_blog_notification_actor; the worker then fails.
+    Run install again after migrating.
+    
+    Args:
+        db_name (str): Blog database
+        action (str): "install" creates dnd_blog_job and dnd_blog_notification_actor
+            and adds actor_count to dnd_blog_notification, "status" prints each
+            queue's depth, "uninstall" drops both tables and any jobs in them
+            (actor_count is kept)
+    
+    Returns:
+        bool: True on success
+    """
+    def install(conn):
+        for sql in JOB_SCHEMA_SQL:
+            conn.execute(sql)
+        if "actor_count" not in _columns(conn, "dnd_blog_notification"):
+            conn.execute("ALTER TABLE dnd_blog_notification ADD COLUMN actor_count integer NOT NULL DEFAULT 1")
+        print("Job queue installed")
+    
+    def status(conn):
+        queues = queue_status(conn)
+        if not queues:
+            print("All queues are empty")
+        for queue, info in queues.items():
+            print(f"  {queue:<16} {info['depth']:>10,} jobs, oldest {info['oldest_seconds']:.1f}s")
+    
+    def uninstall(conn):
+        conn.execute("DROP TABLE dnd_blog_job")
+        conn.execute("DROP TRIGGER IF EXISTS dnd_blog_notification_actor_read")
+        conn.execute("DROP TRIGGER IF EXISTS dnd_blog_notification_actor_delete")
+        conn.execute("DROP TABLE IF EXISTS dnd_blog_notification_actor")
+        print("Job queue removed")
+    
+    return manage_feature(db_name, "the job queue", "queue", action,
+                          {"install": install, "status": status, "uninstall": uninstall},
+                          lambda conn: _has_table(conn, "dnd_blog_job"))
+
+def notification_worker(db_name, batch_size=500, poll_interval=0.5, report_every=10.0, once=False):
+    """Run a NotificationWorker against a database until interrupted (or, with once, until the queue is empty)"""
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    try:
+        if not all(_has_table(manager.conn, name) for name in ("dnd_blog_job", "dnd_blog_notification_actor")):
+            print("The job queue is not installed; run: python sqlite_manager.py queue install")
+            return False
+        NotificationWorker(manager.conn, batch_size).run(poll_interval, report_every, once)
+        return True
+    except sqlite3.Error as e:
+        print(f"Error in notification worker: {e}")
+        return False
+    finally:
+        manager.disconnect()
+
+def _django_now(days=0):
+    """Current UTC time minus days, in the text format Django stores datetimes in"""
+    moment = datetime.now(timezone.utc).timestamp() - days * 86400
+    return datetime.fromtimestamp(moment, timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def _file_stats(conn, db_name):
+    """Size on disk (with any WAL file) and page counts of a database"""
+    size = sum(os.path.getsize(path) for path in (db_name, db_name + "-wal") if os.path.exists(path))
+    return {
+        "bytes": size,
+        "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+        "pages": conn.execute("PRAGMA page_count").fetchone()[0],
+        "free_pages": conn.execute("PRAGMA freelist_count").fetchone()[0]
+    }
+
+def archive_notifications(conn, archive_db, days, batch_size=5000, pause=0.05):
+    """
+    Move notifications older than days into a separate archive database
+    
+    Rows are moved in batches, walking the table once in id order so no batch
+    rescans rows an earlier one skipped. Each batch is committed to the archive
+    first, synced to disk, and only then deleted from the blog database in a second
+    short transaction: a commit spanning attached databases is not atomic in WAL
+    mode. A crash in between leaves the batch in both, and the next run's
+    INSERT OR REPLACE copies it again before deleting it. The archive table has
+    no secondary indexes, which keeps it compact.
+    
+    Args:
+        conn (sqlite3.Connection): Blog database, not inside a transaction
+        archive_db (str): Archive database file, created if missing
+        days (float): Keep notifications newer than this many days
+        batch_size (int): Notifications moved per transaction
+        pause (float): Seconds to sleep between batches so other writers get in
+    
+    Returns:
+        int: Number of notifications archived
+    """
+    columns = [row[1:3] for row in conn.execute("PRAGMA table_info(dnd_blog_notification)")]
+    names = ", ".join(name for name, _ in columns)
+    cutoff = _django_now(days)
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_db,))
+    try:
+        conn.execute("PRAGMA archive.synchronous = FULL")
+        definitions = ", ".join(f"{name} {kind}" + (" NOT NULL PRIMARY KEY" if name == "id" else "")
+                                for name, kind in columns)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archive.dnd_blog_notification_archive ({definitions})")
+        archived_columns = {row[1] for row in conn.execute("PRAGMA archive.table_info(dnd_blog_notification_archive)")}
+        for name, kind in columns:
+            if name not in archived_columns:
+                # Columns added since the archive was created (e.g. actor_count)
+                conn.execute(f"ALTER TABLE archive.dnd_blog_notification_archive ADD COLUMN {name} {kind}")
+        conn.commit()
+        
+        moved = last_id = 0
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            upto = conn.execute("""
+                SELECT MAX(id) FROM (
+                    SELECT id FROM dnd_blog_notification WHERE id > ? AND created_at < ? ORDER BY id LIMIT ?
+                )
+            """, (last_id, cutoff, batch_size)).fetchone()[0]
+            if upto is None:
+                conn.rollback()
+                break
+            batch = "id > ? AND id <= ? AND created_at < ?"
+            conn.execute(f"""
+                INSERT OR REPLACE INTO archive.dnd_blog_notification_archive ({names})
+                SELECT {names} FROM main.dnd_blog_notification WHERE {batch}
+            """, (last_id, upto, cutoff))
+            conn.commit()
+            
+            # Only rows the archive now holds are deleted
+            conn.execute("BEGIN IMMEDIATE")
+            moved += conn.execute(f"""
+                DELETE FROM main.dnd_blog_notification WHERE {batch} AND id IN (
+                    SELECT id FROM archive.dnd_blog_notification_archive WHERE id > ? AND id <= ?
+                )
+            """, (last_id, upto, cutoff, last_id, upto)).rowcount
+            conn.commit()
+            last_id = upto
+            time.sleep(pause)
+        return moved
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+
+def purge_sessions(conn, batch_size=1000, pause=0.05):
+    """
+    Delete expired django_session rows a chunk at a time
+    
+    Each chunk is its own transaction, so logins never wait long on the purge.
+    
+    Returns:
+        int: Number of sessions deleted
+    """
+    now = _django_now()
+    purged = 0
+    while True:
+        deleted = conn.execute("""
+            DELETE FROM django_session WHERE session_key IN (
+                SELECT session_key FROM django_session WHERE expire_date < ? LIMIT ?
+            )
+        """, (now, batch_size)).rowcount
+        conn.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+        time.sleep(pause)
+
+def incremental_vacuum(conn, step_pages=1000, pause=0.05):
+    """
+    Hand free pages back to the file system a few at a time
+    
+    Only works on databases in auto_vacuum=INCREMENTAL mode.
+    
+    Returns:
+        int: Number of pages released
+    """
+    released = 0
+    while True:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            return released
+        # The pragma frees one page per step and returns no rows, so execute() would
+        # free just one; executescript() runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({min(step_pages, free)})")
+        released += free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        time.sleep(pause)
+
+def maintain(db_name, notification_days=None, archive_db="archive.sqlite3", purge=True, vacuum=True,
+             enable_incremental=False, batch_size=5000, pause=0.05):
+    """
+    Archive old notifications, purge expired sessions and reclaim free pages
+    
+    Args:
+        db_name (str): Blog database
+        notification_days (float, optional): Archive notifications older than this;
+            None leaves them alone
+        archive_db (str): Database old notifications are moved to
+        purge (bool): Delete expired sessions
+        vacuum (bool): Run incremental_vacuum afterwards
+        enable_incremental (bool): Switch the database to auto_vacuum=INCREMENTAL
+            first. This needs one full VACUUM, which locks and rewrites the whole file.
+        batch_size (int): Rows per transaction
+        pause (float): Seconds between batches
+    
+    Returns:
+        bool: True on success
+    """
+    if notification_days is not None and os.path.abspath(archive_db) == os.path.abspath(db_name):
+        print("Error: the archive database must be a different file")
+        return False
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return False
+    conn = manager.conn
+    start = time.perf_counter()
+    try:
+        before = _file_stats(conn, db_name)
+        if notification_days is not None:
+            moved = archive_notifications(conn, archive_db, notification_days, batch_size, pause)
+            print(f"  Archived {moved:,} notifications older than {notification_days:g} days to {archive_db}")
+        if purge:
+            print(f"  Purged {purge_sessions(conn, batch_size, pause):,} expired sessions")
+        
+        if enable_incremental and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("  Switching to auto_vacuum=INCREMENTAL (full VACUUM)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        if vacuum:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                print(f"  Released {incremental_vacuum(conn, pause=pause):,} free pages")
+            else:
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                print(f"  {free:,} free pages kept: auto_vacuum is not INCREMENTAL "
+                      f"(run once with --enable-incremental)")
+        
+        after = _file_stats(conn, db_name)
+        print(f"\n{'':<12} {'Before':>16} {'After':>16} {'Change':>16}")
+        for key, label in (("bytes", "File bytes"), ("pages", "Pages"), ("free_pages", "Free pages")):
+            print(f"{label:<12} {before[key]:>16,} {after[key]:>16,} {after[key] - before[key]:>+16,}")
+        print(f"Done in {time.perf_counter() - start:.2f}s")
+        return True
+    except sqlite3.Error as e:
+        print(f"Error during maintenance: {e}")
+        return False
+    finally:
+        manager.disconnect()
@@ -0,0 +1,32 @@
+-- Hot queries of the D&D&D blog, for: python sqlite_manager.py advise db.sqlite3 blog_workload.sql
+
+-- Public feed, newest first
+SELECT id, title, author_id, created_at FROM dnd_blog_post
+WHERE visibility = 'public'
+ORDER BY created_at DESC LIMIT 20;
+
+-- Friends-only posts from accepted friends of user 1
+SELECT p.id, p.title, p.created_at FROM dnd_blog_post p
+JOIN dnd_blog_friendship f ON f.sender_id = p.author_id
+WHERE f.receiver_id = 1 AND f.status = 'accepted' AND p.visibility = 'friends'
+ORDER BY p.created_at DESC LIMIT 20;
+
+-- Like count for one post
+SELECT COUNT(*) FROM dnd_blog_post_likes WHERE post_id = 1;
+
+-- Unread notification badge
+SELECT COUNT(*) FROM dnd_blog_notification WHERE recipient_id = 1 AND is_read = 0;
+
+-- Notification page
+SELECT id, notification_type, sender_id, post_id, created_at FROM dnd_blog_notification
+WHERE recipient_id = 1
+ORDER BY created_at DESC LIMIT 20;
+
+-- Comments under a post, oldest first
+SELECT id, author_id, content, created_at FROM dnd_blog_comment
+WHERE post_id = 1
+ORDER BY created_at LIMIT 50;
+
+-- Has user 1 blocked user 2, or the other way round
+SELECT COUNT(*) FROM dnd_blog_userblock
+WHERE (blocker_id = 1 AND blocked_id = 2) OR (blocker_id = 2 AND blocked_id = 1);
@@ -1,31 +1,605 @@
 import sqlite3
+import argparse
+import gzip
 import os
+import shutil
 import sys
+import time
+import json
+import math
+import queue
+import re
+import threading
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import chain, islice
+from urllib.parse import quote
+
+# Statements starting with these keywords are sent to read-only connections in pooled mode
+READ_KEYWORDS = ("select", "with", "explain", "values")
+
+# Named connection settings for SQLiteManager(performance_profile=...), applied in this order
+PERFORMANCE_PROFILES = {
+    # SQLite's own defaults for the connection; the journal mode is left as the file has it
+    "default": {"synchronous": "FULL", "cache_size": -2000, "mmap_size": 0, "temp_store": "DEFAULT"},
+    # Every commit is fsynced, WAL included, so nothing committed is lost on power failure
+    "durable": {"journal_mode": "WAL", "synchronous": "FULL", "cache_size": -65536,
+                "mmap_size": 0, "temp_store": "DEFAULT"},
+    # Read-heavy analytics: a 256 MiB page cache and memory-mapped reads. NORMAL in WAL mode
+    # can lose the last commits on power failure but never corrupts the database.
+    "fast-read": {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -262144,
+                  "mmap_size": 1024 ** 3, "temp_store": "MEMORY"},
+    # Loading a database nobody else is using: no fsync and an in-memory rollback journal,
+    # so a crash mid-load can corrupt the file. page_size only applies to new databases.
+    "bulk-load": {"page_size": 8192, "journal_mode": "MEMORY", "synchronous": "OFF", "cache_size": -524288,
+                  "mmap_size": 0, "temp_store": "MEMORY"}
+}
+
+# Settings that belong to the database file rather than the connection
+FILE_SETTINGS = ("page_size", "journal_mode")
+
+# Profiles only synth uses, on the database it is building: they turn off fsync
+BUILD_PROFILES = ("bulk-load",)
+
+# Profiles a user can pick for an existing database (interactive --profile, settings, SQLITE_PROFILE)
+USER_PROFILES = [name for name in PERFORMANCE_PROFILES if name not in BUILD_PROFILES]
+
+SYNCHRONOUS_NAMES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+TEMP_STORE_NAMES = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+def is_read_query(query):
+    """Return True if the statement only reads from the database"""
+    words = query.split(None, 1)
+    return bool(words) and words[0].lower() in READ_KEYWORDS
+
+# Quoted literals are matched first so whitespace inside them is left alone
+_WHITESPACE_OUTSIDE_QUOTES = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|\s+")
+
+def normalize_sql(query):
+    """Collapse whitespace outside string literals and drop a trailing semicolon"""
+    query = _WHITESPACE_OUTSIDE_QUOTES.sub(lambda m: m.group(1) or " ", query).strip()
+    return query.rstrip(";").rstrip()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_OPERATOR = re.compile(r"\s*(<=|>=|<>|!=|==|=|<|>)\s*")
+
+def fingerprint_sql(query):
+    """
+    Reduce a statement to its shape so calls that only differ in literals group together
+    
+    Example:
+        "SELECT * FROM t WHERE id IN (1, 2) AND name = 'x'" -> "select * from t where id in (...) and name = ?"
+    """
+    query = _STRING_LITERAL.sub("?", normalize_sql(query))
+    query = _NUMBER_LITERAL.sub("?", query).lower()
+    query = _OPERATOR.sub(r" \1 ", query)
+    return _IN_LIST.sub("in (...)", query)
+
+def percentile(sorted_values, pct):
+    """Return the nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[min(len(sorted_values) - 1, max(0, index))]
+
+def at_least(minimum, number=int):
+    """argparse type accepting numbers no smaller than minimum"""
+    def parse(text):
+        value = number(text)
+        if value < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {text}")
+        return value
+    return parse
+
+def connection_settings(conn):
+    """The settings PERFORMANCE_PROFILES control, as currently in effect on a connection"""
+    settings = {}
+    for pragma in ("page_size", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store"):
+        row = conn.execute(f"PRAGMA {pragma}").fetchone()
+        settings[pragma] = row[0] if row else None
+    settings["synchronous"] = SYNCHRONOUS_NAMES.get(settings["synchronous"], settings["synchronous"])
+    settings["temp_store"] = TEMP_STORE_NAMES.get(settings["temp_store"], settings["temp_store"])
+    return settings
+
+def apply_performance_profile(conn, name, file_settings=True):
+    """
+    Apply one of PERFORMANCE_PROFILES to a connection
+    
+    Args:
+        conn (sqlite3.Connection): Connection outside any transaction
+        name (str): Profile name
+        file_settings (bool): Also set journal_mode and page_size, which change the
+            database file for every connection; read-only connections can't
+    
+    Returns:
+        dict: The settings now in effect, from connection_settings()
+    
+    Raises:
+        ValueError: If there is no such profile
+    """
+    if name not in PERFORMANCE_PROFILES:
+        raise ValueError(f"Unknown performance profile: {name} (choose from {', '.join(PERFORMANCE_PROFILES)})")
+    for pragma, value in PERFORMANCE_PROFILES[name].items():
+        if not file_settings and pragma in FILE_SETTINGS:
+            continue
+        if pragma == "page_size" and conn.execute("PRAGMA page_count").fetchone()[0]:
+            continue  # fixed once the database has pages, until a VACUUM
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return connection_settings(conn)
+
+def explain_query_plan(conn, query, params=None):
+    """
+    Run EXPLAIN QUERY PLAN for a statement
+    
+    Returns:
+        list: Plan steps as strings, indented by their depth in the plan tree
+    """
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+    depth = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.append("  " * depth[node_id] + detail)
+    return plan
+
+class QueryCache:
+    """
+    LRU cache of query results keyed on normalized SQL plus parameters
+    
+    Entries expire after ttl seconds, and the whole cache is dropped when the
+    database's data_version moves, i.e. when another connection commits.
+    """
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.data_version = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(query, params=None):
+        """Return the cache key for a query, or None if its params can't be hashed"""
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        elif params is not None:
+            params = tuple(params)
+        key = (normalize_sql(query), params or ())
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+    
+    def check_version(self, data_version):
+        """Drop every entry if the database changed since the last check"""
+        with self._lock:
+            if self.data_version is not None and data_version != self.data_version:
+                self._clear()
+            self.data_version = data_version
+    
+    def get(self, key):
+        """Return cached results for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, results, generation):
+        """
+        Store results for key
+        
+        Args:
+            key: Key from make_key()
+            results (list): Query results
+            generation (int): Value of self.generation read before the query ran.
+                Results are dropped if the cache was invalidated in the meantime.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self):
+        """Drop every entry"""
+        with self._lock:
+            self._clear()
+    
+    def _clear(self):
+        self._entries.clear()
+        self.generation += 1
+        self.invalidations += 1
+    
+    def stats(self):
+        """Return the cache counters as a dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+class ConnectionPool:
+    """
+    Thread-safe pool of connections to one SQLite database
+    
+    Writes go through a single writer connection guarded by a lock, since SQLite
+    only allows one writer at a time anyway. Reads check out one of up to max_size
+    read-only connections, which in WAL mode never wait on the writer.
+    """
+    def __init__(self, db_name, max_size=4, busy_timeout=5000, wal=True, acquire_timeout=30,
+                 performance_profile=None):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.busy_timeout = busy_timeout
+        self.acquire_timeout = acquire_timeout
+        self.performance_profile = performance_profile
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._created = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        
+        # The writer is opened first so the database file exists for the readers
+        self._writer = self._open(readonly=False)
+        if wal:
+            self._writer.execute("PRAGMA journal_mode=WAL")
+        if performance_profile:
+            apply_performance_profile(self._writer, performance_profile, file_settings=False)
+        self.journal_mode = self._writer.execute("PRAGMA journal_mode").fetchone()[0]
+    
+    def _connect(self, readonly):
+        """Open a connection that may be handed between threads"""
+        if readonly:
+            uri = f"file:{quote(os.path.abspath(self.db_name))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   timeout=self.busy_timeout / 1000)
+        else:
+            conn = sqlite3.connect(self.db_name, check_same_thread=False,
+                                   timeout=self.busy_timeout / 1000)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        if readonly and self.performance_profile:
+            apply_performance_profile(conn, self.performance_profile, file_settings=False)
+        return conn
+    
+    def _open(self, readonly):
+        """Open a connection that close() will close"""
+        conn = self._connect(readonly)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+    
+    def open_reader(self):
+        """
+        Open a read-only connection outside the pool, e.g. for a long-running stream
+        
+        Returns:
+            sqlite3.Connection: The connection; the caller closes it
+        """
+        return self._connect(readonly=True)
+    
+    def acquire(self, readonly=True):
+        """
+        Check out a connection
+        
+        Args:
+            readonly (bool): Hand out a read-only connection instead of the writer
+        
+        Returns:
+            sqlite3.Connection: The connection, to be given back with release()
+        """
+        if not readonly:
+            if not self._write_lock.acquire(timeout=self.acquire_timeout):
+                raise TimeoutError("Timed out waiting for the writer connection")
+            return self._writer
+        
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_open = self._created < self.max_size
+            if can_open:
+                self._created += 1
+        if can_open:
+            try:
+                return self._open(readonly=True)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Timed out waiting for one of {self.max_size} read connections")
+    
+    def release(self, conn):
+        """Give a connection from acquire() back to the pool"""
+        if conn is self._writer:
+            self._write_lock.release()
+        else:
+            self._idle.put(conn)
+    
+    @contextmanager
+    def connection(self, readonly=True):
+        """
+        Check out a connection for the duration of a with block
+        
+        The writer commits when the block finishes and rolls back if it raises.
+        """
+        conn = self.acquire(readonly)
+        try:
+            yield conn
+            if not readonly:
+                conn.commit()
+        except Exception:
+            if not readonly:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+    
+    def close(self):
+        """Close every connection the pool has opened"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+class QueryProfiler:
+    """
+    Per-fingerprint statement timings, plus a JSONL log of slow statements
+    
+    Each slow log line holds the statement, its parameters, wall time, row count
+    and EXPLAIN QUERY PLAN output.
+    """
+    def __init__(self, slow_ms=100, slow_log="slow_queries.jsonl", max_samples=1000):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.max_samples = max_samples
+        self.slow_count = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+    
+    def is_slow(self, elapsed):
+        """Return True if a call taking elapsed seconds belongs in the slow log"""
+        return self.slow_ms is not None and elapsed * 1000 >= self.slow_ms
+    
+    def record(self, query, params, elapsed, rows, plan=None):
+        """
+        Record one statement execution
+        
+        Args:
+            query (str): SQL statement
+            params: Statement parameters
+            elapsed (float): Wall time in seconds
+            rows (int): Rows returned or written
+            plan (list, optional): EXPLAIN QUERY PLAN output, given for slow statements
+        """
+        fingerprint = fingerprint_sql(query)
+        with self._lock:
+            stat = self._stats.get(fingerprint)
+            if stat is None:
+                stat = self._stats[fingerprint] = {
+                    "calls": 0, "rows": 0, "total": 0.0,
+                    "samples": deque(maxlen=self.max_samples)
+                }
+            stat["calls"] += 1
+            stat["rows"] += rows
+            stat["total"] += elapsed
+            stat["samples"].append(elapsed)
+            
+            if plan is not None and self.slow_log:
+                self.slow_count += 1
+                entry = {
+                    "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+                    "fingerprint": fingerprint,
+                    "sql": query,
+                    "params": params,
+                    "elapsed_ms": round(elapsed * 1000, 3),
+                    "rows": rows,
+                    "plan": plan
+                }
+                with open(self.slow_log, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+    
+    def top(self, limit=10):
+        """
+        Return the fingerprints with the most total time
+        
+        Returns:
+            list: Dicts with calls, rows, total_ms and p50/p95/p99 latency in ms
+        """
+        with self._lock:
+            snapshot = [(fp, dict(stat, samples=sorted(stat["samples"])))
+                        for fp, stat in self._stats.items()]
+        report = []
+        for fingerprint, stat in snapshot:
+            samples = stat["samples"]
+            report.append({
+                "fingerprint": fingerprint,
+                "calls": stat["calls"],
+                "rows": stat["rows"],
+                "total_ms": stat["total"] * 1000,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000
+            })
+        report.sort(key=lambda item: item["total_ms"], reverse=True)
+        return report[:limit]
+    
+    def reset(self):
+        """Forget all recorded timings"""
+        with self._lock:
+            self._stats.clear()
+            self.slow_count = 0
 
 class SQLiteManager:
-    def __init__(self, db_name="database.db"):
+    def __init__(self, db_name="database.db", pool_size=None, busy_timeout=5000,
+                 cache_size=None, cache_ttl=None, performance_profile=None):
+        """
+        Args:
+            db_name (str): Path to the database file
+            pool_size (int, optional): Use a thread-safe ConnectionPool with up to this
+                many read-only connections instead of a single shared connection
+            busy_timeout (int): Milliseconds to wait on a locked database in pooled mode
+            cache_size (int, optional): Cache up to this many query_data results
+            cache_ttl (float, optional): Seconds a cached result stays valid
+            performance_profile (str, optional): One of PERFORMANCE_PROFILES to apply on
+                connect. Its journal_mode and page_size are left alone, so connecting
+                never changes the database file.
+        """
         self.db_name = db_name
+        self.performance_profile = performance_profile
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        self.cache = QueryCache(cache_size, cache_ttl) if cache_size else None
+        self.pool = None
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+        self.profiler = None
+        self.profiling = False
         self.conn = None
         self.cursor = None
     
     def connect(self):
         """Connect to the database"""
         try:
+            if self.pool_size:
+                self.pool = ConnectionPool(self.db_name, max_size=self.pool_size,
+                                           busy_timeout=self.busy_timeout,
+                                           performance_profile=self.performance_profile)
+                if self.cache is not None:
+                    # Pooled readers each count data_version separately, so watch one fixed connection
+                    self._monitor = self.pool._open(readonly=True)
+                print(f"Connected to database: {self.db_name} "
+                      f"(pooled, {self.pool_size} readers, journal_mode={self.pool.journal_mode}"
+                      f"{f', profile: {self.performance_profile}' if self.performance_profile else ''})")
+                return True
             self.conn = sqlite3.connect(self.db_name)
             self.cursor = self.conn.cursor()
-            print(f"Connected to database: {self.db_name}")
+            if self.performance_profile:
+                apply_performance_profile(self.conn, self.performance_profile, file_settings=False)
+                print(f"Connected to database: {self.db_name} (profile: {self.performance_profile})")
+            else:
+                print(f"Connected to database: {self.db_name}")
             return True
         except Exception as e:
             print(f"Error connecting to database: {e}")
+            if self.conn:
+                self.conn.close()
+                self.conn = None
             return False
     
     def disconnect(self):
         """Disconnect from the database"""
-        if self.conn:
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+            print("Disconnected from database")
+        elif self.conn:
             self.conn.close()
             print("Disconnected from database")
     
+    @contextmanager
+    def _connection(self, readonly=False):
+        """
+        Yield the connection a statement should run on: the shared one, or a pooled one
+        
+        Cached results are dropped whenever a writable connection is handed back, so
+        every write path through the manager invalidates the cache.
+        """
+        try:
+            if self.pool is None:
+                yield self.conn
+            else:
+                with self.pool.connection(readonly) as conn:
+                    yield conn
+        finally:
+            if not readonly:
+                self._invalidate_cache()
+    
+    @contextmanager
+    def _stream_connection(self, readonly):
+        """Yield the connection iter_query streams from; in pooled mode a dedicated reader"""
+        if self.pool is None:
+            with self._connection(readonly) as conn:
+                yield conn
+            return
+        conn = self.pool.open_reader()
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def _data_version(self):
+        """Return PRAGMA data_version, which changes when another connection commits"""
+        if self._monitor is not None:
+            with self._monitor_lock:
+                return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def enable_profiling(self, slow_ms=100, slow_log="slow_queries.jsonl"):
+        """
+        Start timing every statement run through the manager
+        
+        Args:
+            slow_ms (float): Statements at least this slow go to the slow log
+            slow_log (str): JSONL file that slow statements are appended to
+        """
+        if self.profiler is None:
+            self.profiler = QueryProfiler(slow_ms, slow_log)
+        else:
+            self.profiler.slow_ms = slow_ms
+            self.profiler.slow_log = slow_log
+        self.profiling = True
+    
+    def disable_profiling(self):
+        """Stop timing statements, keeping what was recorded so far"""
+        self.profiling = False
+    
+    def _profile(self, conn, query, params, elapsed, rows):
+        """Hand a finished statement to the profiler, with its plan if it was slow"""
+        if not self.profiling:
+            return
+        plan = None
+        if self.profiler.is_slow(elapsed):
+            try:
+                plan = explain_query_plan(conn, query, params)
+            except sqlite3.Error:
+                plan = []
+        self.profiler.record(query, params, elapsed, rows, plan)
+    
+    def _invalidate_cache(self):
+        """Drop cached results after this manager writes"""
+        if self.cache is not None:
+            self.cache.invalidate()
+    
     def create_table(self, table_name, columns):
         """
         Create a table with specified columns
@@ -37,8 +611,11 @@ class SQLiteManager:
         try:
             columns_str = ", ".join(columns)
             query = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns_str})"
-            self.cursor.execute(query)
-            self.conn.commit()
+            with self._connection() as conn:
+                start = time.perf_counter()
+                conn.execute(query)
+                conn.commit()
+                self._profile(conn, query, None, time.perf_counter() - start, 0)
             print(f"Table '{table_name}' created successfully")
         except Exception as e:
             print(f"Error creating table: {e}")
@@ -58,12 +635,77 @@ class SQLiteManager:
             columns_str = ", ".join(columns)
             
             query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
-            self.cursor.execute(query, values)
-            self.conn.commit()
+            with self._connection() as conn:
+                start = time.perf_counter()
+                conn.execute(query, values)
+                conn.commit()
+                self._profile(conn, query, values, time.perf_counter() - start, 1)
             print(f"Data inserted into '{table_name}' successfully")
         except Exception as e:
             print(f"Error inserting data: {e}")
     
+    def insert_many(self, table_name, rows, columns=None, chunk_size=1000):
+        """
+        Insert many rows into a table inside a single transaction
+        
+        Args:
+            table_name (str): Name of the table
+            rows (iterable): Dicts of column_name: value pairs, or tuples of values.
+                Generators are consumed lazily, chunk_size rows at a time.
+            columns (list, optional): Column names for tuple rows. Taken from the
+                first row's keys when rows are dicts.
+            chunk_size (int): Number of rows passed to each executemany call
+        
+        Returns:
+            int: Number of rows inserted
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            print(f"No rows to insert into '{table_name}'")
+            return 0
+        
+        if isinstance(first, dict):
+            if columns is None:
+                columns = list(first.keys())
+            values = (tuple(row[col] for col in columns) for row in chain([first], rows))
+            width = len(columns)
+        else:
+            values = chain([first], rows)
+            width = len(columns) if columns else len(first)
+        
+        placeholders = ", ".join(["?"] * width)
+        if columns:
+            query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        else:
+            query = f"INSERT INTO {table_name} VALUES ({placeholders})"
+        
+        inserted = 0
+        start = time.perf_counter()
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    while True:
+                        chunk = list(islice(values, chunk_size))
+                        if not chunk:
+                            break
+                        cursor.executemany(query, chunk)
+                        inserted += len(chunk)
+                    conn.commit()
+                    self._profile(conn, query, None, time.perf_counter() - start, inserted)
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            print(f"Error inserting data: {e}")
+            return 0
+        
+        elapsed = time.perf_counter() - start
+        rate = inserted / elapsed if elapsed > 0 else float("inf")
+        print(f"Inserted {inserted} rows into '{table_name}' in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+        return inserted
+    
     def query_data(self, query, params=None):
         """
         Execute a query and return results
@@ -75,23 +717,99 @@ class SQLiteManager:
         Returns:
             list: Query results
         """
+        readonly = is_read_query(query)
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
+            key = None
+            if self.cache is not None and readonly:
+                key = self.cache.make_key(query, params)
+            if key is not None:
+                self.cache.check_version(self._data_version())
+                generation = self.cache.generation
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return list(cached)
             
-            results = self.cursor.fetchall()
+            with self._connection(readonly=readonly) as conn:
+                start = time.perf_counter()
+                cursor = conn.cursor()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                results = cursor.fetchall()
+                self._profile(conn, query, params, time.perf_counter() - start, len(results))
+            
+            if key is not None:
+                self.cache.put(key, results, generation)
+                results = list(results)
             return results
         except Exception as e:
             print(f"Error executing query: {e}")
             return []
     
+    def iter_query(self, query, params=None, batch_size=500, row_type="tuple"):
+        """
+        Execute a query and yield results in batches instead of all at once
+        
+        In pooled mode the rows are streamed from a dedicated read-only connection,
+        so a slow consumer never holds a pooled reader or the writer. Only read
+        statements can be streamed there; send writes through query_data. Call
+        close() on the generator when stopping early to release the connection
+        straight away.
+        
+        Args:
+            query (str): SQL query
+            params (tuple, optional): Query parameters
+            batch_size (int): Number of rows fetched from SQLite per fetchmany call
+            row_type (str): "tuple" for plain tuples, "namedtuple" for records with
+                attribute access, or "row" for sqlite3.Row objects
+        
+        Yields:
+            Query results, one row at a time
+        """
+        readonly = is_read_query(query)
+        if self.pool is not None and not readonly:
+            print("Error executing query: only read statements can be streamed in pooled mode; use query_data")
+            return
+        try:
+            with self._stream_connection(readonly) as conn:
+                # Use a dedicated cursor so other calls on the manager don't reset this one
+                cursor = conn.cursor()
+                if row_type == "row":
+                    cursor.row_factory = sqlite3.Row
+                try:
+                    # Only time spent inside SQLite counts, not time the caller spends per row
+                    start = time.perf_counter()
+                    cursor.execute(query, params or ())
+                    elapsed = time.perf_counter() - start
+                    
+                    record = None
+                    if row_type == "namedtuple" and cursor.description:
+                        fields = [col[0] for col in cursor.description]
+                        record = namedtuple("Record", fields, rename=True)._make
+                    
+                    count = 0
+                    while True:
+                        start = time.perf_counter()
+                        rows = cursor.fetchmany(batch_size)
+                        elapsed += time.perf_counter() - start
+                        if not rows:
+                            break
+                        count += len(rows)
+                        for row in rows:
+                            yield record(row) if record else row
+                    self._profile(conn, query, params, elapsed, count)
+                finally:
+                    cursor.close()
+        except Exception as e:
+            print(f"Error executing query: {e}")
+    
     def show_tables(self):
         """Show all tables in the database"""
         try:
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = self.cursor.fetchall()
+            with self._connection(readonly=True) as conn:
+                tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
             if tables:
                 print("Tables in database:")
                 for table in tables:
@@ -104,8 +822,8 @@ class SQLiteManager:
     def describe_table(self, table_name):
         """Show table structure"""
         try:
-            self.cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = self.cursor.fetchall()
+            with self._connection(readonly=True) as conn:
+                columns = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
             if columns:
                 print(f"Table structure for '{table_name}':")
                 print("Column Name | Type | Not Null | Primary Key | Default")
@@ -117,6 +835,277 @@ class SQLiteManager:
         except Exception as e:
             print(f"Error describing table: {e}")
 
+_TABLE_REF = re.compile(r'\b(?:from|join)\s+"?(\w+)"?(?:\s+(?:as\s+)?"?(\w+)"?)?', re.I)
+_PREDICATE = re.compile(
+    r'(?:"?(\w+)"?\.)?"?(\w+)"?\s*(==|=|<=|>=|<>|!=|<|>|\bin\b|\bis\b|\bbetween\b)', re.I)
+_JOIN_PREDICATE = re.compile(r'"?(\w+)"?\."?(\w+)"?\s*(?:==|=)\s*"?(\w+)"?\."?(\w+)"?')
+_ORDER_BY = re.compile(r'\border\s+by\s+(.*?)(?:\blimit\b|\boffset\b|$)', re.I | re.S)
+_SELECT_LIST = re.compile(r'^\s*select\s+(?:distinct\s+)?(.*?)\s+from\b', re.I | re.S)
+_COLUMN_REF = re.compile(r'(?:"?(\w+)"?\.)?"?([a-z_]\w*)"?', re.I)
+_PLAN_STEP = re.compile(r'^(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (COVERING )?INDEX \w+(?: \((.*)\))?)?')
+_CLAUSE_WORDS = {
+    "where", "join", "inner", "left", "right", "full", "cross", "outer", "natural",
+    "on", "using", "order", "group", "limit", "having", "union", "as", "select"
+}
+
+class IndexAdvisor:
+    """
+    Suggests composite indexes for a workload from EXPLAIN QUERY PLAN output
+    
+    Plans are searched for full table scans, temp B-tree sorts and index searches that
+    only use part of the WHERE clause. The suggested index for a flagged table is its
+    equality-filtered columns, then its join columns, then its ORDER BY columns (or first
+    range column), plus up to two short selected columns so the index covers the query.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self._columns = {}
+    
+    def table_columns(self, table):
+        """Return a dict of lower-cased column name: declared type for a table"""
+        if table not in self._columns:
+            rows = self.conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+            self._columns[table] = {row[1].lower(): row[2].lower() for row in rows}
+        return self._columns[table]
+    
+    def existing_indexes(self, table):
+        """Return the column lists of every index on a table"""
+        indexes = []
+        for index in self.conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+            info = self.conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall()
+            indexes.append([row[2].lower() for row in info if row[2]])
+        return indexes
+    
+    def _parse(self, query):
+        """Find the tables a query uses and how it filters and sorts each of them"""
+        aliases = {}
+        for table, alias in _TABLE_REF.findall(query):
+            if not self.table_columns(table):
+                continue
+            aliases[table.lower()] = table
+            if alias and alias.lower() not in _CLAUSE_WORDS:
+                aliases[alias.lower()] = table
+        tables = list(dict.fromkeys(aliases.values()))
+        
+        def resolve(qualifier, column):
+            column = column.lower()
+            if qualifier:
+                table = aliases.get(qualifier.lower())
+                return (table, column) if table and column in self.table_columns(table) else None
+            owners = [t for t in tables if column in self.table_columns(t)]
+            return (owners[0], column) if len(owners) == 1 else None
+        
+        usage = {table: {"eq": [], "join": [], "range": [], "order": [], "select": []} for table in tables}
+        
+        from_start = re.search(r'\bfrom\b', query, re.I)
+        body = query[from_start.start():] if from_start else query
+        for match in _JOIN_PREDICATE.finditer(body):
+            for qualifier, column in (match.group(1, 2), match.group(3, 4)):
+                ref = resolve(qualifier, column)
+                if ref:
+                    usage[ref[0]]["join"].append(ref[1])
+        for qualifier, column, op in _PREDICATE.findall(_JOIN_PREDICATE.sub(" ", body)):
+            ref = resolve(qualifier, column)
+            if ref:
+                kind = "eq" if op.lower() in ("=", "==", "in", "is") else "range"
+                usage[ref[0]][kind].append(ref[1])
+        
+        order_by = _ORDER_BY.search(body)
+        if order_by:
+            for item in order_by.group(1).split(","):
+                match = _COLUMN_REF.match(item.strip())
+                ref = match and resolve(match.group(1), match.group(2))
+                if ref:
+                    usage[ref[0]]["order"].append(ref[1])
+        
+        select_list = _SELECT_LIST.search(query)
+        if select_list:
+            items = [item.strip() for item in select_list.group(1).split(",")]
+            if any("*" in item and item.lower() != "count(*)" for item in items):
+                for table in tables:
+                    usage[table]["select"] = None
+            else:
+                for item in items:
+                    for qualifier, column in _COLUMN_REF.findall(item):
+                        ref = resolve(qualifier, column)
+                        if ref and usage[ref[0]]["select"] is not None:
+                            usage[ref[0]]["select"].append(ref[1])
+        return aliases, usage
+    
+    def analyze(self, query):
+        """
+        Explain a query and suggest indexes for the problems in its plan
+        
+        Returns:
+            dict: "plan" (list of steps), "issues" (list of strings) and
+                "indexes" (list of (table, columns) tuples)
+        """
+        plan = explain_query_plan(self.conn, query)
+        aliases, usage = self._parse(query)
+        issues = []
+        flagged = []
+        
+        for step in plan:
+            step = step.strip()
+            match = _PLAN_STEP.match(step)
+            if match:
+                table = aliases.get(match.group(2).lower(), match.group(2))
+                use = usage.get(table, {})
+                filters = use.get("eq", []) + use.get("join", [])
+                if match.group(1) == "SCAN" and not match.group(3):
+                    issues.append(f"full scan of {table}")
+                    flagged.append(table)
+                elif match.group(1) == "SEARCH" and match.group(4):
+                    used = match.group(4).count("=")
+                    if len(set(filters)) > used:
+                        issues.append(f"index on {table} only covers {used} of {len(set(filters))} filters")
+                        flagged.append(table)
+            elif step.startswith("USE TEMP B-TREE"):
+                issues.append(step.lower())
+                flagged.extend(table for table, use in usage.items() if use["order"])
+        
+        indexes = []
+        for table in dict.fromkeys(flagged):
+            use = usage.get(table)
+            if not use:
+                continue
+            columns = list(dict.fromkeys(use["eq"] + use["join"]))
+            if use["order"]:
+                columns += [col for col in dict.fromkeys(use["order"]) if col not in columns]
+            elif use["range"]:
+                columns += [col for col in use["range"][:1] if col not in columns]
+            if not columns:
+                continue
+            types = self.table_columns(table)
+            extra = [col for col in dict.fromkeys(use["select"] or [])
+                     if col not in columns and col != "id" and types[col] not in ("text", "blob")]
+            if use["select"] is not None and 0 < len(extra) <= 2:
+                columns += extra
+            if any(existing[:len(columns)] == columns for existing in self.existing_indexes(table)):
+                continue
+            indexes.append((table, columns))
+        
+        return {"plan": plan, "issues": issues, "indexes": indexes}
+
+def load_workload(workload_file):
+    """
+    Read SQL statements from a file
+    
+    Statements are separated by semicolons; lines starting with -- are ignored.
+    """
+    statements = []
+    buffer = ""
+    with open(workload_file, encoding="utf-8") as f:
+        for line in f:
+            if line.strip().startswith("--"):
+                continue
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                statements.append(normalize_sql(buffer))
+                buffer = ""
+    if buffer.strip():
+        statements.append(normalize_sql(buffer))
+    return statements
+
+def time_query(conn, query, repeat=5):
+    """Run a query repeat times, reading every row, and return the median seconds"""
+    conn.execute(query).fetchall()  # warm the page cache so the first timing isn't an outlier
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query).fetchall()
+        timings.append(time.perf_counter() - start)
+    return percentile(sorted(timings), 50)
+
+def advise_indexes(db_name, workload_file, apply=False, repeat=5):
+    """
+    Replay a workload, suggest indexes for it and time it with and without them
+    
+    The suggested indexes are created inside a transaction for the "after" timings,
+    then rolled back unless apply is True.
+    
+    Args:
+        db_name (str): Database to analyze
+        workload_file (str): File of SQL statements to replay
+        apply (bool): Keep the suggested indexes
+        repeat (int): Runs per query for each timing
+    """
+    try:
+        queries = load_workload(workload_file)
+    except OSError as e:
+        print(f"Error reading workload: {e}")
+        return
+    
+    manager = SQLiteManager(db_name)
+    if not manager.connect():
+        return
+    conn = manager.conn
+    advisor = IndexAdvisor(conn)
+    
+    before = []
+    suggestions = {}
+    # Time both passes inside a read transaction so lock handling costs the same
+    conn.execute("BEGIN")
+    for number, query in enumerate(queries, 1):
+        try:
+            result = advisor.analyze(query)
+            before.append(time_query(conn, query, repeat))
+        except sqlite3.Error as e:
+            print(f"\nQ{number}: skipped ({e})")
+            before.append(None)
+            continue
+        print(f"\nQ{number}: {query[:100]}")
+        for step in result["plan"]:
+            print(f"    {step}")
+        for issue in result["issues"]:
+            print(f"  ! {issue}")
+        for table, columns in result["indexes"]:
+            name = f"idx_{table}_{'_'.join(columns)}"
+            suggestions.setdefault(name, (table, columns))
+    conn.rollback()
+    
+    if not suggestions:
+        print("\nNo index suggestions for this workload")
+        manager.disconnect()
+        return
+    
+    print("\nSuggested indexes:")
+    statements = []
+    for name, (table, columns) in suggestions.items():
+        statement = f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({", ".join(columns)})'
+        statements.append(statement)
+        print(f"  {statement};")
+    
+    try:
+        conn.execute("BEGIN")
+        for statement in statements:
+            conn.execute(statement)
+        after = [time_query(conn, query, repeat) if timing is not None else None
+                 for query, timing in zip(queries, before)]
+        if apply:
+            conn.commit()
+        else:
+            conn.rollback()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error creating indexes: {e}")
+        manager.disconnect()
+        return
+    
+    print("\nQuery | Before ms  | After ms   | Speedup")
+    print("-" * 44)
+    for number, (old, new) in enumerate(zip(before, after), 1):
+        if old is None:
+            continue
+        speedup = old / new if new else float("inf")
+        print(f"Q{number:<4} | {old * 1000:>10.3f} | {new * 1000:>10.3f} | {speedup:>6.1f}x")
+    
+    if apply:
+        print(f"\nCreated {len(statements)} indexes in {db_name}")
+    else:
+        print("\nIndexes were rolled back. Re-run with --apply to keep them.")
+    manager.disconnect()
+
 def create_sample_database():
     """Create a sample database with multiple tables"""
     manager = SQLiteManager("sample_complete.db")
@@ -152,8 +1141,7 @@ def create_sample_database():
         {"username": "bob_wilson", "email": "bob@example.com", "full_name": "Bob Wilson"}
     ]
     
-    for user in users_data:
-        manager.insert_data("users", user)
+    manager.insert_many("users", users_data)
     
     # Insert sample posts
     posts_data = [
@@ -163,8 +1151,7 @@ def create_sample_database():
         {"user_id": 3, "title": "Database Design", "content": "Good database design is crucial for any application."}
     ]
     
-    for post in posts_data:
-        manager.insert_data("posts", post)
+    manager.insert_many("posts", posts_data)
     
     # Show tables
     manager.show_tables()
@@ -183,14 +1170,268 @@ def create_sample_database():
     manager.disconnect()
     print(f"\nSample database created: sample_complete.db")
 
+def benchmark_pool(db_name="pool_benchmark.db", rows=50000, readers=8, queries=400):
+    """
+    Compare concurrent reads through one shared connection against pooled mode
+    
+    A writer thread keeps inserting rows, one commit at a time like the blog does,
+    while a thread pool runs the same read query over and over.
+    
+    Args:
+        db_name (str): Scratch database file, removed afterwards
+        rows (int): Number of rows to seed before timing
+        readers (int): Number of reader threads
+        queries (int): Total number of reads per mode
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+    
+    seeder = SQLiteManager(db_name, pool_size=1)
+    if not seeder.connect():
+        return
+    seeder.create_table("bench_posts", [
+        "id INTEGER PRIMARY KEY",
+        "author_id INTEGER NOT NULL",
+        "title TEXT NOT NULL",
+        "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+    ])
+    seeder.insert_many("bench_posts", ((i % 500, f"Post {i}") for i in range(rows)),
+                       columns=["author_id", "title"], chunk_size=5000)
+    seeder.disconnect()
+    
+    read_sql = "SELECT COUNT(*), MAX(id) FROM bench_posts WHERE author_id = ?"
+    write_sql = "INSERT INTO bench_posts (author_id, title) VALUES (?, ?)"
+    
+    def run(read, write):
+        stop = threading.Event()
+        writes = [0]
+        
+        def writer():
+            while not stop.is_set():
+                write((writes[0] % 500, "Live post"))
+                writes[0] += 1
+        
+        def timed_read(i):
+            start = time.perf_counter()
+            read((i % 500,))
+            return time.perf_counter() - start
+        
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=readers) as executor:
+            latencies = sorted(executor.map(timed_read, range(queries)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        writer_thread.join()
+        return elapsed, latencies, writes[0]
+    
+    # Single-connection mode: one connection shared by every thread behind a lock
+    shared = sqlite3.connect(db_name, check_same_thread=False)
+    shared_lock = threading.Lock()
+    
+    def shared_read(params):
+        with shared_lock:
+            return shared.execute(read_sql, params).fetchall()
+    
+    def shared_write(params):
+        with shared_lock:
+            shared.execute(write_sql, params)
+            shared.commit()
+    
+    results = {"single": run(shared_read, shared_write)}
+    shared.close()
+    
+    pooled = SQLiteManager(db_name, pool_size=readers)
+    pooled.connect()
+    
+    def pooled_write(params):
+        with pooled.pool.connection(readonly=False) as conn:
+            conn.execute(write_sql, params)
+    
+    results["pooled"] = run(lambda params: pooled.query_data(read_sql, params), pooled_write)
+    pooled.disconnect()
+    
+    print(f"\nContention benchmark: {readers} reader threads, {queries} reads, 1 writer thread")
+    print("Mode     | Reads/sec  | p50 ms  | p95 ms  | Writes/sec")
+    print("-" * 52)
+    for mode, (elapsed, latencies, writes) in results.items():
+        p50 = percentile(latencies, 50) * 1000
+        p95 = percentile(latencies, 95) * 1000
+        print(f"{mode:<8} | {queries / elapsed:>10,.0f} | {p50:>7.2f} | {p95:>7.2f} | {writes / elapsed:,.0f}")
+    
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+
+class _BackupRestarting(Exception):
+    """Raised from the backup progress callback to give up on small steps"""
+
+def backup_database(db_name, backup_dir="backups", pages=256, sleep=0.01, compress=True, keep=7,
+                    check=True, max_restarts=3):
+    """
+    Snapshot a live database with the SQLite backup API
+    
+    Pages are copied a few at a time with a sleep between steps, so the source is
+    only locked for a moment at a time and blog writes go through. A write from
+    another connection restarts the copy, though; after max_restarts restarts the
+    rest is copied in one step, which in WAL mode still doesn't block writers.
+    
+    The copy is written to a .part file, checked with PRAGMA integrity_check,
+    optionally gzip-compressed and only then renamed into place, so a backup
+    file that exists is always complete.
+    
+    Args:
+        db_name (str): Database to back up
+        backup_dir (str): Directory for backup files, created if missing
+        pages (int): Pages copied per step
+        sleep (float): Seconds to sleep between steps
+        compress (bool): Write <name>-<timestamp>.sqlite3.gz instead of .sqlite3
+        keep (int): Number of backups of this database to keep; older ones are deleted
+        check (bool): Run PRAGMA integrity_check on the copy
+        max_restarts (int): Restarts allowed before finishing in one step
+    
+    Returns:
+        str: Path of the backup, or None if it failed
+    """
+    if not os.path.exists(db_name):
+        print(f"Error: database not found: {db_name}")
+        return None
+    os.makedirs(backup_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    # Microseconds keep backups taken within the same second apart
+    target = os.path.join(backup_dir, f"{stem}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.sqlite3")
+    part = target + ".part"
+    final = target + ".gz" if compress else target
+    
+    progress = {"steps": 0, "restarts": 0, "remaining": None, "total": 0}
+    
+    def step(status, remaining, total):
+        # remaining goes back up when a write elsewhere restarted the copy
+        if progress["remaining"] is not None and remaining > progress["remaining"]:
+            progress["restarts"] += 1
+            if progress["restarts"] > max_restarts:
+                raise _BackupRestarting()
+        progress.update(steps=progress["steps"] + 1, remaining=remaining, total=total)
+        if remaining:
+            time.sleep(sleep)
+    
+    start = time.perf_counter()
+    src = dst = None
+    try:
+        src = sqlite3.connect(f"file:{quote(os.path.abspath(db_name))}?mode=ro", uri=True)
+        dst = sqlite3.connect(part)
+        one_step = False
+        try:
+            src.backup(dst, pages=pages, progress=step)
+        except _BackupRestarting:
+            one_step = True
+            src.backup(dst)
+        copy_seconds = time.perf_counter() - start
+        page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+        
+        if check:
+            check_start = time.perf_counter()
+            result = [row[0] for row in dst.execute("PRAGMA integrity_check")]
+            if result != ["ok"]:
+                raise sqlite3.DatabaseError(f"integrity check failed: {'; '.join(result[:5])}")
+            print(f"Integrity check passed in {time.perf_counter() - check_start:.2f}s")
+        dst.close()
+        dst = None
+        
+        if compress:
+            with open(part, "rb") as f, gzip.open(final + ".part", "wb", compresslevel=6) as out:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+            os.remove(part)
+        os.replace(final + ".part" if compress else part, final)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error backing up database: {e}")
+        return None
+    finally:
+        if dst is not None:
+            dst.close()
+        if src is not None:
+            src.close()
+        # Whatever stopped the backup, no .part file is left behind; rotation never removes them
+        for leftover in {part, final + ".part"}:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    
+    total = time.perf_counter() - start
+    size = os.path.getsize(final)
+    print(f"Backed up {db_name} to {final}")
+    print(f"  {page_count:,} pages in {progress['steps']:,} steps of {pages} "
+          f"({progress['restarts']} restarts{', finished in one step' if one_step else ''})")
+    print(f"  Copy: {copy_seconds:.2f}s ({page_count / copy_seconds if copy_seconds else 0:,.0f} pages/sec), "
+          f"total: {total:.2f}s")
+    print(f"  Size: {size:,} bytes" + (f" ({size / os.path.getsize(db_name):.1%} of the database)" if compress else ""))
+    
+    # Generations sort by their timestamp, oldest first (older ones have no microseconds)
+    generations = sorted(name for name in os.listdir(backup_dir)
+                         if re.fullmatch(re.escape(stem) + r"-\d{8}-\d{6}(-\d{6})?\.sqlite3(\.gz)?", name))
+    for name in generations[:max(len(generations) - max(keep, 1), 0)]:
+        os.remove(os.path.join(backup_dir, name))
+        print(f"  Removed old backup: {name}")
+    return final
+
+# Commands that install, check and remove one blog_db feature:
+# command -> (blog_db function, description, actions with the default first, extra options)
+MANAGED_COMMANDS = {
+    "counters": ("manage_counters", "Trigger-maintained like_count/comment_count on dnd_blog_post",
+                 ["install", "repair", "check", "uninstall"], []),
+    "feed": ("manage_feed", "Trigger-maintained per-user friends feed (dnd_blog_feed)",
+             ["install", "rebuild", "trim", "uninstall"],
+             [("--depth", {"type": int, "default": 200, "help": "newest entries kept per user"})]),
+    "unread": ("manage_unread", "Trigger-maintained unread notification counts per user",
+               ["install", "repair", "check", "uninstall"], []),
+    "queue": ("manage_queue", "SQLite-backed job queue", ["status", "install", "uninstall"], []),
+    "search-index": ("manage_search", "FTS5 indexes over post titles/content and comments",
+                     ["install", "rebuild", "optimize", "uninstall"], [])
+}
+
+def run_managed_command(command, argv):
+    """
+    Parse the arguments of one of MANAGED_COMMANDS and run it
+    
+    Returns:
+        bool: What the blog_db function returned
+    """
+    function, description, actions, options = MANAGED_COMMANDS[command]
+    parser = argparse.ArgumentParser(prog=f"sqlite_manager.py {command}", description=description)
+    parser.add_argument("action", nargs="?", default=actions[0], choices=actions)
+    parser.add_argument("--db", default="db.sqlite3", help="blog database")
+    for flag, kwargs in options:
+        parser.add_argument(flag, **kwargs)
+    args = vars(parser.parse_args(argv))
+    
+    import blog_db
+    return getattr(blog_db, function)(args.pop("db"), args.pop("action"), **args)
+
 def main():
     """Main function to handle command line arguments"""
     if len(sys.argv) < 2:
         print("SQLite Manager - Database Management Tool")
         print("\nUsage:")
         print("  python sqlite_manager.py sample     - Create sample database")
-        print("  python sqlite_manager.py interactive - Start interactive mode")
+        print("  python sqlite_manager.py interactive [--profile NAME] - Start interactive mode")
         print("  python sqlite_manager.py test       - Test SQLite functionality")
+        print("  python sqlite_manager.py bench-pool [readers] - Compare single vs pooled connections")
+        print("  python sqlite_manager.py advise <db> <workload.sql> [--apply] - Suggest indexes for a workload")
+        print("  python sqlite_manager.py synth [--users N] [--posts N] [--seed N] - Build a synthetic blog database")
+        print("  python sqlite_manager.py import-html <dir> --category NAME [--db DB] - Import downloaded pages as posts")
+        print("  python sqlite_manager.py counters [install|repair|check|uninstall] [--db DB] - Post like/comment counters")
+        print("  python sqlite_manager.py feed [install|rebuild|trim|uninstall] [--db DB] - Materialized friends feed")
+        print("  python sqlite_manager.py page posts|comments|notifications|feed [ID] [--cursor C] - Keyset-paginated listings")
+        print("  python sqlite_manager.py unread [install|repair|check|uninstall] [--db DB] - Unread notification counts")
+        print("  python sqlite_manager.py mark-read <user_id> [--up-to ID] [--db DB] - Mark notifications read")
+        print("  python sqlite_manager.py queue [install|status|uninstall] [--db DB] - Durable job queue")
+        print("  python sqlite_manager.py notification-worker [--db DB] [--batch-size N] [--once] - Write queued notifications")
+        print("  python sqlite_manager.py maintain [--db DB] [--notification-days N] [--archive DB] - Retention and vacuum")
+        print("  python sqlite_manager.py backup [db] [--dir DIR] [--keep N] [--no-compress] - Online backup")
+        print("  python sqlite_manager.py search-index [install|rebuild|optimize|uninstall] [--db DB] - Full-text indexes")
+        print("  python sqlite_manager.py search <words> [--viewer ID] [--comments] [--cursor C] - Full-text search")
+        print(f"Set SQLITE_PROFILE to one of {', '.join(USER_PROFILES)} for interactive's default profile")
         return
     
     command = sys.argv[1].lower()
@@ -212,7 +1453,11 @@ def main():
             ])
             
             # Insert test data
-            manager.insert_data("test_table", {"id": 1, "name": "Test Item", "value": 100})
+            manager.insert_many("test_table", [
+                (1, "Test Item", 100),
+                (2, "Second Item", 200),
+                (3, "Third Item", 300)
+            ], columns=["id", "name", "value"])
             
             # Query test data
             results = manager.query_data("SELECT * FROM test_table")
@@ -222,7 +1467,167 @@ def main():
             os.remove("test.db")  # Clean up
             print("SQLite test completed successfully!")
     
+    elif command == "bench-pool":
+        readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+        benchmark_pool(readers=readers)
+    
+    elif command == "advise":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py advise",
+                                         description="Replay a workload, suggest indexes for it and time them")
+        parser.add_argument("db", help="database to analyze")
+        parser.add_argument("workload", help="file of SQL statements to replay")
+        parser.add_argument("--apply", action="store_true", help="keep the suggested indexes")
+        parser.add_argument("--repeat", type=at_least(1), default=5, help="runs per query for each timing")
+        args = parser.parse_args(sys.argv[2:])
+        
+        advise_indexes(args.db, args.workload, apply=args.apply, repeat=args.repeat)
+    
+    elif command == "synth":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py synth",
+                                         description="Build a synthetic D&D&D blog database for load testing")
+        parser.add_argument("--db", default="synthetic.sqlite3", help="database to create (replaced if it exists)")
+        parser.add_argument("--template", default="db.sqlite3", help="database whose schema and rows are copied")
+        parser.add_argument("--users", type=at_least(2), default=10000)
+        parser.add_argument("--posts", type=at_least(0), default=200000)
+        parser.add_argument("--likes-per-post", type=at_least(0, float), default=3)
+        parser.add_argument("--comments-per-post", type=at_least(0, float), default=1)
+        parser.add_argument("--friends-per-user", type=at_least(0, float), default=10)
+        parser.add_argument("--seed", type=int, default=42)
+        args = parser.parse_args(sys.argv[2:])
+        
+        from blog_db import synthesize
+        synthesize(args.db, args.template, users=args.users, posts=args.posts,
+                   likes_per_post=args.likes_per_post, comments_per_post=args.comments_per_post,
+                   friends_per_user=args.friends_per_user, seed=args.seed)
+    
+    elif command == "import-html":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py import-html",
+                                         description="Import downloaded HTML pages as blog posts")
+        parser.add_argument("directory", help="directory searched recursively for pages")
+        parser.add_argument("--category", required=True, help="name of the category the posts go in")
+        parser.add_argument("--db", default="db.sqlite3", help="blog database")
+        parser.add_argument("--author", help="username of the posts' author (default: first superuser)")
+        parser.add_argument("--visibility", default="public", choices=["public", "friends", "private"])
+        parser.add_argument("--pattern", default="*.html", help="file name pattern")
+        parser.add_argument("--workers", type=int, help="parser processes (default: CPU count)")
+        parser.add_argument("--batch-size", type=int, default=500, help="posts written per transaction")
+        parser.add_argument("--allow-duplicates", action="store_true",
+                            help="import pages whose title is already used in the category")
+        args = parser.parse_args(sys.argv[2:])
+        
+        from blog_db import import_html
+        import_html(args.db, args.directory, args.category, args.author, args.visibility, args.pattern,
+                    args.workers, args.batch_size, args.allow_duplicates)
+    
+    elif command in MANAGED_COMMANDS:
+        if not run_managed_command(command, sys.argv[2:]):
+            sys.exit(1)
+    
+    elif command == "page":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py page",
+                                         description="Read keyset-paginated listings, or create their indexes")
+        parser.add_argument("listing", choices=["posts", "comments", "notifications", "feed", "indexes"])
+        parser.add_argument("id", nargs="?", type=int, help="post id for comments, user id for notifications and feed")
+        parser.add_argument("--db", default="db.sqlite3", help="blog database")
+        parser.add_argument("--cursor", help="cursor printed with the previous page")
+        parser.add_argument("--limit", type=at_least(1), default=20, help="rows per page")
+        args = parser.parse_args(sys.argv[2:])
+        
+        from blog_db import create_keyset_indexes, show_page
+        if args.listing == "indexes":
+            ok = create_keyset_indexes(args.db)
+        elif args.listing != "posts" and args.id is None:
+            parser.error(f"{args.listing} needs an id")
+        else:
+            ok = show_page(args.db, args.listing, args.id, args.cursor, args.limit)
+        if not ok:
+            sys.exit(1)
+    
+    elif command == "mark-read":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py mark-read",
+                                         description="Mark a user's notifications read in one UPDATE")
+        parser.add_argument("user_id", type=int)
+        parser.add_argument("--up-to", type=int, help="only notifications with this id or lower")
+        parser.add_argument("--db", default="db.sqlite3", help="blog database")
+        args = parser.parse_args(sys.argv[2:])
+        
+        from blog_db import show_mark_read
+        if not show_mark_read(args.db, args.user_id, args.up_to):
+            sys.exit(1)
+    
+    elif command == "notification-worker":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py notification-worker",
+                                         description="Coalesce queued notifications and write them in batches")
+        parser.add_argument("--db", default="db.sqlite3", help="blog database")
+        parser.add_argument("--batch-size", type=int, default=500, help="jobs per transaction")
+        parser.add_argument("--poll", type=float, default=0.5, help="seconds between checks of an empty queue")
+        parser.add_argument("--report-every", type=float, default=10.0, help="seconds between metric reports")
+        parser.add_argument("--once", action="store_true", help="exit once the queue is empty")
+        args = parser.parse_args(sys.argv[2:])
+        
+        from blog_db import notification_worker
+        if not notification_worker(args.db, args.batch_size, args.poll, args.report_every, args.once):
+            sys.exit(1)
+    
+    elif command == "maintain":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py maintain",
+                                         description="Archive old notifications, purge expired sessions, reclaim space")
+        parser.add_argument("--db", default="db.sqlite3", help="blog database")
+        parser.add_argument("--notification-days", type=float,
+                            help="move notifications older than this many days to the archive")
+        parser.add_argument("--archive", default="archive.sqlite3", help="archive database")
+        parser.add_argument("--no-purge", action="store_true", help="keep expired sessions")
+        parser.add_argument("--no-vacuum", action="store_true", help="skip incremental_vacuum")
+        parser.add_argument("--enable-incremental", action="store_true",
+                            help="switch to auto_vacuum=INCREMENTAL first (one full VACUUM)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+        parser.add_argument("--pause", type=float, default=0.05, help="seconds between batches")
+        args = parser.parse_args(sys.argv[2:])
+        
+        from blog_db import maintain
+        if not maintain(args.db, args.notification_days, args.archive, not args.no_purge, not args.no_vacuum,
+                        args.enable_incremental, args.batch_size, args.pause):
+            sys.exit(1)
+    
+    elif command == "backup":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py backup",
+                                         description="Back up a live database with the SQLite backup API")
+        parser.add_argument("db", nargs="?", default="db.sqlite3", help="database to back up")
+        parser.add_argument("--dir", default="backups", help="directory for backup files")
+        parser.add_argument("--pages", type=int, default=256, help="pages copied per step")
+        parser.add_argument("--sleep", type=float, default=0.01, help="seconds between steps")
+        parser.add_argument("--keep", type=int, default=7, help="backups of this database to keep")
+        parser.add_argument("--no-compress", action="store_true", help="write a plain .sqlite3 file")
+        parser.add_argument("--no-check", action="store_true", help="skip the integrity check")
+        args = parser.parse_args(sys.argv[2:])
+        
+        if not backup_database(args.db, args.dir, args.pages, args.sleep, not args.no_compress, args.keep,
+                               not args.no_check):
+            sys.exit(1)
+    
+    elif command == "search":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py search", description="Full-text search")
+        parser.add_argument("words", nargs="+", help="words to search for; end one with * for a prefix")
+        parser.add_argument("--db", default="db.sqlite3", help="blog database")
+        parser.add_argument("--viewer", type=int, help="search as this user id (default: anonymous)")
+        parser.add_argument("--comments", action="store_true", help="search comments instead of posts")
+        parser.add_argument("--cursor", help="cursor printed with the previous page")
+        parser.add_argument("--limit", type=at_least(1), default=10, help="results per page")
+        args = parser.parse_args(sys.argv[2:])
+        
+        from blog_db import show_search
+        if not show_search(args.db, " ".join(args.words), args.viewer, args.cursor, args.limit, args.comments):
+            sys.exit(1)
+    
     elif command == "interactive":
+        parser = argparse.ArgumentParser(prog="sqlite_manager.py interactive")
+        parser.add_argument("--profile", choices=USER_PROFILES, default=os.environ.get("SQLITE_PROFILE"),
+                            help="performance profile to connect with (default: $SQLITE_PROFILE)")
+        args = parser.parse_args(sys.argv[2:])
+        # argparse doesn't check defaults against choices
+        if args.profile is not None and args.profile not in USER_PROFILES:
+            parser.error(f"SQLITE_PROFILE={args.profile!r} must be one of {', '.join(USER_PROFILES)}")
+        
         print("SQLite Interactive Mode")
         print("Type 'help' for commands, 'exit' to quit")
         
@@ -230,13 +1635,15 @@ def main():
         if not db_name:
             db_name = "interactive.db"
         
-        manager = SQLiteManager(db_name)
+        manager = SQLiteManager(db_name, performance_profile=args.profile)
         if not manager.connect():
             return
+        print(f"Performance profile: {manager.performance_profile or 'none (SQLite defaults)'}")
         
         while True:
             try:
-                command = input(f"\n[{db_name}]> ").strip()
+                label = f"{db_name} {manager.performance_profile}" if manager.performance_profile else db_name
+                command = input(f"\n[{label}]> ").strip()
                 
                 if command.lower() in ['exit', 'quit']:
                     break
@@ -245,19 +1652,68 @@ def main():
                     print("  tables                    - Show all tables")
                     print("  describe <table_name>     - Show table structure")
                     print("  query <sql_query>         - Execute SQL query")
+                    print("  profile on [slow_ms]      - Time statements, logging slow ones to slow_queries.jsonl")
+                    print("  profile off               - Stop timing statements")
+                    print("  top [n]                   - Show the n statements with the most total time")
+                    print("  settings [profile]        - Show the connection settings, or switch performance profile")
+                    print("                              (switching applies its journal_mode to the database file)")
                     print("  exit/quit                 - Exit interactive mode")
                 elif command.lower() == 'tables':
                     manager.show_tables()
                 elif command.startswith('describe '):
                     table_name = command.split(' ', 1)[1]
                     manager.describe_table(table_name)
+                elif command.lower().startswith('profile'):
+                    args = command.split()
+                    if len(args) > 1 and args[1].lower() == 'on':
+                        slow_ms = float(args[2]) if len(args) > 2 else 100
+                        manager.enable_profiling(slow_ms=slow_ms)
+                        print(f"Profiling on (slow query threshold: {slow_ms:g} ms)")
+                    elif len(args) > 1 and args[1].lower() == 'off':
+                        manager.disable_profiling()
+                        print("Profiling off")
+                    else:
+                        print("Usage: profile on [slow_ms] | profile off")
+                elif command.lower() == 'settings' or command.lower().startswith('settings '):
+                    args = command.split()
+                    if len(args) > 1 and args[1] in BUILD_PROFILES:
+                        print(f"The {args[1]} profile turns off fsync and is only for synth building a new database")
+                        continue
+                    if len(args) > 1 and args[1] not in USER_PROFILES:
+                        print(f"Unknown performance profile: {args[1]} (choose from {', '.join(USER_PROFILES)})")
+                        continue
+                    if len(args) > 1:
+                        settings = apply_performance_profile(manager.conn, args[1])
+                        manager.performance_profile = args[1]
+                    else:
+                        settings = connection_settings(manager.conn)
+                    print(f"Performance profile: {manager.performance_profile or 'none (SQLite defaults)'} "
+                          f"(available: {', '.join(USER_PROFILES)})")
+                    for pragma, value in settings.items():
+                        print(f"  {pragma:<13} {value}")
+                elif command.lower() == 'top' or command.lower().startswith('top '):
+                    args = command.split()
+                    limit = int(args[1]) if len(args) > 1 else 10
+                    if manager.profiler is None:
+                        print("Nothing profiled yet. Use 'profile on' first.")
+                        continue
+                    print("Calls  | Rows     | Total ms  | p50 ms  | p95 ms  | p99 ms  | Statement")
+                    print("-" * 100)
+                    for item in manager.profiler.top(limit):
+                        print(f"{item['calls']:<6} | {item['rows']:<8} | {item['total_ms']:>9.2f} | "
+                              f"{item['p50_ms']:>7.2f} | {item['p95_ms']:>7.2f} | {item['p99_ms']:>7.2f} | "
+                              f"{item['fingerprint'][:60]}")
+                    print(f"Slow statements logged: {manager.profiler.slow_count}")
                 elif command.startswith('query '):
                     sql_query = command.split(' ', 1)[1]
-                    results = manager.query_data(sql_query)
-                    if results:
-                        print("Results:")
-                        for row in results:
-                            print(f"  {row}")
+                    count = 0
+                    for row in manager.iter_query(sql_query):
+                        if count == 0:
+                            print("Results:")
+                        print(f"  {row}")
+                        count += 1
+                    if count:
+                        print(f"({count} rows)")
                     else:
                         print("No results")
                 else:
@@ -273,7 +1729,7 @@ def main():
     
     else:
         print(f"Unknown command: {command}")
-        print("Available commands: sample, test, interactive")
+        print("Available commands: sample, test, bench-pool, advise, synth, import-html, counters, feed, page, unread, mark-read, queue, notification-worker, maintain, backup, search-index, search, interactive")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
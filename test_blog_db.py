@@ -0,0 +1,586 @@
+"""
+Tests for blog_db.py's trigger-maintained tables, run on a small synthetic database
+
+Run with: python -m pytest -q test_blog_db.py
+"""
+import json
+import os
+import random
+import shutil
+import sqlite3
+import threading
+
+import pytest
+
+import blog_db
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db.sqlite3")
+
+
+@pytest.fixture(scope="session")
+def synthetic(tmp_path_factory):
+    """A small synthetic blog database, built once"""
+    path = str(tmp_path_factory.mktemp("synth") / "synthetic.sqlite3")
+    assert blog_db.synthesize(path, TEMPLATE, users=60, posts=400, likes_per_post=2, comments_per_post=1,
+                              friends_per_user=6, blocks_per_user=0.1, seed=7)
+    return path
+
+
+@pytest.fixture
+def db(synthetic, tmp_path):
+    """A private copy of the synthetic database"""
+    path = str(tmp_path / "blog.sqlite3")
+    shutil.copy(synthetic, path)
+    return path
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")  # as Django connects
+    return conn
+
+
+def clone(conn, table, **values):
+    """Insert a copy of the table's first row with values changed and a new id"""
+    cursor = conn.execute(f"SELECT * FROM {table} LIMIT 1")
+    row = dict(zip((d[0] for d in cursor.description), cursor.fetchone()))
+    row.pop("id")
+    row.update(values)
+    return conn.execute(f"INSERT INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                        list(row.values())).lastrowid
+
+
+def add_user(conn, name):
+    return clone(conn, "auth_user", username=name, email=f"{name}@example.com")
+
+
+def unread_counts(conn):
+    return dict(conn.execute("SELECT user_id, unread FROM dnd_blog_unread WHERE unread != 0"))
+
+
+def expected_unread(conn):
+    return dict(conn.execute("SELECT recipient_id, COUNT(*) FROM dnd_blog_notification "
+                             "WHERE is_read = 0 GROUP BY recipient_id"))
+
+
+def test_user_with_unread_row_can_be_deleted(db):
+    assert blog_db.manage_unread(db, "install")
+    conn = connect(db)
+    user = add_user(conn, "leaving")
+    sender = conn.execute("SELECT id FROM auth_user WHERE id != ? LIMIT 1", (user,)).fetchone()[0]
+    notification = clone(conn, "dnd_blog_notification", recipient_id=user, sender_id=sender, is_read=0,
+                         comment_id=None)
+    conn.commit()
+    assert unread_counts(conn)[user] == 1
+
+    # What Django's delete collector does: the rows it knows about, then the user
+    conn.execute("DELETE FROM dnd_blog_notification WHERE id = ?", (notification,))
+    conn.execute("DELETE FROM auth_user WHERE id = ?", (user,))
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM dnd_blog_unread WHERE user_id = ?", (user,)).fetchone()[0] == 0
+
+
+def test_unread_install_replaces_table_with_foreign_key(db):
+    conn = connect(db)
+    conn.execute("CREATE TABLE dnd_blog_unread (user_id integer NOT NULL PRIMARY KEY "
+                 "REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED, unread integer NOT NULL DEFAULT 0)")
+    conn.commit()
+    assert blog_db.manage_unread(db, "install")
+    assert "REFERENCES" not in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'dnd_blog_unread'").fetchone()[0]
+    assert unread_counts(conn) == expected_unread(conn)
+
+
+def rebuild_like_django(conn, table, create_sql):
+    """Django's _remake_table: create new__<table> from the model's schema, copy, drop, rename"""
+    conn.execute("PRAGMA foreign_keys = OFF")  # as Django's schema editor does
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    conn.execute(create_sql.replace(f'"{table}"', f'"new__{table}"', 1))
+    columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA table_info(new__{table})"))
+    conn.execute(f"INSERT INTO new__{table} ({columns}) SELECT {columns} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE new__{table} RENAME TO {table}")
+    conn.commit()
+    conn.execute("PRAGMA legacy_alter_table = OFF")
+    conn.execute("PRAGMA foreign_keys = ON")
+
+
+def schema_sql(conn, name):
+    return conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (name,)).fetchone()[0]
+
+
+def test_counters_check_catches_post_table_rebuilt_by_migration(db):
+    conn = connect(db)
+    post_sql = schema_sql(conn, "dnd_blog_post")
+    assert blog_db.manage_counters(db, "install")
+    rebuild_like_django(conn, "dnd_blog_post", post_sql)
+    post = conn.execute("SELECT id FROM dnd_blog_post LIMIT 1").fetchone()[0]
+    user = add_user(conn, "liker")
+    conn.commit()
+    with pytest.raises(sqlite3.OperationalError, match="like_count"):
+        clone(conn, "dnd_blog_post_likes", post_id=post, user_id=user)
+    conn.rollback()
+
+    assert not blog_db.manage_counters(db, "check")
+    assert blog_db.manage_counters(db, "install")
+    clone(conn, "dnd_blog_post_likes", post_id=post, user_id=user)
+    conn.commit()
+    assert blog_db.manage_counters(db, "check")
+
+
+def test_counters_uninstall_after_rebuild(db):
+    conn = connect(db)
+    post_sql = schema_sql(conn, "dnd_blog_post")
+    assert blog_db.manage_counters(db, "install")
+    rebuild_like_django(conn, "dnd_blog_post", post_sql)
+    assert blog_db.manage_counters(db, "uninstall")
+    assert not conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_count_%'"
+                            ).fetchone()[0]
+
+
+def test_import_html_reports_duplicates_and_survives_bad_files(db, tmp_path, capsys):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    for name, title in (("a.html", "Dragons"), ("b.html", "Dragons"), ("c.html", "Goblins")):
+        (pages / name).write_text(f"<title>{title}</title><p>About {title.lower()}.</p>", encoding="utf-8")
+    os.symlink(str(tmp_path / "missing.html"), str(pages / "broken.html"))
+
+    assert blog_db.import_html(db, str(pages), "World Building", workers=1) == 2
+    output = capsys.readouterr().out
+    assert "Error parsing" in output and "broken.html" in output
+    assert "0 already in the category, 1 repeating a title earlier in this import" in output
+    assert "Failed:     1 files" in output
+
+    (pages / "d.html").write_text("<title>Owlbears</title><p>Feathers.</p>", encoding="utf-8")
+    assert blog_db.import_html(db, str(pages), "World Building", workers=1) == 1
+    assert "3 already in the category, 0 repeating" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_pages_reject_sizes_below_one(db, limit):
+    conn = connect(db)
+    with pytest.raises(ValueError, match="at least 1"):
+        blog_db.post_page(conn, limit=limit)
+    with pytest.raises(ValueError, match="at least 1"):
+        blog_db.search(conn, "dragon", limit=limit)
+
+
+def ids(conn, table, limit=None):
+    return [row[0] for row in conn.execute(f"SELECT id FROM {table} ORDER BY id" + (f" LIMIT {limit}" if limit else ""))]
+
+
+def counter_mismatches(conn):
+    return conn.execute("""
+        SELECT COUNT(*) FROM dnd_blog_post p
+        WHERE like_count != (SELECT COUNT(*) FROM dnd_blog_post_likes WHERE post_id = p.id)
+           OR comment_count != (SELECT COUNT(*) FROM dnd_blog_comment WHERE post_id = p.id)
+    """).fetchone()[0]
+
+
+def test_counters_follow_inserts_deletes_and_moves(db):
+    assert blog_db.manage_counters(db, "install")
+    conn = connect(db)
+    assert counter_mismatches(conn) == 0
+    rng = random.Random(1)
+    posts, users = ids(conn, "dnd_blog_post"), ids(conn, "auth_user")
+    for _ in range(300):
+        action = rng.randrange(5)
+        if action == 0:
+            conn.execute("INSERT OR IGNORE INTO dnd_blog_post_likes (post_id, user_id) VALUES (?, ?)",
+                         (rng.choice(posts), rng.choice(users)))
+        elif action == 1:
+            conn.execute("DELETE FROM dnd_blog_post_likes WHERE id = (SELECT id FROM dnd_blog_post_likes "
+                         "ORDER BY random() LIMIT 1)")
+        elif action == 2:
+            clone(conn, "dnd_blog_comment", post_id=rng.choice(posts), author_id=rng.choice(users))
+        elif action == 3:
+            conn.execute("DELETE FROM dnd_blog_comment WHERE id = (SELECT id FROM dnd_blog_comment "
+                         "WHERE id NOT IN (SELECT comment_id FROM dnd_blog_notification WHERE comment_id IS NOT NULL) "
+                         "ORDER BY random() LIMIT 1)")
+        else:
+            # Moves, including ones that leave post_id unchanged
+            conn.execute("UPDATE dnd_blog_comment SET post_id = ? WHERE id = (SELECT id FROM dnd_blog_comment "
+                         "ORDER BY random() LIMIT 1)", (rng.choice(posts),))
+            conn.execute("UPDATE dnd_blog_post_likes SET post_id = post_id WHERE id = (SELECT id FROM "
+                         "dnd_blog_post_likes ORDER BY random() LIMIT 1)")
+    conn.commit()
+    assert counter_mismatches(conn) == 0
+    assert blog_db.manage_counters(db, "check")
+
+    conn.execute("UPDATE dnd_blog_post SET like_count = like_count + 5 WHERE id = ?", (posts[0],))
+    conn.commit()
+    assert not blog_db.manage_counters(db, "check")
+    assert blog_db.manage_counters(db, "repair")
+    assert counter_mismatches(conn) == 0
+
+
+def live_feed(conn, user):
+    """A user's feed straight from the posts and friendships, newest first"""
+    return [row[0] for row in conn.execute(f"""
+        SELECT id FROM dnd_blog_post
+        WHERE author_id IN ({blog_db.FEED_FRIENDS_SQL.format(user=":user")}) AND visibility IN {blog_db.FEED_VISIBILITY}
+        ORDER BY created_at DESC, id DESC
+    """, {"user": user})]
+
+
+def paged_feed(conn, user, limit):
+    posts, cursor = [], None
+    while True:
+        rows, cursor = blog_db.feed_page(conn, user, cursor, limit)
+        posts += [row[0] for row in rows]
+        if cursor is None:
+            return posts
+
+
+def test_feed_pages_match_live_query_after_random_changes(db):
+    depth = 5
+    assert blog_db.manage_feed(db, "install", depth)
+    conn = connect(db)
+    rng = random.Random(2)
+    users = ids(conn, "auth_user")
+    visibilities = [blog_db.VISIBILITY_PUBLIC, blog_db.VISIBILITY_FRIENDS, blog_db.VISIBILITY_PRIVATE]
+    new_posts = []
+    for _ in range(400):
+        action = rng.randrange(7)
+        # Sometimes the reverse of an existing request, so some pairs have two rows
+        a, b = rng.choice([rng.sample(users, 2), rng.sample(users, 2), conn.execute(
+            "SELECT receiver_id, sender_id FROM dnd_blog_friendship ORDER BY random() LIMIT 1").fetchone()])
+        if action == 0:
+            # New posts, some backdated as imports are
+            new_posts.append(clone(conn, "dnd_blog_post", author_id=a, visibility=rng.choice(visibilities),
+                                   created_at=blog_db._django_now(days=rng.choice([0, rng.uniform(0, 400)]))))
+        elif action == 1:
+            conn.execute("UPDATE dnd_blog_post SET visibility = ? WHERE id = (SELECT id FROM dnd_blog_post "
+                         "ORDER BY random() LIMIT 1)", (rng.choice(visibilities),))
+        elif action == 2 and new_posts:
+            conn.execute("DELETE FROM dnd_blog_post WHERE id = ?", (new_posts.pop(rng.randrange(len(new_posts))),))
+        elif action == 3:
+            conn.execute("INSERT OR IGNORE INTO dnd_blog_friendship (status, created_at, updated_at, sender_id, "
+                         "receiver_id) VALUES (?, datetime(), datetime(), ?, ?)",
+                         (rng.choice([blog_db.FRIENDSHIP_ACCEPTED, blog_db.FRIENDSHIP_PENDING]), a, b))
+        elif action == 4:
+            conn.execute("UPDATE dnd_blog_friendship SET status = ? WHERE id = (SELECT id FROM dnd_blog_friendship "
+                         "ORDER BY random() LIMIT 1)", (rng.choice([blog_db.FRIENDSHIP_ACCEPTED, blog_db.FRIENDSHIP_PENDING]),))
+        elif action == 5:
+            conn.execute("DELETE FROM dnd_blog_friendship WHERE id = (SELECT id FROM dnd_blog_friendship "
+                         "ORDER BY random() LIMIT 1)")
+        elif rng.random() < 0.5:
+            conn.execute("INSERT OR IGNORE INTO dnd_blog_userblock (created_at, blocker_id, blocked_id) "
+                         "VALUES (datetime(), ?, ?)", (a, b))
+        else:
+            conn.execute("DELETE FROM dnd_blog_userblock WHERE id = (SELECT id FROM dnd_blog_userblock "
+                         "ORDER BY random() LIMIT 1)")
+    conn.commit()
+
+    assert conn.execute("SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM dnd_blog_feed GROUP BY user_id)"
+                        ).fetchone()[0] <= depth
+    for user in users:
+        assert paged_feed(conn, user, 3) == live_feed(conn, user), user
+
+    # A rebuild gives each user the same newest entries the triggers kept
+    stored = set(conn.execute("SELECT user_id, post_id FROM dnd_blog_feed"))
+    blog_db.rebuild_feed(conn, depth)
+    assert stored <= set(conn.execute("SELECT user_id, post_id FROM dnd_blog_feed"))
+    for user in users:
+        assert paged_feed(conn, user, 3) == live_feed(conn, user), user
+
+
+def db_friends(conn, user):
+    return {row[0] for row in conn.execute(
+        "SELECT receiver_id FROM dnd_blog_friendship WHERE sender_id = :user AND status = :accepted UNION "
+        "SELECT sender_id FROM dnd_blog_friendship WHERE receiver_id = :user AND status = :accepted",
+        {"user": user, "accepted": blog_db.FRIENDSHIP_ACCEPTED})}
+
+
+def db_blocked(conn, a, b):
+    return conn.execute("SELECT COUNT(*) FROM dnd_blog_userblock WHERE (blocker_id = ? AND blocked_id = ?) "
+                        "OR (blocker_id = ? AND blocked_id = ?)", (a, b, b, a)).fetchone()[0] > 0
+
+
+@pytest.mark.parametrize("budget_mb", [256, 0.002])
+def test_social_graph_follows_changes(db, budget_mb):
+    conn = connect(db)
+    graph = blog_db.SocialGraph(conn, memory_budget_mb=budget_mb)
+    assert graph.load() == (budget_mb == 256)
+    rng = random.Random(3)
+    users = ids(conn, "auth_user")
+    statuses = [blog_db.FRIENDSHIP_ACCEPTED, blog_db.FRIENDSHIP_PENDING]
+    for step in range(300):
+        # Half the time the reverse of an existing request, so some pairs have two rows
+        a, b = rng.choice([rng.sample(users, 2), conn.execute(
+            "SELECT receiver_id, sender_id FROM dnd_blog_friendship ORDER BY random() LIMIT 1").fetchone()])
+        action = rng.randrange(4)
+        if action == 0:
+            status = rng.choice(statuses)
+            conn.execute("INSERT INTO dnd_blog_friendship (status, created_at, updated_at, sender_id, receiver_id) "
+                         "VALUES (?, datetime(), datetime(), ?, ?) ON CONFLICT DO UPDATE SET status = excluded.status",
+                         (status, a, b))
+            graph.on_friendship_saved(a, b, status)
+        elif action == 1:
+            row = conn.execute("SELECT sender_id, receiver_id FROM dnd_blog_friendship ORDER BY random() LIMIT 1"
+                               ).fetchone()
+            conn.execute("DELETE FROM dnd_blog_friendship WHERE sender_id = ? AND receiver_id = ?", row)
+            graph.on_friendship_deleted(*row)
+        elif action == 2:
+            if conn.execute("INSERT OR IGNORE INTO dnd_blog_userblock (created_at, blocker_id, blocked_id) "
+                            "VALUES (datetime(), ?, ?)", (a, b)).rowcount:
+                graph.on_block_saved(a, b)
+        else:
+            row = conn.execute("SELECT blocker_id, blocked_id FROM dnd_blog_userblock ORDER BY random() LIMIT 1"
+                               ).fetchone()
+            if row:
+                conn.execute("DELETE FROM dnd_blog_userblock WHERE blocker_id = ? AND blocked_id = ?", row)
+                graph.on_block_deleted(*row)
+        if step % 50 == 49:
+            for user in users:
+                assert graph.friends(user) == db_friends(conn, user), user
+                other = rng.choice(users)
+                assert graph.is_blocked(user, other) == db_blocked(conn, user, other)
+    conn.commit()
+
+
+def test_social_graph_shared_by_threads(db):
+    conn = sqlite3.connect(db, check_same_thread=False)
+    graph = blog_db.SocialGraph(conn, memory_budget_mb=0.002)
+    graph.load()
+    users = ids(conn, "auth_user")
+    errors = []
+
+    def read(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(500):
+                user = rng.choice(users)
+                graph.suggestions(user)
+                graph.is_blocked(user, rng.choice(users))
+                for friend in graph.friends(user):
+                    graph.are_friends(friend, user)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    rng = random.Random(4)
+    for _ in range(500):
+        a, b = rng.sample(users, 2)
+        graph.on_friendship_saved(a, b, rng.choice([blog_db.FRIENDSHIP_ACCEPTED, blog_db.FRIENDSHIP_PENDING]))
+        graph.on_block_deleted(b, a)
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert graph.stats()["approx_mib"] >= 0
+
+
+def test_feed_keeps_friends_with_a_request_each_way(db):
+    assert blog_db.manage_feed(db, "install", 5)
+    conn = connect(db)
+    a, b = add_user(conn, "ann"), add_user(conn, "bob")
+    for sender, receiver in ((a, b), (b, a)):
+        conn.execute("INSERT INTO dnd_blog_friendship (status, created_at, updated_at, sender_id, receiver_id) "
+                     "VALUES (?, datetime(), datetime(), ?, ?)", (blog_db.FRIENDSHIP_ACCEPTED, sender, receiver))
+    post = clone(conn, "dnd_blog_post", author_id=b, visibility=blog_db.VISIBILITY_PUBLIC,
+                 created_at=blog_db._django_now())
+    conn.execute("UPDATE dnd_blog_friendship SET status = ? WHERE sender_id = ?", (blog_db.FRIENDSHIP_PENDING, a))
+    assert conn.execute("SELECT COUNT(*) FROM dnd_blog_feed WHERE user_id = ? AND post_id = ?", (a, post)
+                        ).fetchone()[0] == 1
+    conn.execute("UPDATE dnd_blog_friendship SET status = ? WHERE sender_id = ?", (blog_db.FRIENDSHIP_ACCEPTED, a))
+    conn.execute("DELETE FROM dnd_blog_friendship WHERE sender_id = ?", (b,))
+    assert conn.execute("SELECT COUNT(*) FROM dnd_blog_feed WHERE user_id = ? AND post_id = ?", (a, post)
+                        ).fetchone()[0] == 1
+    conn.commit()
+    assert blog_db.rebuild_feed(conn, 5) > 0
+    assert paged_feed(conn, a, 3) == live_feed(conn, a) == [post]
+
+
+def search_ids(conn, text, viewer=None, comments=False, limit=4):
+    found, cursor = [], None
+    while True:
+        results, cursor = blog_db.search(conn, text, viewer, cursor, limit, comments)
+        found += [result["id"] for result in results]
+        if cursor is None:
+            return found
+
+
+def test_search_follows_inserts_updates_and_deletes(db):
+    assert blog_db.manage_search(db, "install")
+    conn = connect(db)
+    author = add_user(conn, "scribe")
+    public = [clone(conn, "dnd_blog_post", author_id=author, visibility=blog_db.VISIBILITY_PUBLIC,
+                    title=f"Wyvern lore {n}", content="wyvern " * n + "nests in the Spine") for n in range(1, 10)]
+    hidden = clone(conn, "dnd_blog_post", author_id=author, visibility=blog_db.VISIBILITY_PRIVATE,
+                   title="Secret wyvern", content="wyverns")
+    comment = clone(conn, "dnd_blog_comment", post_id=public[0], author_id=author, content="A wyvern egg!")
+    conn.commit()
+    assert sorted(search_ids(conn, "wyvern")) == public
+    assert sorted(search_ids(conn, "wyvern", author)) == public + [hidden]
+    assert search_ids(conn, "egg", comments=True) == [comment]
+    # The title counts double, so the two-word title match ranks first
+    assert search_ids(conn, "lore 9")[:1] == [public[8]]
+
+    conn.execute("UPDATE dnd_blog_post SET title = 'Drake lore', content = 'drakes' WHERE id = ?", (public[0],))
+    conn.execute("UPDATE dnd_blog_post SET visibility = ? WHERE id = ?", (blog_db.VISIBILITY_PUBLIC, hidden))
+    conn.execute("DELETE FROM dnd_blog_post WHERE id = ?", (public[1],))
+    conn.execute("UPDATE dnd_blog_comment SET content = 'A drake egg' WHERE id = ?", (comment,))
+    conn.commit()
+    assert sorted(search_ids(conn, "wyvern*")) == public[2:] + [hidden]
+    assert search_ids(conn, "drake") == [public[0]]
+    assert search_ids(conn, "wyvern", comments=True) == []
+    assert search_ids(conn, "drake", comments=True) == [comment]
+    assert search_ids(conn, 'nests "in" the') == search_ids(conn, "nests in the")
+    for fts in blog_db.SEARCH_TABLES:
+        conn.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+
+
+def test_unread_counts_follow_notification_changes(db):
+    assert blog_db.manage_unread(db, "install")
+    conn = connect(db)
+    assert unread_counts(conn) == expected_unread(conn)
+    rng = random.Random(5)
+    users = ids(conn, "auth_user")
+    for _ in range(300):
+        action = rng.randrange(5)
+        if action == 0:
+            clone(conn, "dnd_blog_notification", recipient_id=rng.choice(users), sender_id=rng.choice(users),
+                  is_read=rng.choice([0, 1]), comment_id=None)
+        elif action == 1:
+            conn.execute("DELETE FROM dnd_blog_notification WHERE id = (SELECT id FROM dnd_blog_notification "
+                         "ORDER BY random() LIMIT 1)")
+        elif action == 2:
+            conn.execute("UPDATE dnd_blog_notification SET is_read = ? WHERE id = (SELECT id FROM "
+                         "dnd_blog_notification ORDER BY random() LIMIT 1)", (rng.choice([0, 1]),))
+        elif action == 3:
+            # Moves, some also marking read or unread, some to the same recipient
+            conn.execute("UPDATE dnd_blog_notification SET recipient_id = ?, is_read = ? WHERE id = (SELECT id FROM "
+                         "dnd_blog_notification ORDER BY random() LIMIT 1)", (rng.choice(users), rng.choice([0, 1])))
+        else:
+            user = rng.choice(users)
+            up_to = rng.choice([None, conn.execute("SELECT MAX(id) / 2 FROM dnd_blog_notification").fetchone()[0]])
+            before = blog_db.unread_count(conn, user)
+            assert before - blog_db.mark_read(conn, user, up_to) == blog_db.unread_count(conn, user)
+            if up_to is None:
+                assert blog_db.unread_count(conn, user) == 0
+    conn.commit()
+    assert unread_counts(conn) == expected_unread(conn)
+    assert blog_db.manage_unread(db, "check")
+
+    conn.execute("UPDATE dnd_blog_unread SET unread = unread + 1 WHERE user_id = ?", (users[0],))
+    conn.commit()
+    assert not blog_db.manage_unread(db, "check")
+    assert blog_db.manage_unread(db, "repair")
+    assert unread_counts(conn) == expected_unread(conn)
+
+
+def test_worker_counts_distinct_actors_across_batches(db):
+    assert blog_db.manage_queue(db, "install") and blog_db.manage_unread(db, "install")
+    conn = connect(db)
+    conn.isolation_level = None  # the worker runs its own BEGIN IMMEDIATE
+    recipient, *senders = ids(conn, "auth_user", 6)
+    post = conn.execute("SELECT id FROM dnd_blog_post LIMIT 1").fetchone()[0]
+    worker = blog_db.NotificationWorker(conn, batch_size=3)
+
+    def like(sender):
+        return blog_db.enqueue_notification(conn, blog_db.NOTIFICATION_LIKE, recipient, sender, post)
+
+    def likes():
+        return conn.execute("SELECT id, actor_count, sender_id, is_read FROM dnd_blog_notification WHERE "
+                            "recipient_id = ? AND post_id = ? AND notification_type = ? ORDER BY id",
+                            (recipient, post, blog_db.NOTIFICATION_LIKE)).fetchall()
+
+    conn.execute("UPDATE dnd_blog_notification SET is_read = 1 WHERE recipient_id = ?", (recipient,))
+    assert like(recipient) is None
+    # The second batch repeats one sender and adds two
+    for sender in (senders[0], senders[1], senders[0], senders[1], senders[2], senders[3]):
+        like(sender)
+    assert worker.run_once() == 3 and worker.run_once() == 3 and worker.run_once() == 0
+    (notification, actors, sender, _), = [row for row in likes() if not row[3]]
+    assert (actors, sender) == (4, senders[3])
+
+    # Once read, a new burst starts a new notification
+    conn.execute("UPDATE dnd_blog_notification SET is_read = 1 WHERE id = ?", (notification,))
+    assert conn.execute("SELECT COUNT(*) FROM dnd_blog_notification_actor WHERE notification_id = ?",
+                        (notification,)).fetchone()[0] == 0
+    like(senders[0])
+    like(senders[4])
+    assert worker.run_once() == 2
+    assert [row[1] for row in likes() if not row[3]] == [2]
+    assert blog_db.unread_count(conn, recipient) == 1
+    assert unread_counts(conn) == expected_unread(conn)
+
+
+def test_worker_drops_bad_jobs_and_keeps_good_ones(db, capsys):
+    assert blog_db.manage_queue(db, "install")
+    conn = connect(db)
+    conn.isolation_level = None
+    recipient, sender = ids(conn, "auth_user", 2)
+    post = conn.execute("SELECT id FROM dnd_blog_post LIMIT 1").fetchone()[0]
+    before = conn.execute("SELECT COUNT(*) FROM dnd_blog_notification").fetchone()[0]
+    good = {"notification_type": blog_db.NOTIFICATION_LIKE, "recipient_id": recipient, "sender_id": sender,
+            "post_id": post, "comment_id": None, "created_at": blog_db._django_now()}
+    conn.execute("BEGIN")
+    blog_db.enqueue(conn, blog_db.NOTIFICATION_QUEUE, good)
+    for bad in ("{not json", "[1, 2]", dict(good, sender_id=True), dict(good, post_id="7"),
+                {key: value for key, value in good.items() if key != "created_at"}):
+        conn.execute("INSERT INTO dnd_blog_job (queue, payload, enqueued_at) VALUES (?, ?, 0)",
+                     (blog_db.NOTIFICATION_QUEUE, bad if isinstance(bad, str) else json.dumps(bad)))
+    conn.execute("COMMIT")
+
+    worker = blog_db.NotificationWorker(conn)
+    assert worker.run_once() == 6
+    assert worker.stats()["failed"] == 5 and worker.stats()["queue_depth"] == 0
+    assert conn.execute("SELECT COUNT(*) FROM dnd_blog_notification").fetchone()[0] == before + 1
+    assert capsys.readouterr().out.count("dropped") == 5
+
+
+def notification_rows(conn, table="dnd_blog_notification"):
+    return {row[0]: row for row in conn.execute(f"SELECT * FROM {table} ORDER BY id")}
+
+
+def test_archive_moves_every_old_notification_once(db, tmp_path):
+    conn = connect(db)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.isolation_level = None
+    notifications = ids(conn, "dnd_blog_notification")
+    recent = set(notifications[::3])
+    conn.execute("BEGIN")
+    for notification in notifications:
+        days = 1 if notification in recent else 90
+        conn.execute("UPDATE dnd_blog_notification SET created_at = ? WHERE id = ?",
+                     (blog_db._django_now(days), notification))
+    conn.execute("COMMIT")
+    original = notification_rows(conn)
+    archive = str(tmp_path / "archive.sqlite3")
+
+    # A crash after a batch reached the archive but before it left the blog
+    # database leaves it in both, here with a stale copy of one row
+    assert blog_db.archive_notifications(conn, archive, days=30, batch_size=40, pause=0) == \
+        len(notifications) - len(recent)
+    conn.execute("ATTACH DATABASE ? AS archive", (archive,))
+    stale = dict(list(notification_rows(conn, "archive.dnd_blog_notification_archive").items())[:25])
+    conn.execute("BEGIN")
+    conn.executemany(f"INSERT INTO dnd_blog_notification VALUES ({', '.join('?' * len(original[notifications[1]]))})",
+                     stale.values())
+    conn.execute("UPDATE dnd_blog_notification SET is_read = 1 - is_read WHERE id = ?", (next(iter(stale)),))
+    conn.execute("COMMIT")
+    conn.execute("DETACH DATABASE archive")
+    original.update(notification_rows(conn))
+    assert blog_db.archive_notifications(conn, archive, days=30, batch_size=40, pause=0) == len(stale)
+
+    # A failure while deleting a batch keeps it in both until the next run
+    conn.execute("UPDATE dnd_blog_notification SET created_at = ? WHERE id = ?",
+                 (blog_db._django_now(90), notifications[0]))
+    original[notifications[0]] = notification_rows(conn)[notifications[0]]
+    conn.execute("CREATE TEMP TRIGGER refuse BEFORE DELETE ON dnd_blog_notification "
+                 "BEGIN SELECT RAISE(ABORT, 'disk I/O'); END")
+    with pytest.raises(sqlite3.IntegrityError):
+        blog_db.archive_notifications(conn, archive, days=30, pause=0)
+    conn.execute("DROP TRIGGER refuse")
+    assert notifications[0] in notification_rows(conn)
+    assert blog_db.archive_notifications(conn, archive, days=30, pause=0) == 1
+
+    kept = notification_rows(conn)
+    conn.execute("ATTACH DATABASE ? AS archive", (archive,))
+    archived = notification_rows(conn, "archive.dnd_blog_notification_archive")
+    assert set(kept) == recent - {notifications[0]}
+    assert not kept.keys() & archived.keys()
+    assert {**kept, **archived} == original
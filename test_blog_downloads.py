@@ -0,0 +1,155 @@
+"""
+Tests for blog.py's download paths, run against blog.start_local_server
+
+Run with: python -m pytest -q test_blog_downloads.py
+"""
+import hashlib
+import os
+import zipfile
+
+import pytest
+
+import blog
+
+
+class TruncatingHandler(blog.LocalHandler):
+    """Sends the full Content-Length but cuts the body short for the first `failures` requests"""
+    failures = 0
+    cut_at = 0
+    requests_seen = []
+
+    def send_head(self):
+        type(self).requests_seen.append(dict(self.headers))
+        return super().send_head()
+
+    def copyfile(self, source, outputfile):
+        if type(self).failures > 0:
+            type(self).failures -= 1
+            outputfile.write(source.read(type(self).cut_at))
+            outputfile.flush()
+            self.close_connection = True
+            return
+        super().copyfile(source, outputfile)
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A served directory and its base URL, with a fresh TruncatingHandler"""
+    TruncatingHandler.failures = 0
+    TruncatingHandler.cut_at = 0
+    TruncatingHandler.requests_seen = []
+    root = tmp_path / "site"
+    root.mkdir()
+    server, base_url = blog.start_local_server(str(root), handler=TruncatingHandler)
+    yield root, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+
+def test_download_resumes_with_range_after_truncation(site, tmp_path):
+    root, base_url = site
+    payload = os.urandom(300_000)
+    (root / "file.bin").write_bytes(payload)
+    TruncatingHandler.failures = 1
+    TruncatingHandler.cut_at = 100_000
+
+    output = tmp_path / "file.bin"
+    size = blog.download_resumable(f"{base_url}/file.bin", str(output), retries=2, backoff=0)
+
+    assert size == len(payload)
+    assert output.read_bytes() == payload
+    assert not os.path.exists(str(output) + ".part")
+    # Bytes of the chunk that was cut short are lost, so the resume starts at a chunk boundary
+    assert TruncatingHandler.requests_seen[1].get("Range") == f"bytes={blog.CHUNK_SIZE}-"
+
+
+def test_download_gives_up_and_keeps_part_file_for_later(site, tmp_path):
+    root, base_url = site
+    (root / "file.bin").write_bytes(os.urandom(300_000))
+    TruncatingHandler.failures = 10
+    TruncatingHandler.cut_at = 100_000
+
+    output = tmp_path / "file.bin"
+    with pytest.raises(blog.requests.exceptions.RetryError):
+        blog.download_resumable(f"{base_url}/file.bin", str(output), retries=1, backoff=0)
+    assert not output.exists()
+    # Each attempt kept its one complete chunk, ready for the next run to resume from
+    assert os.path.getsize(str(output) + ".part") == 2 * blog.CHUNK_SIZE
+    assert TruncatingHandler.requests_seen[1].get("Range") == f"bytes={blog.CHUNK_SIZE}-"
+
+
+def test_truncated_page_leaves_saved_copy_and_no_temp_file(site, tmp_path):
+    root, base_url = site
+    (root / "page.html").write_text("<p>" + "new " * 5000 + "</p>", encoding="utf-8")
+    output = tmp_path / "page.html"
+    output.write_text("old copy", encoding="utf-8")
+    TruncatingHandler.failures = 1
+    TruncatingHandler.cut_at = 1000
+
+    assert blog.download_html_file(f"{base_url}/page.html", str(output), quiet=True) is None
+    assert output.read_text(encoding="utf-8") == "old copy"
+    assert not os.path.exists(str(output) + ".tmp")
+
+
+def test_etag_revalidation_answers_304(site, tmp_path):
+    root, base_url = site
+    page = root / "page.html"
+    page.write_text("<p>first</p>", encoding="utf-8")
+    url = f"{base_url}/page.html"
+    output = str(tmp_path / "page.html")
+    cache = blog.HttpCache(str(tmp_path / "cache.json"))
+
+    assert blog.download_html(url, output, quiet=True, cache=cache) == "<p>first</p>"
+    assert cache.entries[url]["etag"]
+    cache.entries[url]["last_modified"] = None  # only the ETag can produce the 304
+
+    assert blog.download_html_file(url, output, quiet=True, cache=cache) == output
+    assert TruncatingHandler.requests_seen[-1]["If-None-Match"] == cache.entries[url]["etag"]
+    assert (cache.hits, cache.not_modified, cache.misses) == (1, 1, 1)
+
+    page.write_text("<p>second, longer</p>", encoding="utf-8")
+    assert blog.download_html(url, output, quiet=True, cache=cache) == "<p>second, longer</p>"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_sqlite_archive_with_wrong_hash_is_removed_and_not_installed(site, tmp_path, monkeypatch):
+    root, base_url = site
+    make_zip(root / "tools.zip", {"sqlite-tools-test/sqlite3": os.urandom(20_000)})
+    work = tmp_path / "work"
+    work.mkdir()
+    monkeypatch.chdir(work)
+
+    assert not blog.download_sqlite(f"{base_url}/tools.zip", ("sha3_256", "0" * 64), backoff=0)
+    assert os.listdir(work) == []
+
+
+def test_sqlite_archive_without_pinned_hash_is_not_installed(site, tmp_path, monkeypatch, capsys):
+    root, base_url = site
+    make_zip(root / "tools.zip", {"sqlite-tools-test/sqlite3": b"binary"})
+    work = tmp_path / "work"
+    work.mkdir()
+    monkeypatch.chdir(work)
+
+    assert not blog.download_sqlite(f"{base_url}/tools.zip", backoff=0)
+    assert not (work / "sqlite-tools-test").exists()
+    output = capsys.readouterr().out
+    assert hashlib.sha3_256((root / "tools.zip").read_bytes()).hexdigest() in output
+    assert "--sha3-256 HEX" in output
+
+
+def test_sqlite_archive_with_matching_hash_is_installed(site, tmp_path, monkeypatch):
+    root, base_url = site
+    make_zip(root / "tools.zip", {"sqlite-tools-test/sqlite3": b"binary"})
+    digest = hashlib.sha3_256((root / "tools.zip").read_bytes()).hexdigest()
+    work = tmp_path / "work"
+    work.mkdir()
+    monkeypatch.chdir(work)
+
+    assert blog.download_sqlite(f"{base_url}/tools.zip", ("sha3_256", digest), backoff=0)
+    assert (work / "sqlite-tools-test" / "sqlite3").read_bytes() == b"binary"
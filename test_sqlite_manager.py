@@ -0,0 +1,59 @@
+"""
+Tests for sqlite_manager.py's command-line tools
+
+Run with: python -m pytest -q test_sqlite_manager.py
+"""
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import sqlite_manager
+
+
+@pytest.fixture
+def small_db(tmp_path):
+    path = str(tmp_path / "small.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id integer PRIMARY KEY, value text)")
+    conn.executemany("INSERT INTO t (value) VALUES (?)", [("x" * 100,)] * 2000)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_backup_leaves_no_part_file_when_compression_fails(small_db, tmp_path, monkeypatch):
+    backups = tmp_path / "backups"
+    copy = shutil.copyfileobj
+
+    def fail_midway(source, target, length=0):
+        target.write(source.read(1000))
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sqlite_manager.shutil, "copyfileobj", fail_midway)
+    assert sqlite_manager.backup_database(small_db, str(backups), sleep=0) is None
+    assert os.listdir(backups) == []
+
+    monkeypatch.setattr(sqlite_manager.shutil, "copyfileobj", copy)
+    final = sqlite_manager.backup_database(small_db, str(backups), sleep=0)
+    assert os.listdir(backups) == [os.path.basename(final)]
+
+
+def test_advise_rejects_unknown_options(small_db, tmp_path, monkeypatch):
+    workload = tmp_path / "workload.sql"
+    workload.write_text("SELECT * FROM t WHERE value = 'x';\n")
+    monkeypatch.setattr(sqlite_manager.sys, "argv", ["sqlite_manager.py", "advise", small_db, str(workload), "--aply"])
+    with pytest.raises(SystemExit) as exit_info:
+        sqlite_manager.main()
+    assert exit_info.value.code == 2
+
+
+@pytest.mark.parametrize("argv", [["page", "posts", "--limit", "0"], ["page", "posts", "--limit", "-1"],
+                                  ["search", "dragon", "--limit", "0"]])
+def test_page_limits_must_be_positive(argv, monkeypatch, capsys):
+    monkeypatch.setattr(sqlite_manager.sys, "argv", ["sqlite_manager.py"] + argv)
+    with pytest.raises(SystemExit) as exit_info:
+        sqlite_manager.main()
+    assert exit_info.value.code == 2
+    assert "must be at least 1" in capsys.readouterr().err